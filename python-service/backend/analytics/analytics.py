@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码分析引擎
+
+把一个彩票类型的全部开奖号码载入按开奖顺序排列的uint8矩阵（期数 × 每期号码个数），
+再展开为布尔命中矩阵（期数 × 号码），遗漏、冷热、同现、分布和滚动窗口统计全部用NumPy向量化计算，
+不再逐期循环。快乐8十年约3650期 × 20个号码，矩阵只有约70KB。
+
+号码矩阵从列式快照（models.snapshot）内存映射读取，并按数据版本缓存，
+新开奖写入后data_version变化，下次请求自动重新载入。
+"""
+
+import itertools
+import threading
+
+import numpy as np
+
+# 已载入的号码矩阵：{(彩票类型代码, 号码类别): DrawMatrix}
+_matrix_cache = {}
+_matrix_lock = threading.Lock()
+
+# 同现统计每次处理的期数，限制组合展开后的临时数组大小
+COMBINATION_CHUNK_SIZE = 2000
+
+class DrawMatrix:
+    """一个彩票类型某类号码的全部开奖，按开奖日期从旧到新排列"""
+    
+    def __init__(self, code, kind, version, issues, draw_dates, balls):
+        from models.models import ball_number_range
+        
+        self.code = code
+        self.kind = kind
+        self.version = version
+        self.issues = issues
+        self.draw_dates = draw_dates
+        # uint8矩阵，每期号码已按从小到大排序；直接引用传入的数组，可以指向共享内存
+        self.balls = balls
+        # 号码的取值范围按彩票规则确定，未登记的类型按出现过的号码确定
+        self.number_range = ball_number_range(code, kind)
+        observed = int(self.balls.max()) + 1 if self.balls.size else 0
+        self.size = max(observed, self.number_range[1] + 1) if self.number_range else observed
+        self._hits = None
+    
+    @property
+    def draws(self):
+        return self.balls.shape[0]
+    
+    @property
+    def hits(self):
+        """布尔命中矩阵，hits[i, n]表示第i期开出了号码n"""
+        if self._hits is None:
+            hits = np.zeros((self.draws, self.size), dtype=bool)
+            hits[np.arange(self.draws)[:, None], self.balls] = True
+            self._hits = hits
+        return self._hits
+
+def load_draw_matrix(code, kind='red'):
+    """载入号码矩阵，数据版本未变化时直接返回缓存；彩票类型不存在或没有该类号码时返回None"""
+    from models.models import get_data_version
+    from models.snapshot import open_snapshot
+    
+    data_version = get_data_version(code)
+    if data_version is None:
+        return None
+    
+    key = (code, kind)
+    cached = _matrix_cache.get(key)
+    if cached is not None and cached.version == data_version['version']:
+        return cached
+    
+    with _matrix_lock:
+        cached = _matrix_cache.get(key)
+        if cached is not None and cached.version == data_version['version']:
+            return cached
+        
+        table = open_snapshot(code)
+        column = f'{kind}_balls'
+        if table is None or column not in table.column_names:
+            return None
+        
+        # 号码个数异常的期在快照中为null，分析时跳过
+        balls = table[column].combine_chunks()
+        valid = balls.is_valid().to_numpy(zero_copy_only=False)
+        width = balls.type.list_size
+        values = balls.flatten().to_numpy().reshape(-1, width) if len(balls) else np.empty((0, width), dtype=np.int8)
+        if not valid.all():
+            # flatten会跳过null行，其余列按同样的掩码过滤
+            table = table.filter(valid)
+        
+        matrix = DrawMatrix(
+            code, kind, int(table.schema.metadata[b'data_version']),
+            table['issue'].to_pylist(),
+            [date.isoformat() for date in table['draw_date'].to_pylist()],
+            np.sort(values.astype(np.uint8), axis=1)
+        )
+        _matrix_cache[key] = matrix
+        return matrix
+
+def clear_cache():
+    """清空已载入的号码矩阵"""
+    with _matrix_lock:
+        _matrix_cache.clear()
+
+def frequency(matrix):
+    """每个号码的出现次数（同一期重复开出的号码按次数累计）"""
+    return np.bincount(matrix.balls.ravel(), minlength=matrix.size)
+
+def omission_table(matrix):
+    """遗漏统计：每个号码的出现次数、当前遗漏、历史最大遗漏和平均遗漏
+    
+    遗漏指相邻两次开出之间间隔的期数；从未开出的号码当前遗漏等于总期数。
+    """
+    hits = matrix.hits
+    draws = matrix.draws
+    counts = hits.sum(axis=0)
+    
+    # 每个号码最近一次开出的位置
+    last_seen = np.where(counts > 0, draws - 1 - np.argmax(hits[::-1], axis=0), -1)
+    current_gap = draws - 1 - last_seen
+    
+    # 按号码分组的命中位置，相邻位置之差减一即为遗漏
+    numbers, positions = np.nonzero(hits.T)
+    previous = np.empty_like(positions)
+    previous[1:] = positions[:-1]
+    first_in_group = np.ones(len(numbers), dtype=bool)
+    first_in_group[1:] = numbers[1:] != numbers[:-1]
+    previous[first_in_group] = -1
+    gaps = positions - previous - 1
+    
+    max_gap = current_gap.copy()
+    np.maximum.at(max_gap, numbers, gaps)
+    gap_total = np.bincount(numbers, weights=gaps, minlength=matrix.size) + current_gap
+    average_gap = gap_total / (counts + 1)
+    
+    return {
+        'hit_count': frequency(matrix),
+        'current_gap': current_gap,
+        'max_gap': max_gap,
+        'average_gap': average_gap
+    }
+
+def hot_cold(matrix, window=30, top=10):
+    """最近window期内出现次数最多和最少的号码，返回(热号[(号码, 次数)], 冷号[(号码, 次数)])"""
+    counts = np.bincount(matrix.balls[-window:].ravel(), minlength=matrix.size)
+    numbers = number_range(matrix)
+    hot = numbers[np.lexsort((numbers, -counts[numbers]))][:top]
+    cold = numbers[np.lexsort((numbers, counts[numbers]))][:top]
+    return [(int(n), int(counts[n])) for n in hot], [(int(n), int(counts[n])) for n in cold]
+
+def combination_counts(matrix, size=2):
+    """统计同一期内size个号码同时开出的次数，返回按次数降序排列的(组合数组, 次数数组)
+    
+    把每期号码的所有组合编码为整数后用bincount计数，分批处理限制临时数组大小。
+    """
+    width = matrix.balls.shape[1]
+    if size > width:
+        return np.empty((0, size), dtype=np.int64), np.empty(0, dtype=np.int64)
+    
+    base = matrix.size
+    combos = np.array(list(itertools.combinations(range(width), size)), dtype=np.intp)
+    weights = base ** np.arange(size - 1, -1, -1, dtype=np.int64)
+    counts = np.zeros(base ** size, dtype=np.int64)
+    for start in range(0, matrix.draws, COMBINATION_CHUNK_SIZE):
+        chunk = matrix.balls[start:start + COMBINATION_CHUNK_SIZE].astype(np.int64)
+        codes = (chunk[:, combos] * weights).sum(axis=2)
+        counts += np.bincount(codes.ravel(), minlength=counts.size)
+    
+    codes = np.flatnonzero(counts)
+    codes = codes[np.lexsort((codes, -counts[codes]))]
+    combinations = (codes[:, None] // weights) % base
+    return combinations, counts[codes]
+
+def distributions(matrix):
+    """和值、奇数个数和跨度的分布，返回{指标: [(取值, 期数)]}"""
+    balls = matrix.balls.astype(np.int32)
+    metrics = {
+        'sum': balls.sum(axis=1),
+        'odd': (balls % 2).sum(axis=1),
+        'span': balls.max(axis=1) - balls.min(axis=1)
+    }
+    result = {}
+    for name, values in metrics.items():
+        keys, counts = np.unique(values, return_counts=True)
+        result[name] = list(zip(keys.tolist(), counts.tolist()))
+    return result
+
+def rolling_series(matrix, window=10, last=100, number=None):
+    """最近last期的和值、奇数个数、跨度及window期滚动平均；指定number时附带该号码在滚动窗口内的出现次数
+    
+    返回{指标: 数组}，数组与最近last期一一对应。
+    """
+    balls = matrix.balls.astype(np.int32)
+    sums = balls.sum(axis=1)
+    odds = (balls % 2).sum(axis=1)
+    spans = balls.max(axis=1) - balls.min(axis=1)
+    ends = np.arange(1, matrix.draws + 1)
+    starts = np.maximum(ends - window, 0)
+    
+    def moving_sum(values, dtype):
+        cumulative = np.concatenate(([0], np.cumsum(values, dtype=dtype)))
+        return cumulative[ends] - cumulative[starts]
+    
+    series = {
+        'sum': sums,
+        'sum_ma': moving_sum(sums, np.float64) / (ends - starts),
+        'odd': odds,
+        'odd_ma': moving_sum(odds, np.float64) / (ends - starts),
+        'span': spans,
+        'span_ma': moving_sum(spans, np.float64) / (ends - starts)
+    }
+    if number is not None:
+        hits = matrix.hits[:, number] if number < matrix.size else np.zeros(matrix.draws, dtype=bool)
+        series['number_hits'] = moving_sum(hits, np.int64)
+    
+    start = max(matrix.draws - last, 0)
+    return {name: values[start:] for name, values in series.items()}
+
+def rolling_rows(matrix, series):
+    """把rolling_series的结果与期号、开奖日期组合成逐期记录"""
+    count = len(series['sum'])
+    offset = matrix.draws - count
+    rows = []
+    for i in range(count):
+        row = {'issue': matrix.issues[offset + i], 'draw_date': matrix.draw_dates[offset + i]}
+        for name, values in series.items():
+            value = values[i]
+            row[name] = round(float(value), 4) if name.endswith('_ma') else int(value)
+        rows.append(row)
+    return rows
+
+def rolling(matrix, window=10, last=100, number=None):
+    """最近last期的逐期指标及滚动平均，返回逐期记录列表"""
+    return rolling_rows(matrix, rolling_series(matrix, window, last, number))
+
+def number_range(matrix):
+    """号码取值范围：按彩票规则确定，例如双色球红球为1-33，从未开出的号码也包含在内；
+    未登记的类型从出现过的最小号码到最大号码"""
+    if matrix.number_range:
+        return np.arange(matrix.number_range[0], matrix.size)
+    if not matrix.balls.size:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(int(matrix.balls.min()), matrix.size)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码分析进程池
+
+同现、遗漏、分布和滚动窗口统计都是CPU密集计算，在请求线程中执行会长时间占用GIL，
+同一进程里/health、/latest等轻量接口都要排队。这些计算交给有界的进程池执行，请求线程只等待结果。
+
+号码矩阵通过共享内存传给工作进程：主进程按(彩票类型, 号码类别, 数据版本)发布一块共享内存，
+工作进程按名称挂载并缓存，每次任务只传递共享内存名称和矩阵形状，不再序列化整个矩阵。
+
+排队任务数达到上限时立即拒绝（API返回429），单个请求等待超过超时时间时返回504，
+工作进程异常退出时重建进程池并返回503。
+"""
+
+import atexit
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from analytics import analytics
+from config.config import Config
+
+class AnalyticsBusyError(Exception):
+    """进程池排队任务已满"""
+
+class AnalyticsTimeoutError(Exception):
+    """分析任务超时"""
+
+class AnalyticsUnavailableError(Exception):
+    """工作进程异常退出，进程池已重建"""
+
+# 工作进程中已挂载的共享内存：{(彩票类型代码, 号码类别): (共享内存名称, SharedMemory, DrawMatrix)}
+_attached = {}
+
+def _attach_matrix(spec):
+    """在工作进程中按名称挂载共享内存中的号码矩阵，同一版本只挂载一次"""
+    name, code, kind, version, shape = spec
+    cached = _attached.get((code, kind))
+    if cached is not None and cached[0] == name:
+        return cached[2]
+    if cached is not None:
+        cached[1].close()
+    
+    shm = shared_memory.SharedMemory(name=name)
+    balls = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    matrix = analytics.DrawMatrix(code, kind, version, None, None, balls)
+    _attached[(code, kind)] = (name, shm, matrix)
+    return matrix
+
+# 可以在工作进程中执行的分析函数，结果只包含数值，由调用方补充期号等信息
+TASKS = {
+    'omission_table': analytics.omission_table,
+    'combination_counts': analytics.combination_counts,
+    'distributions': analytics.distributions,
+    'rolling_series': analytics.rolling_series
+}
+
+def _run_task(task, spec, args):
+    return TASKS[task](_attach_matrix(spec), *args)
+
+class AnalyticsPool:
+    """有界进程池，负责发布共享内存、提交任务以及排队和超时控制"""
+    
+    def __init__(self, workers=None, max_pending=None, timeout=None):
+        self.workers = workers or Config.ANALYTICS_WORKERS
+        self.max_pending = max_pending or Config.ANALYTICS_MAX_PENDING
+        self.timeout = timeout or Config.ANALYTICS_TIMEOUT_SECONDS
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # 主进程发布的当前版本：{(彩票类型代码, 号码类别): spec}
+        self._published = {}
+        # 全部未解除链接的共享内存及引用它的任务数：{共享内存名称: [SharedMemory, 任务数]}
+        self._segments = {}
+        # 已被新版本替换、等待任务结束后解除链接的共享内存名称
+        self._retired = set()
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+    
+    def _get_executor(self):
+        if self._executor is None:
+            # forkserver启动的工作进程不会继承主进程中的线程和数据库连接
+            method = Config.ANALYTICS_START_METHOD
+            context = multiprocessing.get_context(method) if method in multiprocessing.get_all_start_methods() else None
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+    
+    def publish(self, matrix):
+        """把号码矩阵复制到共享内存，返回传给工作进程的描述；同一数据版本只复制一次"""
+        with self._lock:
+            return self._publish_locked(matrix)
+    
+    def _publish_locked(self, matrix):
+        """发布号码矩阵，调用方需持有self._lock"""
+        key = (matrix.code, matrix.kind)
+        published = self._published.get(key)
+        if published is not None and published[3] == matrix.version:
+            return published
+        
+        shm = shared_memory.SharedMemory(create=True, size=max(matrix.balls.nbytes, 1))
+        np.ndarray(matrix.balls.shape, dtype=np.uint8, buffer=shm.buf)[:] = matrix.balls
+        spec = (shm.name, matrix.code, matrix.kind, matrix.version, matrix.balls.shape)
+        self._published[key] = spec
+        self._segments[shm.name] = [shm, 0]
+        
+        # 旧版本不再分配给新任务，排队或执行中的任务还会挂载它，等最后一个任务结束后再解除链接
+        if published is not None:
+            self._retired.add(published[0])
+            self._release_segment(published[0], 0)
+        return spec
+    
+    def _release_segment(self, name, count=1):
+        """减少共享内存的引用计数，已退役且不再被任务引用时关闭并解除链接，调用方需持有self._lock"""
+        segment = self._segments[name]
+        segment[1] -= count
+        if segment[1] <= 0 and name in self._retired:
+            self._retired.discard(name)
+            del self._segments[name]
+            segment[0].close()
+            segment[0].unlink()
+    
+    def run(self, task, matrix, *args):
+        """在进程池中执行分析任务并等待结果"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise AnalyticsBusyError(f"分析任务排队已满（{self._pending}/{self.max_pending}）")
+            # 发布和引用计数在同一把锁内完成，避免任务提交前共享内存被新版本替换并解除链接
+            spec = self._publish_locked(matrix)
+            self._segments[spec[0]][1] += 1
+            self._pending += 1
+        
+        done = functools.partial(self._task_done, spec[0])
+        try:
+            future = self._get_executor().submit(_run_task, task, spec, args)
+        except BrokenProcessPool as e:
+            done(None)
+            self._reset_executor()
+            raise AnalyticsUnavailableError(f"分析进程池不可用：{e}")
+        except Exception:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool as e:
+            # 工作进程被杀死（如内存不足）后进程池不能再用，下次请求重新创建
+            self._reset_executor()
+            raise AnalyticsUnavailableError(f"分析进程异常退出：{e}")
+        except FutureTimeoutError:
+            # 已开始执行的任务无法取消，仍占用排队名额直到完成
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise AnalyticsTimeoutError(f"分析任务超过{self.timeout}秒未完成")
+    
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _task_done(self, name, future):
+        with self._lock:
+            self._pending -= 1
+            self._release_segment(name)
+            if future is not None and not future.cancelled():
+                self.completed += 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'timeout': self.timeout,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'shared_matrices': len(self._published),
+                'retired_matrices': len(self._retired)
+            }
+    
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            for shm, _ in self._segments.values():
+                shm.close()
+                shm.unlink()
+            self._published.clear()
+            self._segments.clear()
+            self._retired.clear()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_analytics_pool():
+    """获取全局分析进程池，首次调用时创建"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AnalyticsPool()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+def run_analytics(task, matrix, *args):
+    """执行分析任务：启用进程池时交给工作进程，否则在当前线程计算"""
+    if not Config.ANALYTICS_OFFLOAD_ENABLED:
+        return TASKS[task](matrix, *args)
+    return get_analytics_pool().run(task, matrix, *args)
@@ -1,9 +1,18 @@
-from flask import Blueprint, jsonify, request
-from models.models import get_lottery_type_id, get_latest_results, get_all_results, get_db_connection
+import csv
+import io
+import zlib
+
+from flask import Blueprint, Response, jsonify, request, send_file
+from api.cache import cached_by_data_version, conditional_by_all_data_versions, conditional_by_data_version, get_response_cache
+from api.serializers import DRAW_FIELDS, draw_list_response
+from models.models import (
+    get_lottery_type_id, get_result_fragments, get_db_connection, BALL_MASK_RANGE, RECENT_DRAWS_SQL, RED_BALL_RANGE
+)
 
 api_bp = Blueprint('api', __name__)
 
 @api_bp.route('/lottery/<string:type_code>/latest', methods=['GET'])
+@cached_by_data_version
 def get_latest_lottery_results(type_code):
     """获取指定彩票类型的最新开奖结果"""
     # 获取查询参数
@@ -14,124 +23,82 @@ def get_latest_lottery_results(type_code):
     if not type_id:
         return jsonify({'error': 'Invalid lottery type'}), 400
     
-    # 获取最新结果
-    results = get_latest_results(type_id, limit)
-    
-    # 格式化结果
-    formatted_results = []
-    for result in results:
-        formatted_results.append({
-            'issue': result['issue'],
-            'draw_date': result['draw_date'],
-            'red_balls': result['red_balls'].split(','),
-            'blue_balls': result['blue_balls'] if result['blue_balls'] else None,
-            'sales': result['sales'],
-            'pool_money': result['pool_money'],
-            'first_prize_count': result['first_prize_count'],
-            'first_prize_amount': result['first_prize_amount'],
-            'second_prize_count': result['second_prize_count'],
-            'second_prize_amount': result['second_prize_amount']
-        })
-    
-    return jsonify({
-        'success': True,
-        'data': formatted_results,
-        'count': len(formatted_results)
-    })
+    # 获取最新结果，入库时已渲染好每期的JSON片段，直接拼接成响应
+    results = get_result_fragments(type_id, limit)
+    return draw_list_response([result[2] for result in results], count=len(results))
 
 @api_bp.route('/lottery/<string:type_code>/history', methods=['GET'])
+@cached_by_data_version
 def get_history_lottery_results(type_code):
-    """获取指定彩票类型的历史开奖结果，支持分页"""
+    """获取指定彩票类型的历史开奖结果，支持page/limit分页和?after=<draw_date,issue>游标分页"""
+    from models.models import get_data_version
+    
     # 获取查询参数
     page = request.args.get('page', default=1, type=int)
     limit = request.args.get('limit', default=20, type=int)
     offset = (page - 1) * limit
+    after = request.args.get('after')
+    if after is not None:
+        after = after.split(',', 1)
+        if len(after) != 2 or not all(after):
+            return jsonify({'error': 'Parameter after must be <draw_date,issue>'}), 400
     
-    # 获取彩票类型ID
-    type_id = get_lottery_type_id(type_code)
-    if not type_id:
+    # 获取彩票类型ID和数据版本，总记录数直接使用data_version中随写入维护的row_count
+    data_version = get_data_version(type_code)
+    if not data_version:
         return jsonify({'error': 'Invalid lottery type'}), 400
+    type_id = data_version['type_id']
+    total = data_version['row_count']
     
-    # 获取历史结果
-    results = get_all_results(type_id, offset, limit)
+    # 获取历史结果：游标分页沿索引从上一页末尾继续读取，不需要跳过offset行
+    results = get_result_fragments(type_id, limit, offset, after)
     
-    # 获取总记录数
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM lottery_result WHERE type_id = ?', (type_id,))
-    total = cursor.fetchone()[0]
-    conn.close()
+    # 本页已满时返回下一页游标，page模式的响应也带上，客户端可从任意一页切换到游标分页
+    next_cursor = None
+    if results and len(results) == limit:
+        next_cursor = f"{results[-1][0]},{results[-1][1]}"
     
-    # 格式化结果
-    formatted_results = []
-    for result in results:
-        formatted_results.append({
-            'issue': result['issue'],
-            'draw_date': result['draw_date'],
-            'red_balls': result['red_balls'].split(','),
-            'blue_balls': result['blue_balls'] if result['blue_balls'] else None,
-            'sales': result['sales'],
-            'pool_money': result['pool_money'],
-            'first_prize_count': result['first_prize_count'],
-            'first_prize_amount': result['first_prize_amount'],
-            'second_prize_count': result['second_prize_count'],
-            'second_prize_amount': result['second_prize_amount']
-        })
-    
-    return jsonify({
-        'success': True,
-        'data': formatted_results,
-        'count': len(formatted_results),
+    fields = {
+        'count': len(results),
         'total': total,
-        'page': page,
-        'limit': limit
-    })
+        'limit': limit,
+        'next_cursor': next_cursor
+    }
+    if after is None:
+        fields['page'] = page
+    return draw_list_response([result[2] for result in results], **fields)
 
 @api_bp.route('/lottery/<string:type_code>/stats', methods=['GET'])
+@cached_by_data_version
 def get_lottery_stats(type_code):
     """获取指定彩票类型的统计数据"""
+    from models.models import get_ball_stats, format_ball_number
+    
     # 获取彩票类型ID
     type_id = get_lottery_type_id(type_code)
     if not type_id:
         return jsonify({'error': 'Invalid lottery type'}), 400
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # 号码频率和遗漏直接读取随开奖增量维护的ball_stats，按次数从高到低排列
+    frequency = {}
+    omission = {}
+    for kind in ('red', 'blue'):
+        stats = sorted(get_ball_stats(type_id, kind), key=lambda row: (-row['hit_count'], row['number']))
+        frequency[kind] = {format_ball_number(type_code, row['number']): row['hit_count'] for row in stats}
+        omission[kind] = {
+            format_ball_number(type_code, row['number']): {
+                'current_gap': row['current_gap'],
+                'last_issue': row['last_issue'],
+                'last_draw_date': row['last_draw_date']
+            }
+            for row in stats
+        }
     
-    # 计算红球频率
-    cursor.execute('''
-        SELECT ball, COUNT(*) as count
-        FROM (
-            SELECT TRIM(value) as ball
-            FROM lottery_result, json_each(REPLACE(red_balls, ',', '|'))
-            WHERE type_id = ?
-        )
-        GROUP BY ball
-        ORDER BY count DESC, ball
-    ''', (type_id,))
-    red_ball_freq = {row[0]: row[1] for row in cursor.fetchall()}
-    
-    # 计算蓝球频率
-    cursor.execute('''
-        SELECT TRIM(value) as ball, COUNT(*) as count
-        FROM (
-            SELECT TRIM(value) as ball
-            FROM lottery_result, json_each(REPLACE(blue_balls, ',', '|'))
-            WHERE type_id = ? AND blue_balls IS NOT NULL
-        )
-        GROUP BY ball
-        ORDER BY count DESC, ball
-    ''', (type_id,))
-    blue_ball_freq = {row[0]: row[1] for row in cursor.fetchall()}
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
     
     # 获取最近5期号码
-    cursor.execute('''
-        SELECT issue, red_balls, blue_balls
-        FROM lottery_result
-        WHERE type_id = ?
-        ORDER BY draw_date DESC
-        LIMIT 5
-    ''', (type_id,))
+    cursor.execute(RECENT_DRAWS_SQL, (type_id, 5))
     recent_results = []
     for row in cursor.fetchall():
         recent_results.append({
@@ -145,16 +112,379 @@ def get_lottery_stats(type_code):
     return jsonify({
         'success': True,
         'data': {
-            'red_ball_frequency': red_ball_freq,
-            'blue_ball_frequency': blue_ball_freq,
+            'red_ball_frequency': frequency['red'],
+            'blue_ball_frequency': frequency['blue'],
+            'red_ball_omission': omission['red'],
+            'blue_ball_omission': omission['blue'],
             'recent_results': recent_results
         }
     })
 
+def _parse_ball_list(text):
+    """解析查询参数中逗号分隔的号码，格式错误时返回None"""
+    try:
+        return [int(ball) for ball in text.split(',') if ball.strip()]
+    except ValueError:
+        return None
+
+@api_bp.route('/lottery/<string:type_code>/draws', methods=['GET'])
+@cached_by_data_version
+def get_draws_containing_numbers(type_code):
+    """查询同时包含指定红球号码的开奖结果，?contains=01,05,12"""
+    from models.models import get_draws_containing
+    
+    numbers = _parse_ball_list(request.args.get('contains', default=''))
+    limit = request.args.get('limit', default=20, type=int)
+    if not numbers:
+        return jsonify({'error': 'Parameter contains is required, e.g. contains=01,05'}), 400
+    
+    type_id = get_lottery_type_id(type_code)
+    if not type_id:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    low, high = RED_BALL_RANGE.get(type_code, BALL_MASK_RANGE)
+    if any(not low <= number <= high for number in numbers):
+        return jsonify({'error': f'Numbers in contains must be between {low} and {high}'}), 400
+    
+    results, total = get_draws_containing(type_id, numbers, limit)
+    formatted_results = [{
+        'issue': result['issue'],
+        'draw_date': result['draw_date'],
+        'red_balls': result['red_balls'].split(','),
+        'blue_balls': result['blue_balls'] if result['blue_balls'] else None
+    } for result in results]
+    
+    return jsonify({
+        'success': True,
+        'data': formatted_results,
+        'count': len(formatted_results),
+        'total': total
+    })
+
+@api_bp.route('/lottery/<string:type_code>/cooccurrence', methods=['GET'])
+@cached_by_data_version
+def get_ball_co_occurrence(type_code):
+    """统计与指定号码同期开出的其他号码，?number=5&kind=red"""
+    from models.models import get_co_occurrence, format_ball_number
+    
+    number = request.args.get('number', type=int)
+    kind = request.args.get('kind', default='red')
+    if number is None or kind not in ('red', 'blue'):
+        return jsonify({'error': 'Parameter number is required and kind must be red or blue'}), 400
+    
+    type_id = get_lottery_type_id(type_code)
+    if not type_id:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    counts = sorted(get_co_occurrence(type_id, number, kind), key=lambda item: (-item[1], item[0]))
+    return jsonify({
+        'success': True,
+        'number': format_ball_number(type_code, number),
+        'data': [{'number': format_ball_number(type_code, other), 'count': count} for other, count in counts]
+    })
+
+def _cents_to_yuan(value):
+    """分转换为元，空值保持None"""
+    return None if value is None else round(value / 100, 2)
+
+@api_bp.route('/lottery/<string:type_code>/trends', methods=['GET'])
+@cached_by_data_version
+def get_lottery_trends(type_code):
+    """按周/月/年获取销量、奖池和一等奖趋势，聚合在SQLite中完成"""
+    from models.models import get_period_trends, TREND_PERIOD_FORMATS
+    
+    period = request.args.get('period', default='month')
+    since = request.args.get('since', default='')
+    if period not in TREND_PERIOD_FORMATS:
+        return jsonify({'error': f'Invalid period, expected one of {sorted(TREND_PERIOD_FORMATS)}'}), 400
+    
+    type_id = get_lottery_type_id(type_code)
+    if not type_id:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    trends = []
+    for row in get_period_trends(type_id, period, since):
+        trends.append({
+            'period': row['period'],
+            'draws': row['draws'],
+            'total_sales': _cents_to_yuan(row['total_sales_cents']),
+            'avg_sales': _cents_to_yuan(row['avg_sales_cents']),
+            'max_pool_money': _cents_to_yuan(row['max_pool_money_cents']),
+            'min_pool_money': _cents_to_yuan(row['min_pool_money_cents']),
+            'first_prize_count': row['first_prize_count'],
+            'max_first_prize_amount': _cents_to_yuan(row['max_first_prize_amount_cents'])
+        })
+    
+    return jsonify({
+        'success': True,
+        'period': period,
+        'data': trends,
+        'count': len(trends)
+    })
+
+@api_bp.route('/lottery/<string:type_code>/trends/pool', methods=['GET'])
+@cached_by_data_version
+def get_lottery_pool_trend(type_code):
+    """获取每期销量和奖池金额序列"""
+    from models.models import get_pool_trend
+    
+    since = request.args.get('since', default='')
+    type_id = get_lottery_type_id(type_code)
+    if not type_id:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    series = [{
+        'draw_date': row['draw_date'],
+        'sales': _cents_to_yuan(row['sales_cents']),
+        'pool_money': _cents_to_yuan(row['pool_money_cents'])
+    } for row in get_pool_trend(type_id, since)]
+    
+    return jsonify({
+        'success': True,
+        'data': series,
+        'count': len(series)
+    })
+
+def _load_analytics_matrix(type_code):
+    """按查询参数kind载入号码矩阵，返回(矩阵, 错误响应)"""
+    from analytics.analytics import load_draw_matrix
+    
+    kind = request.args.get('kind', default='red')
+    if kind not in ('red', 'blue'):
+        return None, (jsonify({'error': 'Parameter kind must be red or blue'}), 400)
+    try:
+        matrix = load_draw_matrix(type_code, kind)
+    except ImportError:
+        return None, (jsonify({'error': 'Analytics requires numpy and pyarrow'}), 501)
+    if matrix is None:
+        return None, (jsonify({'error': 'Invalid lottery type or ball kind'}), 400)
+    return matrix, None
+
+def _run_analytics(task, matrix, *args):
+    """把CPU密集的分析任务交给进程池，返回(结果, 错误响应)；排队已满返回429，超时返回504"""
+    from analytics.offload import AnalyticsBusyError, AnalyticsTimeoutError, AnalyticsUnavailableError, run_analytics
+    
+    try:
+        return run_analytics(task, matrix, *args), None
+    except AnalyticsBusyError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return None, (response, 429)
+    except AnalyticsTimeoutError as e:
+        return None, (jsonify({'error': str(e)}), 504)
+    except AnalyticsUnavailableError as e:
+        return None, (jsonify({'error': str(e)}), 503)
+
+@api_bp.route('/lottery/<string:type_code>/analytics/omission', methods=['GET'])
+@cached_by_data_version
+def get_analytics_omission(type_code):
+    """遗漏表：每个号码的出现次数、当前遗漏、最大遗漏和平均遗漏"""
+    from analytics.analytics import number_range
+    from models.models import format_ball_number
+    
+    matrix, error = _load_analytics_matrix(type_code)
+    if error:
+        return error
+    
+    table, error = _run_analytics('omission_table', matrix)
+    if error:
+        return error
+    data = [{
+        'number': format_ball_number(type_code, int(number)),
+        'hit_count': int(table['hit_count'][number]),
+        'current_gap': int(table['current_gap'][number]),
+        'max_gap': int(table['max_gap'][number]),
+        'average_gap': round(float(table['average_gap'][number]), 2)
+    } for number in number_range(matrix)]
+    
+    return jsonify({'success': True, 'draws': matrix.draws, 'data': data})
+
+@api_bp.route('/lottery/<string:type_code>/analytics/hotcold', methods=['GET'])
+@cached_by_data_version
+def get_analytics_hot_cold(type_code):
+    """冷热号：最近window期内出现次数最多和最少的号码，?window=30&top=10"""
+    from analytics.analytics import hot_cold
+    from models.models import format_ball_number
+    
+    window = request.args.get('window', default=30, type=int)
+    top = request.args.get('top', default=10, type=int)
+    if window <= 0 or top <= 0:
+        return jsonify({'error': 'Parameters window and top must be positive'}), 400
+    
+    matrix, error = _load_analytics_matrix(type_code)
+    if error:
+        return error
+    
+    hot, cold = hot_cold(matrix, window, top)
+    return jsonify({
+        'success': True,
+        'window': min(window, matrix.draws),
+        'hot': [{'number': format_ball_number(type_code, number), 'count': count} for number, count in hot],
+        'cold': [{'number': format_ball_number(type_code, number), 'count': count} for number, count in cold]
+    })
+
+@api_bp.route('/lottery/<string:type_code>/analytics/cooccurrence', methods=['GET'])
+@cached_by_data_version
+def get_analytics_co_occurrence(type_code):
+    """同期开出次数最多的号码组合，?size=2|3&top=20"""
+    from models.models import format_ball_number
+    
+    size = request.args.get('size', default=2, type=int)
+    top = request.args.get('top', default=20, type=int)
+    if size not in (2, 3) or top <= 0:
+        return jsonify({'error': 'Parameter size must be 2 or 3 and top must be positive'}), 400
+    
+    matrix, error = _load_analytics_matrix(type_code)
+    if error:
+        return error
+    
+    result, error = _run_analytics('combination_counts', matrix, size)
+    if error:
+        return error
+    combinations, counts = result
+    data = [{
+        'numbers': [format_ball_number(type_code, int(number)) for number in combination],
+        'count': int(count)
+    } for combination, count in zip(combinations[:top], counts[:top])]
+    
+    return jsonify({'success': True, 'size': size, 'data': data})
+
+@api_bp.route('/lottery/<string:type_code>/analytics/distribution', methods=['GET'])
+@cached_by_data_version
+def get_analytics_distribution(type_code):
+    """和值、奇数个数、跨度的分布"""
+    matrix, error = _load_analytics_matrix(type_code)
+    if error:
+        return error
+    
+    result, error = _run_analytics('distributions', matrix)
+    if error:
+        return error
+    data = {
+        name: [{'value': value, 'count': count} for value, count in values]
+        for name, values in result.items()
+    }
+    return jsonify({'success': True, 'draws': matrix.draws, 'data': data})
+
+@api_bp.route('/lottery/<string:type_code>/analytics/rolling', methods=['GET'])
+@cached_by_data_version
+def get_analytics_rolling(type_code):
+    """最近last期的和值、奇数个数、跨度及window期滚动平均，?window=10&last=100&number=5"""
+    from analytics.analytics import rolling_rows
+    
+    window = request.args.get('window', default=10, type=int)
+    last = request.args.get('last', default=100, type=int)
+    number = request.args.get('number', type=int)
+    if window <= 0 or last <= 0:
+        return jsonify({'error': 'Parameters window and last must be positive'}), 400
+    
+    matrix, error = _load_analytics_matrix(type_code)
+    if error:
+        return error
+    
+    # 与/draws?contains=一样按彩票类型的号码范围校验
+    low, high = matrix.number_range or (0, matrix.size - 1)
+    if number is not None and not low <= number <= high:
+        return jsonify({'error': f'Parameter number must be between {low} and {high}'}), 400
+    
+    series, error = _run_analytics('rolling_series', matrix, window, last, number)
+    if error:
+        return error
+    data = rolling_rows(matrix, series)
+    return jsonify({'success': True, 'window': window, 'data': data, 'count': len(data)})
+
+# 导出字段，与/history返回的字段一致
+EXPORT_FIELDS = DRAW_FIELDS
+
+def _export_ndjson(batches):
+    """每行一个JSON对象，直接使用入库时预渲染的片段，每批行拼成一个数据块输出"""
+    for rows in batches:
+        yield ('\n'.join(row['result_json'] for row in rows) + '\n').encode('utf-8')
+
+def _export_csv(batches):
+    """CSV格式，号码保持逗号分隔文本，由csv模块负责加引号"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        writer.writerows([row[field] for field in EXPORT_FIELDS] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+def _gzip_stream(chunks):
+    """逐块gzip压缩，只在压缩器积累到足够数据时输出"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+EXPORT_FORMATS = {
+    'ndjson': (_export_ndjson, 'application/x-ndjson'),
+    'csv': (_export_csv, 'text/csv; charset=utf-8')
+}
+
+@api_bp.route('/lottery/<string:type_code>/export', methods=['GET'])
+def export_lottery_results(type_code):
+    """流式导出全部历史开奖结果，?format=ndjson|csv，客户端支持gzip时压缩传输
+    
+    结果按批从数据库游标读取并立即写出，不设置Content-Length，由服务器使用分块传输，
+    内存占用与历史数据量无关。
+    """
+    from models.models import iter_results
+    
+    export_format = request.args.get('format', default='ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Parameter format must be ndjson or csv'}), 400
+    
+    type_id = get_lottery_type_id(type_code)
+    if not type_id:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    serializer, mimetype = EXPORT_FORMATS[export_format]
+    chunks = serializer(iter_results(type_id))
+    headers = {
+        'Content-Disposition': f'attachment; filename={type_code}_history.{export_format}',
+        'Vary': 'Accept-Encoding'
+    }
+    if 'gzip' in request.accept_encodings:
+        chunks = _gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+SNAPSHOT_MIMETYPES = {
+    'arrow': 'application/vnd.apache.arrow.file',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+@api_bp.route('/lottery/<string:type_code>/snapshot.<string:fmt>', methods=['GET'])
+@conditional_by_data_version
+def get_lottery_snapshot(type_code, fmt):
+    """下载列式快照（snapshot.arrow或snapshot.parquet），数据版本未变化时复用已生成的文件"""
+    if fmt not in SNAPSHOT_MIMETYPES:
+        return jsonify({'error': 'Snapshot format must be arrow or parquet'}), 400
+    
+    try:
+        from models.snapshot import open_snapshot_file
+        snapshot = open_snapshot_file(type_code, fmt)
+    except ImportError:
+        return jsonify({'error': 'Snapshot export requires pyarrow'}), 501
+    if snapshot is None:
+        return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    # 发送已打开的文件，之后快照被清理也不影响本次下载；send_file交给WSGI服务器的file_wrapper发送，
+    # gunicorn下使用sendfile零拷贝
+    return send_file(snapshot, mimetype=SNAPSHOT_MIMETYPES[fmt], as_attachment=True,
+                     download_name=f'{type_code}_snapshot.{fmt}', conditional=False, etag=False)
+
 @api_bp.route('/lottery/types', methods=['GET'])
+@conditional_by_all_data_versions
 def get_lottery_types():
     """获取所有支持的彩票类型"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     cursor.execute('SELECT id, name, code, description FROM lottery_type')
     types = cursor.fetchall()
@@ -209,9 +539,64 @@ def get_cleanup_logs_api():
         'count': len(logs)
     })
 
+@api_bp.route('/admin/db/pool', methods=['GET'])
+def get_db_pool_stats():
+    """获取数据库连接池统计信息"""
+    from models.models import get_pool_stats
+    
+    return jsonify({
+        'success': True,
+        'data': get_pool_stats()
+    })
+
+@api_bp.route('/admin/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """获取API响应缓存的命中率和内存占用"""
+    return jsonify({
+        'success': True,
+        'data': get_response_cache().stats()
+    })
+
+@api_bp.route('/admin/cache', methods=['DELETE'])
+def clear_cache():
+    """清空API响应缓存"""
+    get_response_cache().clear()
+    return jsonify({
+        'success': True,
+        'message': '缓存已清空'
+    })
+
+@api_bp.route('/admin/analytics/pool', methods=['GET'])
+def get_analytics_pool_stats():
+    """获取号码分析进程池的排队和执行统计"""
+    from analytics.offload import get_analytics_pool
+    
+    return jsonify({
+        'success': True,
+        'data': get_analytics_pool().stats()
+    })
+
+@api_bp.route('/admin/stats/rebuild', methods=['POST'])
+def rebuild_stats():
+    """全量重建号码统计表，?type=ssq时只重建指定类型"""
+    from models.models import rebuild_ball_stats
+    
+    type_code = request.args.get('type')
+    type_id = None
+    if type_code:
+        type_id = get_lottery_type_id(type_code)
+        if not type_id:
+            return jsonify({'error': 'Invalid lottery type'}), 400
+    
+    count = rebuild_ball_stats(type_id)
+    return jsonify({
+        'success': True,
+        'message': f'已重建{count}个彩票类型的号码统计'
+    })
+
 @api_bp.route('/crawl')
 def crawl_data():
-    """手动触发数据爬取"""
+    """手动触发数据爬取，?mode=async时并发爬取所有彩票类型"""
     try:
         from crawler.crawler import LotteryCrawler
         import time
@@ -221,13 +606,22 @@ def crawl_data():
         # 爬取所有彩票类型
         lottery_types = ['ssq', 'kl8', '3d', 'qlc']
         result = {}
-        for lottery_type in lottery_types:
-            print(f"开始爬取{lottery_type}数据...")
-            try:
-                data = crawler.crawl_lottery_data(lottery_type, page_size=5)
-                result[lottery_type] = {"status": "success", "data": len(data) if isinstance(data, list) else data}
-            except Exception as e:
-                result[lottery_type] = {"status": "error", "message": str(e)}
+        if request.args.get('mode') == 'async':
+            import asyncio
+            counts = asyncio.run(crawler.crawl_all_lottery_data_async(page_size=5, lottery_codes=lottery_types))
+            for lottery_type, data in counts.items():
+                if isinstance(data, Exception):
+                    result[lottery_type] = {"status": "error", "message": str(data)}
+                else:
+                    result[lottery_type] = {"status": "success", "data": data}
+        else:
+            for lottery_type in lottery_types:
+                print(f"开始爬取{lottery_type}数据...")
+                try:
+                    data = crawler.crawl_lottery_data(lottery_type, page_size=5)
+                    result[lottery_type] = {"status": "success", "data": len(data) if isinstance(data, list) else data}
+                except Exception as e:
+                    result[lottery_type] = {"status": "error", "message": str(e)}
         
         elapsed_time = time.time() - start_time
         print(f"爬取完成，耗时：{elapsed_time:.2f}秒")
@@ -0,0 +1,318 @@
+"""
+API响应缓存与条件请求
+
+开奖数据一天只变化几次，/latest、/history、/stats等接口的响应可以直接复用。缓存键由请求路径、
+查询参数和彩票类型的数据版本号组成：爬虫写入新数据时data_version加一，旧版本的缓存自然不再命中，
+无需主动清除。每次请求只需一次按主键读取版本号的查询，多个worker之间也无需互相通知。
+
+同一数据版本还用于生成ETag和Last-Modified：客户端带If-None-Match轮询时，版本未变直接返回304，
+不查询开奖数据也不生成响应体。
+
+缓存后端：
+    memory  进程内LRU+TTL缓存（默认）
+    file    本地目录中的文件缓存，多个gunicorn worker可以共享，目录放在/dev/shm下即为共享内存
+"""
+
+import datetime
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+
+from config.config import Config
+
+class MemoryCacheBackend:
+    """进程内LRU缓存，按条目数和总字节数两个上限淘汰最久未使用的条目"""
+    
+    name = 'memory'
+    
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+    
+    def set(self, key, payload, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = (time.time() + ttl, payload)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions
+            }
+    
+    def _remove(self, key):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+class FileCacheBackend:
+    """文件缓存，每个条目一个文件，文件头记录过期时间，多个进程可共享同一目录
+    
+    写入先写临时文件再原子替换，读取方不会看到写了一半的内容；条目数超过上限时按修改时间删除最旧的文件。
+    """
+    
+    name = 'file'
+    
+    def __init__(self, directory, max_entries=1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+    
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline()
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        if float(header) <= time.time():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return payload
+    
+    def set(self, key, payload, ttl):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(f'{time.time() + ttl}\n'.encode('ascii'))
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+        self._prune()
+    
+    def clear(self):
+        for path in self._files():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def stats(self):
+        files = self._files()
+        return {
+            'entries': len(files),
+            'bytes': sum(os.path.getsize(path) for path in files if os.path.exists(path)),
+            'max_entries': self.max_entries,
+            'directory': self.directory,
+            'evictions': self.evictions
+        }
+    
+    def _files(self):
+        return [entry.path for entry in os.scandir(self.directory) if entry.name.endswith('.cache')]
+    
+    def _prune(self):
+        files = self._files()
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+class ResponseCache:
+    """按数据版本失效的响应缓存，统计命中率"""
+    
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def build_key(self, data_version):
+        # 带上版本更新时间，数据库重建后版本号从头计数也不会命中文件缓存中的旧条目
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        return f"{request.path}?{args}#v{data_version['version']}@{data_version['updated_at']}"
+    
+    def get(self, key):
+        payload = self.backend.get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+    
+    def set(self, key, payload):
+        self.backend.set(key, payload, self.ttl)
+    
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'backend': self.backend.name,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            **self.backend.stats()
+        }
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def create_backend(name=None):
+    """按配置创建缓存后端"""
+    name = name or Config.API_CACHE_BACKEND
+    if name == 'file':
+        return FileCacheBackend(Config.API_CACHE_DIR, Config.API_CACHE_MAX_ENTRIES)
+    if name == 'memory':
+        return MemoryCacheBackend(Config.API_CACHE_MAX_ENTRIES, Config.API_CACHE_MAX_BYTES)
+    raise ValueError(f"未知的缓存后端：{name}")
+
+def get_response_cache():
+    """获取全局响应缓存，首次调用时按配置创建"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(create_backend(), Config.API_CACHE_TTL_SECONDS)
+    return _response_cache
+
+def set_response_cache(cache):
+    """替换全局响应缓存，便于切换后端或在基准测试中使用独立实例"""
+    global _response_cache
+    _response_cache = cache
+
+def data_version_etag(data_version):
+    """由数据版本生成强ETag（不含引号）：彩票类型、版本号、记录数和最新期号"""
+    return f"{data_version['code']}-{data_version['version']}-{data_version['row_count']}-{data_version['max_issue'] or 0}"
+
+def data_version_last_modified(data_version):
+    """以数据版本的更新时间（UTC）作为Last-Modified，当天的更正和补录也会改变；尚无数据时返回None
+    
+    没有更新时间的旧记录退回使用最新一期的开奖日期。
+    """
+    if data_version['updated_at']:
+        return datetime.datetime.strptime(data_version['updated_at'][:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=datetime.timezone.utc)
+    if not data_version['max_draw_date']:
+        return None
+    return datetime.datetime.strptime(data_version['max_draw_date'][:10], '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # 允许客户端缓存，但每次使用前都要带If-None-Match重新验证
+    response.cache_control.no_cache = True
+    return response
+
+def _not_modified(etag, last_modified):
+    """构造304响应，不需要执行视图函数，也就不会查询开奖数据"""
+    return _set_validators(Response(status=304), etag, last_modified)
+
+def _data_version_view(view, use_cache):
+    @functools.wraps(view)
+    def wrapper(type_code, *args, **kwargs):
+        from models.models import get_data_version
+        
+        data_version = get_data_version(type_code)
+        if data_version is None:
+            return view(type_code, *args, **kwargs)
+        
+        etag = data_version_etag(data_version)
+        last_modified = data_version_last_modified(data_version)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            return _not_modified(etag, last_modified)
+        
+        use_response_cache = use_cache and Config.API_CACHE_ENABLED
+        if use_response_cache:
+            cache = get_response_cache()
+            key = cache.build_key(data_version)
+            payload = cache.get(key)
+            if payload is not None:
+                return _set_validators(Response(payload, mimetype='application/json'), etag, last_modified)
+        
+        response = view(type_code, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            if use_response_cache:
+                cache.set(key, response.get_data())
+            _set_validators(response, etag, last_modified)
+        return response
+    return wrapper
+
+def cached_by_data_version(view):
+    """以type_code为参数的GET接口：支持ETag/Last-Modified条件请求，并缓存200响应
+    
+    数据版本只需一次按主键的查询；If-None-Match或If-Modified-Since匹配时直接返回304，
+    未匹配时优先使用响应缓存，数据版本变化后缓存和ETag同时失效。
+    """
+    return _data_version_view(view, use_cache=True)
+
+def conditional_by_data_version(view):
+    """只支持条件请求、不缓存响应体，用于文件下载等不适合放入缓存的接口"""
+    return _data_version_view(view, use_cache=False)
+
+def conditional_by_all_data_versions(view):
+    """不区分彩票类型的GET接口：ETag由所有类型的数据版本合成，Last-Modified取最晚的数据版本更新时间"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        from models.models import get_all_data_versions
+        
+        data_versions = get_all_data_versions()
+        digest = hashlib.sha1('|'.join(data_version_etag(row) for row in data_versions).encode('utf-8'))
+        etag = f'all-{digest.hexdigest()[:16]}'
+        dates = [date for date in map(data_version_last_modified, data_versions) if date is not None]
+        last_modified = max(dates) if dates else None
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            return _not_modified(etag, last_modified)
+        
+        response = view(*args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            _set_validators(response, etag, last_modified)
+        return response
+    return wrapper
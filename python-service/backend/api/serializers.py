@@ -0,0 +1,49 @@
+"""
+JSON序列化
+
+orjson可用时用orjson序列化（直接输出UTF-8字节，比标准库json快数倍），不可用时退回标准库json。
+两种实现输出的字节一致：紧凑分隔符、不转义非ASCII字符，已存入数据库的预渲染片段不受切换影响。
+
+开奖结果在入库时由models.render按DRAW_FIELDS渲染成JSON片段存入lottery_result.result_json，
+/latest、/history等列表接口只需读出片段按字节拼接，不再逐行构造字典再序列化整个响应。
+"""
+
+import json
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+from models.render import DRAW_FIELDS, render_draw
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj, default=None):
+    """序列化为紧凑的UTF-8 JSON字节"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def draw_list_response(fragments, **fields):
+    """列表接口的响应：预渲染的开奖片段按字节拼接为data数组，fields为其余顶层字段
+    
+    响应为{"success":true,"data":[...],"count":N,...}，与逐行构造字典后jsonify的结构相同。
+    """
+    head = b'{"success":true,"data":[' + ','.join(fragments).encode('utf-8') + b']'
+    tail = b''.join(b',' + dumps(name) + b':' + dumps(value) for name, value in fields.items())
+    return Response(head + tail + b'}', mimetype='application/json')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask的JSON提供者：jsonify改用dumps序列化，不支持的类型仍按Flask默认规则转换
+    
+    与默认提供者不同，输出始终紧凑且不对键排序。
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=self.default).decode('utf-8')
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, default=self.default), mimetype=self.mimetype)
@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+import threading
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,136 +12,139 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, base_dir)
 logger.info(f"添加到Python路径: {base_dir}")
 logger.info(f"当前工作目录: {os.getcwd()}")
-logger.info(f"环境变量: {os.environ}")
 
-# 尝试导入所有依赖
-logger.info("开始导入依赖...")
-try:
-    from flask import Flask
-    logger.info("成功导入Flask")
-except Exception as e:
-    logger.error(f"导入Flask失败: {e}")
-    raise
+# 启动时只导入处理请求必需的模块：爬虫、APScheduler、分析模块在用到时才导入，
+# 数据库初始化推迟到第一个请求，Serverless冷启动和/health不再为它们付出导入时间
+from flask import Flask, request
 
-try:
-    from flask_cors import CORS
-    logger.info("成功导入Flask-CORS")
-except Exception as e:
-    logger.error(f"导入Flask-CORS失败: {e}")
-    raise
-
-try:
-    from models.models import init_db, clean_old_data
-    logger.info("成功导入models")
-except Exception as e:
-    logger.error(f"导入models失败: {e}")
-    raise
-
-try:
-    from api.api import api_bp
-    logger.info("成功导入api_bp")
-except Exception as e:
-    logger.error(f"导入api_bp失败: {e}")
-    raise
-
-try:
-    from scheduler import LotteryScheduler
-    logger.info("成功导入LotteryScheduler")
-except Exception as e:
-    logger.error(f"导入LotteryScheduler失败: {e}")
-    raise
+# 设置定时数据清理任务
+# 多进程部署（gunicorn）时每个worker都会执行到这里，通过文件锁选出一个进程运行调度器
+scheduler = None
+scheduler_lock = None
 
-try:
+def start_cleanup_scheduler():
+    """创建并启动后台调度器"""
+    global scheduler
     from apscheduler.schedulers.background import BackgroundScheduler
-    logger.info("成功导入APScheduler")
-except Exception as e:
-    logger.error(f"导入APScheduler失败: {e}")
-    raise
-
-try:
-    from crawler.crawler import LotteryCrawler
-    logger.info("成功导入LotteryCrawler")
-except Exception as e:
-    logger.error(f"导入LotteryCrawler失败: {e}")
-    raise
-
-# 创建Flask应用
-app = Flask(__name__)
-logger.info("Flask应用创建成功")
-
-# 配置CORS，允许前端跨域访问
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-logger.info("CORS配置成功")
-
-# 注册API蓝图
-app.register_blueprint(api_bp, url_prefix='/api')
-logger.info("API蓝图注册成功")
-
-# 初始化数据库
-try:
-    init_db()
-    logger.info("数据库初始化成功")
-except Exception as e:
-    logger.error(f"数据库初始化失败: {e}")
-    # 继续运行，即使数据库初始化失败
-
-# 设置定时数据清理任务
-try:
+    from models.models import clean_old_data, releases_connections
+    
+    scheduler = BackgroundScheduler()
+    
+    # 添加每周执行一次的清理任务（每周凌晨2点执行）
+    scheduler.add_job(
+        releases_connections(clean_old_data),
+        'cron',
+        day_of_week='sun',
+        hour=2,
+        minute=0,
+        id='clean_old_data_job',
+        replace_existing=True
+    )
+    
+    # 启动调度器
+    scheduler.start()
+    logger.info(f"数据清理定时任务已在进程{os.getpid()}中启动，每周日凌晨2点执行")
+
+def start_background_jobs():
+    """参与调度器选主，在后台线程中进行，不阻塞应用启动"""
+    global scheduler_lock
     # 在Serverless环境中，APScheduler的cron任务可能无法正常工作
     # 只在本地环境中启动调度器
-    if not os.environ.get('VERCEL_ENV'):
-        logger.info("本地环境，启动APScheduler")
-        # 创建后台调度器
-        scheduler = BackgroundScheduler()
-        
-        # 添加每周执行一次的清理任务（每周凌晨2点执行）
-        scheduler.add_job(
-            clean_old_data, 
-            'cron', 
-            day_of_week='sun', 
-            hour=2, 
-            minute=0,
-            id='clean_old_data_job',
-            replace_existing=True
-        )
-        
-        # 启动调度器
-        scheduler.start()
-        logger.info("数据清理定时任务已启动，每周日凌晨2点执行")
-    else:
+    if os.environ.get('VERCEL_ENV'):
         logger.info("Serverless环境，跳过APScheduler启动")
-except Exception as e:
-    logger.error(f"启动定时任务失败：{str(e)}")
-    logger.info("在Serverless环境中，定时任务可能需要外部触发")
-
-# 手动触发爬取的API接口已移至api.py蓝图中
-
-@app.route('/')
-def index():
-    """应用首页"""
-    logger.info("收到根路径请求")
-    return "彩票数据API服务正在运行中..."
-
-@app.route('/health')
-def health_check():
-    """健康检查接口"""
-    logger.info("收到健康检查请求")
-    try:
-        # 尝试进行简单的数据库查询，验证数据库连接
-        from models.models import get_db_connection
-        conn = get_db_connection(read_only=True)
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1')
-        cursor.fetchone()
-        conn.close()
-        return {"status": "ok", "database": "connected"}
-    except Exception as e:
-        logger.error(f"健康检查数据库连接失败：{e}")
-        # 即使数据库连接失败，也返回基本的健康状态
-        return {"status": "ok", "database": f"error: {str(e)}"}
+        return
+    
+    from scheduler import SchedulerLock
+    scheduler_lock = SchedulerLock()
+    
+    def elect():
+        try:
+            if not scheduler_lock.run_when_elected(start_cleanup_scheduler):
+                logger.info(f"定时任务已由其他进程运行，进程{os.getpid()}作为备用等待接管")
+        except Exception as e:
+            logger.error(f"启动定时任务失败：{str(e)}")
+    
+    threading.Thread(target=elect, name='scheduler-start', daemon=True).start()
+
+def stop_background_jobs():
+    """停止调度器并释放选主锁，供gunicorn的worker_exit钩子调用"""
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
+    if scheduler_lock is not None:
+        scheduler_lock.release()
+
+def create_app(start_jobs=True):
+    """创建Flask应用，start_jobs为False时不启动定时任务（测试、基准测试）"""
+    from flask_cors import CORS
+    from api.api import api_bp
+    from api.serializers import FastJSONProvider
+    from models.models import ensure_db, release_thread_connections
+    
+    # 创建Flask应用
+    app = Flask(__name__)
+    
+    # jsonify使用orjson序列化（未安装时退回标准库json）
+    app.json = FastJSONProvider(app)
+    
+    # 配置CORS，允许前端跨域访问
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    
+    # 注册API蓝图
+    app.register_blueprint(api_bp, url_prefix='/api')
+    
+    # 第一个访问数据库的请求到来时初始化数据库（建表、迁移），同一进程只检查一次；
+    # 首页和健康检查不依赖表结构，不触发初始化
+    @app.before_request
+    def initialize_database():
+        if request.endpoint in ('index', 'health_check'):
+            return
+        try:
+            ensure_db()
+        except Exception as e:
+            logger.error(f"数据库初始化失败: {e}")
+            # 继续运行，即使数据库初始化失败
+    
+    # 请求结束时归还当前线程仍持有的数据库连接
+    @app.teardown_appcontext
+    def release_db_connections(exception=None):
+        release_thread_connections()
+    
+    # 手动触发爬取的API接口已移至api.py蓝图中
+    
+    @app.route('/')
+    def index():
+        """应用首页"""
+        logger.info("收到根路径请求")
+        return "彩票数据API服务正在运行中..."
+    
+    @app.route('/health')
+    def health_check():
+        """健康检查接口"""
+        logger.info("收到健康检查请求")
+        try:
+            # 尝试进行简单的数据库查询，验证数据库连接
+            from models.models import get_db_connection
+            conn = get_db_connection(read_only=True)
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            conn.close()
+            return {"status": "ok", "database": "connected"}
+        except Exception as e:
+            logger.error(f"健康检查数据库连接失败：{e}")
+            # 即使数据库连接失败，也返回基本的健康状态
+            return {"status": "ok", "database": f"error: {str(e)}"}
+    
+    if start_jobs:
+        start_background_jobs()
+    logger.info("Flask应用创建成功")
+    return app
+
+# gunicorn（app:app）和Vercel通过模块级的app调用
+app = create_app()
 
 # 在Vercel环境中，应用通过WSGI调用，不需要直接运行
-# 但仍需要保留__main__块用于本地开发
+# 生产环境使用gunicorn（gunicorn -c gunicorn.conf.py），__main__块只用于本地开发
 if __name__ == '__main__':
     # 获取端口号，默认8080
     port = int(os.environ.get('PORT', 8080))
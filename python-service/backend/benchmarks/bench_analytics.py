@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码分析基准测试：对比逐期循环的纯Python实现与analytics模块的NumPy向量化实现，并校验结果一致
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_analytics --days 3650
+"""
+
+import argparse
+import itertools
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+import models.models as models
+from analytics import analytics
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label}: {elapsed:.2f}毫秒")
+    return result, elapsed
+
+def python_omission(draws, size):
+    """逐期循环计算遗漏表"""
+    current = [0] * size
+    max_gap = [0] * size
+    for balls in draws:
+        drawn = set(balls)
+        for number in range(size):
+            if number in drawn:
+                max_gap[number] = max(max_gap[number], current[number])
+                current[number] = 0
+            else:
+                current[number] += 1
+    return current, [max(m, c) for m, c in zip(max_gap, current)]
+
+def python_hot(draws, window, top):
+    counts = Counter(ball for balls in draws[-window:] for ball in balls)
+    numbers = range(min(min(balls) for balls in draws), max(max(balls) for balls in draws) + 1)
+    return sorted(((n, counts[n]) for n in numbers), key=lambda item: (-item[1], item[0]))[:top]
+
+def python_combinations(draws, size):
+    counts = Counter(combo for balls in draws for combo in itertools.combinations(sorted(balls), size))
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+def python_distributions(draws):
+    result = {}
+    for name, metric in (('sum', sum), ('odd', lambda balls: sum(b % 2 for b in balls)), ('span', lambda balls: max(balls) - min(balls))):
+        result[name] = sorted(Counter(metric(balls) for balls in draws).items())
+    return result
+
+def python_rolling(draws, window, last):
+    """逐期计算和值、奇数个数、跨度及其滚动平均，输出最近last期"""
+    metrics = [(sum(balls), sum(b % 2 for b in balls), max(balls) - min(balls)) for balls in draws]
+    rows = []
+    for i in range(len(draws) - last, len(draws)):
+        recent = metrics[max(i - window + 1, 0):i + 1]
+        row = {}
+        for position, name in enumerate(('sum', 'odd', 'span')):
+            row[name] = metrics[i][position]
+            row[f'{name}_ma'] = round(sum(m[position] for m in recent) / len(recent), 4)
+        rows.append(row)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="纯Python与NumPy号码分析耗时对比")
+    parser.add_argument("--days", type=int, default=3650, help="合成快乐8开奖期数（每日一期）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    Config.SNAPSHOT_DIR = tempfile.mkdtemp()
+    models.save_lottery_results_bulk(generate_draws("kl8", args.days))
+    
+    print("===== 号码分析基准测试 =====")
+    start = time.perf_counter()
+    matrix = analytics.load_draw_matrix("kl8")
+    print(f"载入号码矩阵（含生成快照）: {(time.perf_counter() - start) * 1000:.1f}毫秒, "
+          f"{matrix.draws}期 × {matrix.balls.shape[1]}个号码, {matrix.balls.nbytes / 1024:.1f}KB")
+    draws = matrix.balls.tolist()
+    
+    cases = [
+        ("遗漏表",
+         lambda: python_omission(draws, matrix.size),
+         lambda: analytics.omission_table(matrix),
+         lambda py, np_: py == (np_['current_gap'].tolist(), np_['max_gap'].tolist())),
+        ("冷热号",
+         lambda: python_hot(draws, 30, 10),
+         lambda: analytics.hot_cold(matrix, 30, 10),
+         lambda py, np_: py == np_[0]),
+        ("两码同现",
+         lambda: python_combinations(draws, 2),
+         lambda: analytics.combination_counts(matrix, 2),
+         lambda py, np_: [(tuple(c), n) for c, n in py[:50]] == list(zip(map(tuple, np_[0][:50].tolist()), np_[1][:50].tolist()))),
+        ("三码同现",
+         lambda: python_combinations(draws, 3),
+         lambda: analytics.combination_counts(matrix, 3),
+         lambda py, np_: [(tuple(c), n) for c, n in py[:50]] == list(zip(map(tuple, np_[0][:50].tolist()), np_[1][:50].tolist()))),
+        ("和值/奇偶/跨度分布",
+         lambda: python_distributions(draws),
+         lambda: analytics.distributions(matrix),
+         lambda py, np_: py == np_),
+        ("滚动窗口",
+         lambda: python_rolling(draws, 10, 100),
+         lambda: analytics.rolling(matrix, 10, 100),
+         lambda py, np_: all(np.isclose(a[k], b[k], atol=1e-3) for a, b in zip(py, np_) for k in a))
+    ]
+    for name, python_func, numpy_func, same in cases:
+        print(name)
+        python_result, python_ms = timed("纯Python", python_func, args.repeat)
+        numpy_result, numpy_ms = timed("NumPy", numpy_func, args.repeat)
+        assert same(python_result, numpy_result), f"{name}结果不一致"
+        print(f"  加速 {python_ms / numpy_ms:.1f}x")
+
+if __name__ == "__main__":
+    main()
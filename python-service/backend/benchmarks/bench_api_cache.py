@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应缓存基准测试：对比关闭/开启缓存时 /latest、/history、/stats 的每秒请求数，并验证写入新开奖后缓存失效
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_api_cache --requests 2000 --backend memory
+    python -m benchmarks.bench_api_cache --backend file
+"""
+
+import argparse
+import itertools
+import time
+
+import models.models as models
+from api.cache import ResponseCache, create_backend, set_response_cache
+from benchmarks.bench_pool import create_bench_app
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+URLS = [
+    '/api/lottery/kl8/latest?limit=10',
+    '/api/lottery/kl8/history?page=1&limit=20',
+    '/api/lottery/kl8/history?page=2&limit=20',
+    '/api/lottery/kl8/stats'
+]
+
+def run_requests(client, total):
+    """按URLS轮流请求total次，返回每秒请求数"""
+    start = time.perf_counter()
+    for url in itertools.islice(itertools.cycle(URLS), total):
+        response = client.get(url)
+        assert response.status_code == 200
+    return total / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="响应缓存前后吞吐量对比")
+    parser.add_argument("--requests", type=int, default=2000, help="每轮请求总数")
+    parser.add_argument("--days", type=int, default=3650, help="合成快乐8开奖期数")
+    parser.add_argument("--backend", choices=["memory", "file"], default="memory", help="缓存后端")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    draws = generate_draws("kl8", args.days + 1)
+    models.save_lottery_results_bulk(draws[1:])
+    cache = ResponseCache(create_backend(args.backend), Config.API_CACHE_TTL_SECONDS)
+    cache.clear()
+    set_response_cache(cache)
+    client = create_bench_app().test_client()
+    
+    Config.API_CACHE_ENABLED = False
+    without_cache = run_requests(client, args.requests)
+    
+    Config.API_CACHE_ENABLED = True
+    with_cache = run_requests(client, args.requests)
+    stats = cache.stats()
+    
+    # 写入新一期后同一URL应返回新数据
+    before = client.get(URLS[0]).get_json()['data'][0]['issue']
+    models.save_lottery_result(draws[0])
+    after = client.get(URLS[0]).get_json()['data'][0]['issue']
+    assert after == draws[0]['issue'] and before != after, "写入新开奖后缓存没有失效"
+    
+    print("===== 响应缓存基准测试 =====")
+    print(f"关闭缓存: {without_cache:.0f} 请求/秒")
+    print(f"开启缓存（{args.backend}）: {with_cache:.0f} 请求/秒 ({with_cache / without_cache:.1f}x)")
+    print(f"命中率: {stats['hit_ratio']:.2%}, 缓存条目: {stats['entries']}, 占用: {stats['bytes'] / 1024:.1f}KB")
+    print(f"写入新开奖后最新期号: {before} -> {after}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发爬取基准测试：在回放录制响应的本地桩服务器上对比顺序爬取与异步并发爬取的耗时
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_async_crawl --latency 0.3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import models.models as models
+from benchmarks.upstream import NOTICE_PATH, StubUpstream
+from crawler.crawler import LotteryCrawler
+
+def main():
+    parser = argparse.ArgumentParser(description="顺序爬取与异步并发爬取耗时对比")
+    parser.add_argument("--latency", type=float, default=0.3, help="桩服务器每次响应的延迟（秒）")
+    args = parser.parse_args()
+    
+    # 使用临时数据库，避免污染正式数据
+    models.DB_FILE = os.path.join(tempfile.mkdtemp(), "bench_lottery.db")
+    models.init_db()
+    
+    upstream = StubUpstream.from_fixtures(latency=args.latency)
+    stub_url = upstream.start()
+    crawler = LotteryCrawler(base_url=stub_url + NOTICE_PATH, home_url=stub_url + "/")
+    
+    start = time.perf_counter()
+    sequential_count = crawler.crawl_all_lottery_data(force=True, incremental=False)
+    sequential_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    concurrent_count = crawler.crawl_all_lottery_data(force=True, concurrent=True, incremental=False)
+    concurrent_elapsed = time.perf_counter() - start
+    
+    upstream.server.shutdown()
+    
+    print("\n===== 并发爬取基准测试 =====")
+    print(f"桩服务器延迟: {args.latency:.2f}秒")
+    print(f"顺序爬取: {sequential_count}期, 耗时{sequential_elapsed:.2f}秒")
+    print(f"并发爬取: {concurrent_count}期, 耗时{concurrent_elapsed:.2f}秒")
+    print(f"加速比: {sequential_elapsed / concurrent_elapsed:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史回填基准测试：在本地桩服务器上回填数年的合成开奖，对比单并发与多并发的吞吐量（期/秒），
+并检查中断后续传只请求未完成的区间、截止日期推后时只回填新增的日期、限速不超过设定值
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_backfill
+    python -m benchmarks.bench_backfill --days 2000 --latency 0.1 --workers 8 --rate 40
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import sys
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+from benchmarks.upstream import NOTICE_PATH, StubUpstream, to_notice_item
+from crawler.backfill import Backfill
+from crawler.crawler import LOTTERY_CODES, LotteryCrawler
+
+SINCE = datetime.date(2020, 1, 1)
+UNTIL = datetime.date(2025, 12, 31)
+
+def run_backfill(crawler, upstream, workers, rate, page_size, chunk_days, limit=None, until=UNTIL):
+    """执行一次回填，返回(统计, 上游请求次数)"""
+    upstream.requests = 0
+    backfill = Backfill(crawler, workers, rate, page_size=page_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = backfill.run(LOTTERY_CODES, SINCE, until, chunk_days, limit)
+    return stats, upstream.requests
+
+def stored_rows():
+    conn = models.get_db_connection(read_only=True)
+    count = conn.execute('SELECT COUNT(*) FROM lottery_result').fetchone()[0]
+    conn.close()
+    return count
+
+def check(name, passed):
+    print(f"  {'✅' if passed else '❌'} {name}")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description="历史回填吞吐量与断点续传检查")
+    parser.add_argument("--days", type=int, default=1500, help="每个彩票类型的合成开奖期数（每天一期）")
+    parser.add_argument("--latency", type=float, default=0.05, help="桩服务器每次响应的延迟（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="并发数")
+    parser.add_argument("--rate", type=float, default=50, help="每秒最多请求次数")
+    parser.add_argument("--page-size", type=int, default=30, help="每页期数（小于区间期数时需要翻页）")
+    parser.add_argument("--chunk-days", type=int, default=90, help="每个区间的天数")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        use_temp_db()
+        history = {code: [to_notice_item(draw) for draw in generate_draws(code, args.days, start_date=UNTIL)]
+                   for code in LOTTERY_CODES}
+    total = sum(len(draws) for draws in history.values())
+    upstream = StubUpstream(history, latency=args.latency)
+    for code in LOTTERY_CODES:
+        upstream.publish(code, args.days)
+    stub_url = upstream.start()
+    crawler = LotteryCrawler(base_url=stub_url + NOTICE_PATH, home_url=stub_url + "/")
+    results = []
+    
+    print("===== 历史回填基准测试 =====")
+    print(f"{len(LOTTERY_CODES)}个类型共{total}期，桩服务器延迟{args.latency:.2f}秒，每页{args.page_size}期，每个区间{args.chunk_days}天")
+    
+    # 单并发基线
+    single, single_requests = run_backfill(crawler, upstream, 1, args.rate, args.page_size, args.chunk_days)
+    print(f"单并发: {single_requests}次请求，{single.report()}")
+    
+    # 多并发，中途停止后续传
+    with contextlib.redirect_stdout(io.StringIO()):
+        use_temp_db()
+    half = single.chunks // 2
+    first, first_requests = run_backfill(crawler, upstream, args.workers, args.rate, args.page_size, args.chunk_days, limit=half)
+    partial_rows = stored_rows()
+    second, second_requests = run_backfill(crawler, upstream, args.workers, args.rate, args.page_size, args.chunk_days)
+    third, third_requests = run_backfill(crawler, upstream, args.workers, args.rate, args.page_size, args.chunk_days)
+    # 截止日期推后（如第二天再执行，默认截止到今天）时只回填新增的日期
+    later, later_requests = run_backfill(crawler, upstream, args.workers, args.rate, args.page_size, args.chunk_days,
+                                         until=UNTIL + datetime.timedelta(days=1))
+    
+    elapsed = first.elapsed() + second.elapsed()
+    issues = first.issues + second.issues
+    print(f"{args.workers}并发: {first_requests + second_requests}次请求，{issues}期，耗时{elapsed:.1f}秒，{issues / elapsed:.1f}期/秒"
+          f"（加速比{single.elapsed() / elapsed:.1f}x）")
+    print(f"  第一次执行{first.chunks}个区间后停止（已入库{partial_rows}期），续传{second.chunks}个区间，再次执行{third.chunks}个区间，"
+          f"截止日期推后一天执行{later.chunks}个区间（{later_requests}次请求）")
+    
+    results.append(check("单并发回填全部期数", single.issues == total and single.failed == 0))
+    results.append(check("续传只处理未完成的区间", first.chunks + second.chunks == single.chunks and second_requests < single_requests))
+    results.append(check("续传后入库期数完整", stored_rows() == total and first.issues + second.issues == total))
+    results.append(check("全部完成后再次执行不发送请求", third.chunks == 0 and third_requests == 0))
+    results.append(check("截止日期推后只回填新增的日期", later.chunks == len(LOTTERY_CODES) and later_requests == len(LOTTERY_CODES)))
+    rate_observed = second_requests / second.elapsed()
+    results.append(check(f"请求速率不超过限速（{rate_observed:.1f}次/秒 ≤ {args.rate:g}次/秒）",
+                         rate_observed <= args.rate + 4 / second.elapsed()))
+    
+    # 原爬虫每次请求前阻塞等待1~3秒且一次只请求一页，同样的请求数需要的时间
+    blocking = single_requests * (2 + args.latency)
+    print(f"\n原爬虫逐页顺序请求（每次等待1~3秒）估计耗时{blocking / 60:.0f}分钟，{total / blocking:.1f}期/秒")
+    upstream.server.shutdown()
+    
+    if not all(results):
+        print("\n历史回填检查未通过")
+        sys.exit(1)
+    print("\n历史回填检查通过")
+
+if __name__ == "__main__":
+    main()
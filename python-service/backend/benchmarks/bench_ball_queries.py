@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码查询基准测试：对比Python拆分字符串统计与lottery_ball索引、ball_stats统计表、红球位掩码查询
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_ball_queries --days 3650
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label}: {elapsed * 1000:.2f}毫秒/次")
+    return result
+
+def split_frequency(type_id):
+    """旧做法：读出全部red_balls字符串后在Python中拆分计数"""
+    conn = models.get_db_connection(read_only=True)
+    rows = conn.execute("SELECT red_balls FROM lottery_result WHERE type_id = ?", (type_id,)).fetchall()
+    conn.close()
+    counter = Counter()
+    for (red_balls,) in rows:
+        counter.update(int(ball) for ball in red_balls.split(','))
+    return counter
+
+def split_contains(type_id, numbers):
+    """旧做法：逐行拆分字符串判断是否包含全部号码"""
+    conn = models.get_db_connection(read_only=True)
+    rows = conn.execute(
+        "SELECT issue, red_balls FROM lottery_result WHERE type_id = ? ORDER BY draw_date DESC", (type_id,)
+    ).fetchall()
+    conn.close()
+    wanted = set(numbers)
+    return [issue for issue, red_balls in rows if wanted <= {int(ball) for ball in red_balls.split(',')}]
+
+def main():
+    parser = argparse.ArgumentParser(description="号码频率与包含查询耗时对比")
+    parser.add_argument("--days", type=int, default=3650, help="合成快乐8开奖期数（每日一期）")
+    parser.add_argument("--repeat", type=int, default=20, help="每种查询重复次数")
+    args = parser.parse_args()
+    
+    print("===== 号码查询基准测试 =====")
+    
+    use_temp_db()
+    draws = generate_draws("kl8", args.days)
+    models.save_lottery_results_bulk(draws)
+    type_id = draws[0]["type_id"]
+    numbers = [5, 18, 42]
+    
+    expected = split_frequency(type_id)
+    timed("频率统计（Python拆分）", lambda: split_frequency(type_id), args.repeat)
+    counts = timed("频率统计（lottery_ball索引）", lambda: models.get_ball_frequency(type_id, 'red'), args.repeat)
+    assert dict(counts) == dict(expected), "两种频率统计结果不一致"
+    stats = timed("频率统计（ball_stats统计表）", lambda: models.get_ball_stats(type_id, 'red'), args.repeat)
+    assert {row["number"]: row["hit_count"] for row in stats} == dict(expected), "号码统计表与实时统计不一致"
+    
+    expected = split_contains(type_id, numbers)
+    timed("包含查询（Python拆分）", lambda: split_contains(type_id, numbers), args.repeat)
+    rows, total = timed("包含查询（位掩码）", lambda: models.get_draws_containing(type_id, numbers, len(expected) or 1), args.repeat)
+    assert [row["issue"] for row in rows] == expected[:len(rows)] and total == len(expected), "两种包含查询结果不一致"
+    print(f"  同时包含{numbers}的期数: {total}")
+
+if __name__ == "__main__":
+    main()
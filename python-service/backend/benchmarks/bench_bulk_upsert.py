@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入基准测试：对比逐条save_lottery_result与save_lottery_results_bulk写入合成快乐8数据，
+并统计每个阶段写入WAL的字节数（内容未变化的重复数据不应产生写入）
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_bulk_upsert --rows 10000
+"""
+
+import argparse
+import os
+import time
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+def wal_size():
+    wal_file = models.DB_FILE + '-wal'
+    return os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+
+def timed(label, func, rows):
+    models.checkpoint_wal('TRUNCATE')
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.2f}秒, {rows / elapsed:.0f}行/秒, 写入WAL {wal_size() / 1024:.0f}KB")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="逐条写入与批量写入耗时对比")
+    parser.add_argument("--rows", type=int, default=10000, help="合成数据行数")
+    parser.add_argument("--chunk-size", type=int, default=500, help="批量写入每个事务的行数")
+    args = parser.parse_args()
+    
+    print("===== 批量写入基准测试 =====")
+    
+    use_temp_db()
+    draws = generate_draws("kl8", args.rows)
+    timed("逐条写入（每行一个事务）", lambda: [models.save_lottery_result(d) for d in draws], args.rows)
+    
+    use_temp_db()
+    draws = generate_draws("kl8", args.rows)
+    summary = timed("批量写入（新数据）", lambda: models.save_lottery_results_bulk(draws, args.chunk_size), args.rows)
+    print(f"  新增{summary['inserted']}, 更新{summary['updated']}, 未变化{summary['unchanged']}")
+    
+    summary = timed("批量写入（重复数据）", lambda: models.save_lottery_results_bulk(draws, args.chunk_size), args.rows)
+    print(f"  新增{summary['inserted']}, 更新{summary['updated']}, 未变化{summary['unchanged']}")
+    
+    for draw in draws[::10]:
+        draw["sales"] = str(int(draw["sales"]) + 1)
+    summary = timed("批量写入（10%有变化）", lambda: models.save_lottery_results_bulk(draws, args.chunk_size), args.rows)
+    print(f"  新增{summary['inserted']}, 更新{summary['updated']}, 未变化{summary['unchanged']}")
+
+if __name__ == "__main__":
+    main()
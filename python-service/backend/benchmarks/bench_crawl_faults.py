@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫上游故障基准测试：在回放录制响应的本地桩服务器（benchmarks.upstream）上，不访问网络地测量
+并发爬取吞吐量，并检查5xx重试、放弃重试、上游限流（429）和按主机并发上限的行为
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_crawl_faults
+    python -m benchmarks.bench_crawl_faults --latency 0.1 --rounds 20 --error-rate 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+from benchmarks.synthetic import use_temp_db
+from benchmarks.upstream import NOTICE_PATH, StubUpstream
+from config.config import Config
+from crawler.crawler import LOTTERY_CODES, LotteryCrawler
+
+def crawl_async(crawler):
+    """异步并发爬取全部类型，返回{彩票代码: 期数或异常}"""
+    return asyncio.run(crawler.crawl_all_lottery_data_async(force=True, incremental=False))
+
+def crawl_sync(crawler):
+    return {code: crawler.crawl_lottery_data(code, 30, force=True, incremental=False) for code in LOTTERY_CODES}
+
+def run(upstream, crawl, crawler):
+    """执行一次爬取，返回(各类型期数, 耗时)，爬虫输出不打印"""
+    upstream.reset_stats()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = crawl(crawler)
+    return counts, time.perf_counter() - start
+
+def check(name, passed):
+    print(f"  {'✅' if passed else '❌'} {name}")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地桩服务器上测量爬虫吞吐量、重试、限流和并发上限")
+    parser.add_argument("--latency", type=float, default=0.05, help="桩服务器每次响应的延迟（秒）")
+    parser.add_argument("--rounds", type=int, default=10, help="吞吐量测试的爬取轮数")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="随机错误测试中返回5xx的比例")
+    parser.add_argument("--concurrency", type=int, default=2, help="并发上限测试中同一主机的最大并发数")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        use_temp_db()
+    upstream = StubUpstream.from_fixtures(latency=args.latency)
+    stub_url = upstream.start()
+    crawler = LotteryCrawler(base_url=stub_url + NOTICE_PATH, home_url=stub_url + "/")
+    crawler.request_delay = (0, 0)
+    # 退避等待只影响耗时，不影响重试次数
+    Config.CRAWLER_RETRY_DELAY = 0.01
+    Config.CRAWLER_RATE_PER_SECOND = 1000
+    Config.CRAWLER_BURST = 1000
+    recorded = {code: len(draws) for code, draws in upstream.history.items()}
+    codes = len(LOTTERY_CODES)
+    retries = Config.CRAWLER_MAX_RETRIES
+    results = []
+    
+    print("===== 爬虫上游故障基准测试 =====")
+    print(f"回放{sum(recorded.values())}期录制数据，桩服务器延迟{args.latency:.2f}秒，最多尝试{retries}次")
+    
+    # 吞吐量：没有故障时异步并发爬取
+    requests = 0
+    elapsed = 0
+    for _ in range(args.rounds):
+        counts, seconds = run(upstream, crawl_async, crawler)
+        requests += upstream.requests
+        elapsed += seconds
+    issues = sum(recorded.values()) * args.rounds
+    print(f"吞吐量: {args.rounds}轮{requests}次请求，耗时{elapsed:.2f}秒，{requests / elapsed:.1f}次/秒，{issues / elapsed:.0f}期/秒")
+    results.append(check("没有故障时每个类型请求一次并取得全部录制数据", requests == codes * args.rounds and counts == recorded))
+    
+    # 前几次请求返回5xx，在重试次数内恢复
+    for name, crawl in (("同步", crawl_sync), ("异步", crawl_async)):
+        upstream.fail_first = retries - 1
+        counts, _ = run(upstream, crawl, crawler)
+        results.append(check(f"{name}爬取：前{retries - 1}次返回{upstream.error_statuses[0]}时重试后取得全部数据"
+                             f"（{upstream.requests}次请求）", counts == recorded and upstream.requests == codes * retries))
+        
+        # 每次都失败时尝试retries次后放弃，不再继续请求
+        upstream.fail_first = retries
+        counts, _ = run(upstream, crawl, crawler)
+        results.append(check(f"{name}爬取：持续失败时每个类型只尝试{retries}次后放弃",
+                             all(upstream.requests_by_code[code] == retries for code in LOTTERY_CODES)
+                             and all(counts[code] != recorded[code] for code in LOTTERY_CODES)))
+    upstream.fail_first = 0
+    
+    # 随机5xx/4xx：统计重试后的成功率
+    upstream.error_rate = args.error_rate
+    upstream.error_statuses = (500, 502, 503, 403)
+    succeeded = 0
+    requests = 0
+    for _ in range(args.rounds):
+        counts, _ = run(upstream, crawl_async, crawler)
+        succeeded += sum(1 for code in LOTTERY_CODES if counts[code] == recorded[code])
+        requests += upstream.requests
+    expected = 1 - args.error_rate ** retries
+    print(f"随机错误{args.error_rate:.0%}: {args.rounds * codes}次爬取成功{succeeded}次，共{requests}次请求"
+          f"（理论成功率{expected:.1%}）")
+    results.append(check("随机错误时重试使成功率高于单次请求", succeeded / (args.rounds * codes) > 1 - args.error_rate))
+    upstream.error_rate = 0
+    upstream.error_statuses = (500, 502, 503)
+    
+    # 上游限流：令牌桶限速不超过上游限制时不会触发429
+    upstream.throttle_rate = 2
+    Config.CRAWLER_RATE_PER_SECOND = 1.5
+    Config.CRAWLER_BURST = 1
+    counts, seconds = run(upstream, crawl_async, crawler)
+    results.append(check(f"限速（1.5次/秒）低于上游限制（2次/秒）时没有429（{seconds:.2f}秒）",
+                         upstream.statuses[429] == 0 and counts == recorded))
+    Config.CRAWLER_RATE_PER_SECOND = 1000
+    Config.CRAWLER_BURST = 1000
+    counts, _ = run(upstream, crawl_async, crawler)
+    results.append(check(f"不限速时触发{upstream.statuses[429]}次429，重试后取得{sum(1 for code in LOTTERY_CODES if counts[code] == recorded[code])}个类型的数据",
+                         upstream.statuses[429] > 0))
+    upstream.throttle_rate = None
+    
+    # 按主机并发上限
+    Config.CRAWLER_MAX_CONCURRENCY_PER_HOST = args.concurrency
+    upstream.latency = max(args.latency, 0.1)
+    counts, _ = run(upstream, crawl_async, crawler)
+    results.append(check(f"同一主机同时处理中的请求不超过{args.concurrency}个（最多{upstream.max_in_flight}个）",
+                         upstream.max_in_flight == args.concurrency and counts == recorded))
+    
+    upstream.server.shutdown()
+    
+    if not all(results):
+        print("\n爬虫上游故障检查未通过")
+        sys.exit(1)
+    print("\n爬虫上游故障检查通过")
+
+if __name__ == "__main__":
+    main()
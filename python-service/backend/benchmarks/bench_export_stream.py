@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出基准测试：导出大量合成开奖数据，记录耗时和进程内存峰值（RSS）
+
+合成数据直接用SQL递归CTE写入lottery_result，生成阶段不占用Python内存。分别导出较少行数和全部行数，
+两次导出后的峰值RSS应基本相同，说明内存占用与历史数据量无关。
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_export_stream --rows 1000000
+"""
+
+import argparse
+import resource
+import time
+
+import models.models as models
+from benchmarks.bench_pool import create_bench_app
+from benchmarks.synthetic import use_temp_db
+
+def peak_rss_mb():
+    """当前进程的峰值RSS（Linux上ru_maxrss单位为KB）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def fill_results(type_id, rows):
+    """用递归CTE生成rows期合成开奖数据，每天三期"""
+    conn = models.get_db_connection()
+    conn.execute('''
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n + 1 < ?)
+        INSERT INTO lottery_result (type_id, issue, draw_date, red_balls, blue_balls, sales, pool_money,
+                                    first_prize_count, first_prize_amount, second_prize_count, second_prize_amount)
+        SELECT ?, printf('%08d', n), date('2025-12-31', printf('-%d days', n / 3)),
+               printf('%02d,%02d,%02d,%02d,%02d,%02d', n % 5 + 1, n % 7 + 6, n % 11 + 13, n % 3 + 24, n % 4 + 27, n % 2 + 31),
+               printf('%02d', n % 16 + 1), CAST(100000000 + n AS TEXT), CAST(2000000000 + n AS TEXT),
+               n % 10, '5000000', n % 100, '200000'
+        FROM seq
+    ''', (rows, type_id))
+    conn.commit()
+    conn.close()
+
+def stream_export(client, url, headers=None):
+    """逐块消费流式响应，返回(字节数, 块数, 耗时)"""
+    start = time.perf_counter()
+    response = client.get(url, headers=headers or {}, buffered=False)
+    assert response.status_code == 200
+    size = chunks = 0
+    for chunk in response.response:
+        size += len(chunk)
+        chunks += 1
+    response.close()
+    return size, chunks, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出内存与耗时测试")
+    parser.add_argument("--rows", type=int, default=1000000, help="合成开奖期数")
+    parser.add_argument("--small-rows", type=int, default=10000, help="对照组导出的期数")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    small_type = models.get_lottery_type_id("qlc")
+    large_type = models.get_lottery_type_id("ssq")
+    fill_results(small_type, args.small_rows)
+    fill_results(large_type, args.rows)
+    client = create_bench_app().test_client()
+    
+    print("===== 流式导出基准测试 =====")
+    print(f"写入合成数据后峰值RSS: {peak_rss_mb():.1f}MB")
+    cases = [
+        (f"{args.small_rows}期 NDJSON", '/api/lottery/qlc/export?format=ndjson', None),
+        (f"{args.rows}期 NDJSON", '/api/lottery/ssq/export?format=ndjson', None),
+        (f"{args.rows}期 CSV", '/api/lottery/ssq/export?format=csv', None),
+        (f"{args.rows}期 NDJSON+gzip", '/api/lottery/ssq/export?format=ndjson', {'Accept-Encoding': 'gzip'})
+    ]
+    for label, url, headers in cases:
+        size, chunks, elapsed = stream_export(client, url, headers)
+        print(f"{label}: {size / 1024 / 1024:.1f}MB, {chunks}块, {elapsed:.1f}秒, 峰值RSS {peak_rss_mb():.1f}MB")
+
+if __name__ == "__main__":
+    main()
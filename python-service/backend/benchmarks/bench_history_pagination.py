@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史分页基准测试：对比LIMIT/OFFSET分页加COUNT(*)与游标分页在第1页和深页的耗时
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_history_pagination --rows 12000 --page 500
+"""
+
+import argparse
+import time
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def offset_page(type_id, page, limit):
+    """旧做法：OFFSET分页并在每页重新统计总数"""
+    results = models.get_all_results(type_id, (page - 1) * limit, limit)
+    conn = models.get_db_connection(read_only=True)
+    total = conn.execute(models.RESULT_COUNT_SQL, (type_id,)).fetchone()[0]
+    conn.close()
+    return results, total
+
+def keyset_page(type_id, code, cursor, limit):
+    """游标分页，总数取自data_version"""
+    if cursor is None:
+        results = models.get_all_results(type_id, 0, limit)
+    else:
+        results = models.get_results_after(type_id, cursor[0], cursor[1], limit)
+    return results, models.get_data_version(code)['row_count']
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET分页与游标分页耗时对比")
+    parser.add_argument("--rows", type=int, default=12000, help="合成快乐8开奖期数")
+    parser.add_argument("--page", type=int, default=500, help="深页页码")
+    parser.add_argument("--limit", type=int, default=20, help="每页条数")
+    parser.add_argument("--repeat", type=int, default=200, help="每种查询重复次数")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    models.save_lottery_results_bulk(generate_draws("kl8", args.rows))
+    type_id = models.get_lottery_type_id("kl8")
+    
+    # 沿游标翻到深页，取得该页的起始游标
+    cursor = None
+    for _ in range(args.page - 1):
+        results, _ = keyset_page(type_id, "kl8", cursor, args.limit)
+        cursor = (results[-1]["draw_date"], results[-1]["issue"])
+    deep_keyset = keyset_page(type_id, "kl8", cursor, args.limit)[0]
+    deep_offset = offset_page(type_id, args.page, args.limit)[0]
+    assert [row["issue"] for row in deep_keyset] == [row["issue"] for row in deep_offset], "两种分页结果不一致"
+    
+    print("===== 历史分页基准测试 =====")
+    print(f"数据量: {args.rows}期, 每页{args.limit}条")
+    first = timed(lambda: offset_page(type_id, 1, args.limit), args.repeat)
+    deep = timed(lambda: offset_page(type_id, args.page, args.limit), args.repeat)
+    print(f"OFFSET分页+COUNT: 第1页 {first:.3f}毫秒, 第{args.page}页 {deep:.3f}毫秒 ({deep / first:.1f}x)")
+    first = timed(lambda: keyset_page(type_id, "kl8", None, args.limit), args.repeat)
+    deep = timed(lambda: keyset_page(type_id, "kl8", cursor, args.limit), args.repeat)
+    print(f"游标分页: 第1页 {first:.3f}毫秒, 第{args.page}页 {deep:.3f}毫秒 ({deep / first:.1f}x)")
+
+if __name__ == "__main__":
+    main()
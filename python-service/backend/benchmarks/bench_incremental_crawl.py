@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量爬取基准测试：在支持分页和issueStart的本地桩服务器上，统计全量爬取与增量爬取每次运行的
+上游请求次数和开奖结果写入行数
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_incremental_crawl
+    python -m benchmarks.bench_incremental_crawl --history 300 --burst 45
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+
+import crawler.crawler as crawler_module
+from benchmarks.synthetic import generate_draws, use_temp_db
+from benchmarks.upstream import NOTICE_PATH, StubUpstream, to_notice_item
+from crawler.crawler import LOTTERY_CODES, LotteryCrawler
+
+class WriteCounter:
+    """统计爬虫每次运行写入开奖结果表的行数（新增与更新），未变化的行不计入"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.summary = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        self._save = crawler_module.save_lottery_results_bulk
+        crawler_module.save_lottery_results_bulk = self
+    
+    def __call__(self, results, *args, **kwargs):
+        self.calls += 1
+        summary = self._save(results, *args, **kwargs)
+        for outcome in self.summary:
+            self.summary[outcome] += summary[outcome]
+        return summary
+    
+    def reset(self):
+        self.calls = 0
+        self.summary = dict.fromkeys(self.summary, 0)
+
+def run(name, upstream, writes, crawl):
+    upstream.requests = 0
+    writes.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawl()
+    summary = writes.summary
+    print(f"{name:<28} 请求{upstream.requests:>3}次  保存调用{writes.calls}次  "
+          f"新增{summary['inserted']:>3}行  更新{summary['updated']:>3}行  未变化{summary['unchanged']:>3}行")
+    return upstream.requests, writes.calls, summary['inserted'], summary['updated'], summary['unchanged']
+
+def check(name, passed):
+    print(f"  {'✅' if passed else '❌'} {name}")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description="全量爬取与增量爬取的请求次数和写入行数对比")
+    parser.add_argument("--history", type=int, default=200, help="每个彩票类型的合成开奖期数")
+    parser.add_argument("--burst", type=int, default=45, help="长时间未爬取后一次新增的期数（超过一页）")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    history = {code: [to_notice_item(draw) for draw in generate_draws(code, args.history)] for code in LOTTERY_CODES}
+    upstream = StubUpstream(history)
+    stub_url = upstream.start()
+    crawler = LotteryCrawler(base_url=stub_url + NOTICE_PATH, home_url=stub_url + "/")
+    crawler.request_delay = (0, 0)
+    writes = WriteCounter()
+    codes = len(LOTTERY_CODES)
+    
+    def crawl(incremental):
+        return lambda: crawler.crawl_all_lottery_data(force=True, incremental=incremental)
+    
+    print("===== 增量爬取基准测试 =====")
+    for code in LOTTERY_CODES:
+        upstream.publish(code, args.history - args.burst - 3)
+    results = []
+    
+    run("首次爬取（数据库为空）", upstream, writes, crawl(True))
+    full = run("全量爬取，没有新开奖", upstream, writes, crawl(False))
+    quiet = run("增量爬取，没有新开奖", upstream, writes, crawl(True))
+    results.append(check("没有新开奖时增量爬取每个类型只请求一次且不写库", quiet[:4] == (codes, 0, 0, 0)))
+    
+    for code in LOTTERY_CODES:
+        upstream.publish(code, 1)
+    one = run("增量爬取，每个类型新增1期", upstream, writes, crawl(True))
+    results.append(check("每个类型新增1期时只写入新的一期", one == (codes, codes, codes, 0, 0)))
+    
+    upstream.publish("ssq", args.burst)
+    burst = run(f"增量爬取，ssq新增{args.burst}期", upstream, writes, crawl(True))
+    pages = -(-(args.burst + 1) // 30)
+    results.append(check(f"新增超过一页时继续翻页（{pages}页）直到已知期号", burst[0] == codes - 1 + pages and burst[2] == args.burst))
+    
+    # 上游忽略issueStart时仍可依靠已知期号停止翻页
+    upstream.honor_issue_start = False
+    for code in LOTTERY_CODES:
+        upstream.publish(code, 1)
+    ignored = run("上游忽略issueStart，新增1期", upstream, writes, crawl(True))
+    results.append(check("上游忽略issueStart时遇到已知期号即停止翻页", ignored[:4] == (codes, codes, codes, 0)))
+    
+    for code in LOTTERY_CODES:
+        upstream.publish(code, 1)
+    concurrent = run("异步并发增量爬取，新增1期", upstream, writes,
+                     lambda: crawler.crawl_all_lottery_data(force=True, concurrent=True, incremental=True))
+    results.append(check("异步并发模式同样只写入新的一期", concurrent[2:] == (codes, 0, 0)))
+    
+    print(f"\n没有新开奖时：全量爬取处理{full[4]}行，增量爬取处理{quiet[4]}行")
+    upstream.server.shutdown()
+    
+    if not all(results):
+        print("\n增量爬取检查未通过")
+        sys.exit(1)
+    print("\n增量爬取检查通过")
+
+if __name__ == "__main__":
+    main()
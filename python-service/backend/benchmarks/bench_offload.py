@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析进程池基准测试：多个线程持续请求三码同现时，测量同一进程内/latest的延迟，
+对比在请求线程中计算与交给进程池计算两种方式，并校验两种方式的结果一致、排队已满时返回429
+
+用法（在backend目录下执行，forkserver需要能重新导入主模块，不能通过标准输入运行）：
+    python -m benchmarks.bench_offload --days 3650
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+from flask import Flask
+from werkzeug.serving import make_server
+
+import models.models as models
+from analytics import analytics
+from analytics.offload import get_analytics_pool
+from api.api import api_bp
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+HEAVY_PATH = '/api/lottery/kl8/analytics/cooccurrence?size=3&top=20'
+LIGHT_PATH = '/api/lottery/kl8/latest'
+
+def start_server():
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def measure(base_url, heavy_threads, seconds):
+    """后台线程持续请求重接口，同时串行请求轻接口，返回(轻接口延迟列表, 重接口状态码计数)"""
+    stop = threading.Event()
+    statuses = {}
+    lock = threading.Lock()
+    
+    def hammer():
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while not stop.is_set():
+                status = client.get(HEAVY_PATH).status_code
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+    
+    threads = [threading.Thread(target=hammer) for _ in range(heavy_threads)]
+    for thread in threads:
+        thread.start()
+    
+    latencies = []
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get(LIGHT_PATH).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+def check_republish(pool, matrix, threads, seconds):
+    """多个线程持续提交任务，同时不断发布新数据版本，返回任务抛出的异常"""
+    stop = threading.Event()
+    errors = []
+    
+    def submit():
+        version = 0
+        while not stop.is_set():
+            version += 1
+            current = analytics.DrawMatrix(matrix.code, matrix.kind, f"{matrix.version}-{threading.get_ident()}-{version}",
+                                           matrix.issues, matrix.draw_dates, matrix.balls)
+            try:
+                pool.run('distributions', current)
+            except Exception as e:
+                errors.append(e)
+    
+    workers = [threading.Thread(target=submit) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return errors
+
+def report(label, latencies, statuses):
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}: /latest p50 {statistics.median(latencies):.1f}毫秒, p99 {p99:.1f}毫秒, "
+          f"{len(latencies)}次; 同现接口状态码 {dict(sorted(statuses.items()))}")
+
+def main():
+    parser = argparse.ArgumentParser(description="分析任务在请求线程与进程池中执行的延迟对比")
+    parser.add_argument("--days", type=int, default=3650, help="合成快乐8开奖期数（每日一期）")
+    parser.add_argument("--threads", type=int, default=4, help="并发请求同现接口的线程数")
+    parser.add_argument("--seconds", type=float, default=5, help="每种方式的测量时长")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    Config.SNAPSHOT_DIR = tempfile.mkdtemp()
+    Config.API_CACHE_ENABLED = False
+    models.save_lottery_results_bulk(generate_draws("kl8", args.days))
+    analytics.load_draw_matrix("kl8")
+    server, base_url = start_server()
+    
+    print("===== 分析进程池基准测试 =====")
+    print(f"快乐8 {args.days}期，{args.threads}个线程持续请求{HEAVY_PATH}")
+    try:
+        # 结果一致性
+        results = {}
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            for enabled in (False, True):
+                Config.ANALYTICS_OFFLOAD_ENABLED = enabled
+                results[enabled] = [client.get(f'/api/lottery/kl8/analytics/{path}').json() for path in
+                                    ('omission', 'cooccurrence?size=3&top=20', 'distribution', 'rolling?last=50&number=7')]
+        assert results[False] == results[True], "进程池与请求线程的计算结果不一致"
+        print("进程池与请求线程的计算结果一致")
+        
+        Config.ANALYTICS_OFFLOAD_ENABLED = False
+        report("请求线程中计算", *measure(base_url, args.threads, args.seconds))
+        
+        Config.ANALYTICS_OFFLOAD_ENABLED = True
+        report("进程池中计算", *measure(base_url, args.threads, args.seconds))
+        
+        # 排队上限小于并发线程数时，多出的请求应立即返回429
+        pool = get_analytics_pool()
+        pool.max_pending = 1
+        latencies, statuses = measure(base_url, args.threads, args.seconds / 2)
+        report("排队上限为1", latencies, statuses)
+        assert statuses.get(429), "排队已满时未返回429"
+        
+        # 数据版本频繁更新时，排队和执行中的任务仍能挂载旧版本的共享内存
+        pool.max_pending = Config.ANALYTICS_MAX_PENDING
+        errors = check_republish(pool, analytics.load_draw_matrix("kl8"), args.threads, args.seconds / 2)
+        print(f"数据更新期间任务失败{len(errors)}次{'：' + repr(errors[0]) if errors else ''}")
+        assert not errors, "旧版本共享内存在任务结束前被解除链接"
+        stats = pool.stats()
+        assert stats['retired_matrices'] == 0, "任务结束后旧版本共享内存未解除链接"
+        print(f"进程池统计: {stats}")
+    finally:
+        server.shutdown()
+        get_analytics_pool().shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析器基准测试：用录制的开奖公告接口响应（benchmarks/fixtures/draw_notice_*.json），
+对比原内联解析循环与crawler.parsers注册的解析器每秒解析的条目数，并校验两者的一、二等奖结果一致
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_parsers --repeat 200
+"""
+
+import argparse
+import json
+import os
+import time
+
+from crawler.parsers import CHINESE_GRADE_NAMES, get_parser
+from models.models import parse_amount_cents
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+COMPARED_FIELDS = ("issue", "draw_date", "red_balls", "blue_balls", "sales", "pool_money",
+                   "first_prize_count", "first_prize_amount", "second_prize_count", "second_prize_amount")
+
+def load_fixture(code):
+    with open(os.path.join(FIXTURE_DIR, f"draw_notice_{code}.json"), encoding="utf-8") as f:
+        return json.load(f)["result"]
+
+# 接口中奖级代码的中文写法：{彩票类型代码: {整数奖级代码: 中文名称}}
+TEXT_GRADES = {
+    "ssq": {**dict(enumerate(CHINESE_GRADE_NAMES[:6], 1)), 7: "福运奖"},
+    "qlc": dict(enumerate(CHINESE_GRADE_NAMES, 1)),
+    "3d": {1: "单选", 2: "组选3", 3: "组选6"}
+}
+
+def relabel(code, items):
+    """把样本中的整数奖级代码换成中文写法，检查两种写法的一、二等奖都与原解析一致"""
+    names = TEXT_GRADES.get(code, {})
+    return [{**item, "prizegrades": [{**prize, "type": names.get(prize.get("type"), prize.get("type"))}
+                                     for prize in item.get("prizegrades", [])]} for item in items]
+
+def mismatches(code, items, draw_parser):
+    return sum(1 for item in items
+               if any(old != new for old, new in zip(*(
+                   [result[field] for field in COMPARED_FIELDS]
+                   for result in (legacy_parse(code, item, 1), draw_parser.parse(item, 1))))))
+
+def legacy_parse(lottery_code, item, type_id):
+    """原crawl_lottery_data中的内联解析：逐个奖级做isinstance和子串判断，只保留一、二等奖"""
+    date_str = item.get("date", "")
+    draw_date = date_str.split("(")[0] if "(" in date_str else date_str
+    red_balls_str = item.get("red", "")
+    red_balls = red_balls_str.split(",") if red_balls_str else []
+    blue_balls_str = item.get("blue", "") or item.get("blue2", "")
+    blue_balls = blue_balls_str if blue_balls_str else None
+    
+    first_prize_count = 0
+    first_prize_amount = ""
+    second_prize_count = 0
+    second_prize_amount = ""
+    for prize in item.get("prizegrades", []):
+        prize_type = prize.get("type", "")
+        typenum = prize.get("typenum", "0")
+        if not typenum or typenum.strip() == "":
+            typenum = "0"
+        if isinstance(prize_type, int):
+            if prize_type == 1:
+                first_prize_count = int(typenum)
+                first_prize_amount = prize.get("typemoney", "")
+            elif prize_type == 2:
+                second_prize_count = int(typenum)
+                second_prize_amount = prize.get("typemoney", "")
+        elif isinstance(prize_type, str):
+            if lottery_code == "3d":
+                if "单选" in prize_type:
+                    first_prize_count = int(typenum)
+                    first_prize_amount = prize.get("typemoney", "")
+                elif "组选" in prize_type:
+                    second_prize_count = int(typenum)
+                    second_prize_amount = prize.get("typemoney", "")
+            else:
+                if "x1z1" in prize_type or "一等奖" in prize_type:
+                    first_prize_count = int(typenum)
+                    first_prize_amount = prize.get("typemoney", "")
+                elif "x1z2" in prize_type or "二等奖" in prize_type:
+                    second_prize_count = int(typenum)
+                    second_prize_amount = prize.get("typemoney", "")
+    
+    return {
+        "type_id": type_id,
+        "issue": item.get("code", ""),
+        "draw_date": draw_date,
+        "red_balls": red_balls,
+        "blue_balls": blue_balls,
+        "sales": item.get("sales", ""),
+        "pool_money": item.get("poolmoney", ""),
+        "first_prize_count": first_prize_count,
+        "first_prize_amount": first_prize_amount,
+        "second_prize_count": second_prize_count,
+        "second_prize_amount": second_prize_amount,
+        "sales_cents": parse_amount_cents(item.get("sales", "")),
+        "pool_money_cents": parse_amount_cents(item.get("poolmoney", "")),
+        "first_prize_amount_cents": parse_amount_cents(first_prize_amount),
+        "second_prize_amount_cents": parse_amount_cents(second_prize_amount)
+    }
+
+def timed(label, func, items, repeat, baseline=None):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = func()
+    elapsed = time.perf_counter() - start
+    rate = len(items) * repeat / elapsed
+    speedup = f", 加速 {rate / baseline:.1f}x" if baseline else ""
+    print(f"  {label}: {rate:.0f}条/秒{speedup}")
+    return results, rate
+
+def main():
+    parser = argparse.ArgumentParser(description="开奖公告解析吞吐量对比")
+    parser.add_argument("--repeat", type=int, default=200, help="每个样本重复解析次数")
+    args = parser.parse_args()
+    
+    print("===== 解析器基准测试 =====")
+    for code in ("ssq", "kl8", "qlc", "3d"):
+        items = load_fixture(code)
+        draw_parser = get_parser(code)
+        print(f"{code}（{len(items)}条）:")
+        legacy, baseline = timed("原内联解析", lambda: [legacy_parse(code, item, 1) for item in items], items, args.repeat)
+        parsed, rate = timed("注册解析器", lambda: [draw_parser.parse(item, 1) for item in items], items, args.repeat, baseline)
+        
+        mismatched = sum(1 for old, new in zip(legacy, parsed)
+                         if any(old[field] != new[field] for field in COMPARED_FIELDS))
+        grades = sum(len(result["prize_grades"]) for result in parsed)
+        print(f"  一、二等奖不一致{mismatched}条（奖级为中文写法时不一致{mismatches(code, relabel(code, items), draw_parser)}条），"
+              f"保留奖级{grades}个（原解析保留{2 * len(items)}个），注册解析器每秒解析奖级{rate * grades / len(items):.0f}个")
+
+if __name__ == "__main__":
+    main()
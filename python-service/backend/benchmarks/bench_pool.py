@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接池基准测试：对比启用/关闭连接池时 /api/lottery/<code>/latest 的每秒请求数
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_pool --requests 2000 --threads 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+import models.models as models
+from api.api import api_bp
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+def create_bench_app():
+    """创建只包含API蓝图的Flask应用，避免启动调度器"""
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.teardown_appcontext(lambda exception=None: models.release_thread_connections())
+    return app
+
+def run_requests(app, total, threads):
+    """并发发送total次请求，返回每秒请求数"""
+    def worker(count):
+        client = app.test_client()
+        for _ in range(count):
+            response = client.get('/api/lottery/ssq/latest?limit=10')
+            assert response.status_code == 200
+    
+    per_thread = total // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, [per_thread] * threads))
+    return per_thread * threads / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="连接池前后 /latest 吞吐量对比")
+    parser.add_argument("--requests", type=int, default=2000, help="每轮请求总数")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    models.save_lottery_results_bulk(generate_draws("ssq", 100))
+    
+    app = create_bench_app()
+    
+    Config.DB_POOL_ENABLED = False
+    without_pool = run_requests(app, args.requests, args.threads)
+    
+    Config.DB_POOL_ENABLED = True
+    with_pool = run_requests(app, args.requests, args.threads)
+    stats = models.get_pool_stats()
+    
+    print("===== 连接池基准测试 =====")
+    print(f"请求数: {args.requests}, 线程数: {args.threads}")
+    print(f"关闭连接池: {without_pool:.0f} req/s")
+    print(f"启用连接池: {with_pool:.0f} req/s")
+    print(f"提升: {with_pool / without_pool:.2f}x")
+    print(f"连接池统计: 命中{stats['reader_hits']}次, 未命中{stats['reader_misses']}次, "
+          f"等待{stats['reader_waits']}次/{stats['reader_wait_time']:.3f}秒, 命中率{stats['reader_hit_ratio']:.1%}")
+
+if __name__ == "__main__":
+    main()
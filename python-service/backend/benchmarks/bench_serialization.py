@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+序列化基准测试：每1000期开奖生成列表响应的耗时，对比三种做法并校验输出一致
+    旧做法      sqlite3.Row逐行构造字典，Flask默认jsonify（标准库json）
+    orjson      同样逐行构造字典，jsonify改用FastJSONProvider
+    预渲染片段  只读取入库时渲染好的result_json，按字节拼接
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_serialization --rows 1000
+"""
+
+import argparse
+import json
+import time
+
+from flask import Flask, jsonify
+
+import models.models as models
+from api import serializers
+from models import render
+from api.serializers import FastJSONProvider, draw_list_response
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+def timed(label, func, repeat, baseline=None):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    speedup = f", 加速 {baseline / elapsed:.1f}x" if baseline else ""
+    print(f"  {label}: {elapsed:.2f}毫秒{speedup}")
+    return result, elapsed
+
+def format_rows(results):
+    """旧做法：逐行从sqlite3.Row取字段构造字典"""
+    return [{
+        'issue': result['issue'],
+        'draw_date': result['draw_date'],
+        'red_balls': result['red_balls'].split(','),
+        'blue_balls': result['blue_balls'] if result['blue_balls'] else None,
+        'sales': result['sales'],
+        'pool_money': result['pool_money'],
+        'first_prize_count': result['first_prize_count'],
+        'first_prize_amount': result['first_prize_amount'],
+        'second_prize_count': result['second_prize_count'],
+        'second_prize_amount': result['second_prize_amount']
+    } for result in results]
+
+def main():
+    parser = argparse.ArgumentParser(description="列表接口序列化耗时对比")
+    parser.add_argument("--rows", type=int, default=1000, help="每个响应包含的开奖期数")
+    parser.add_argument("--repeat", type=int, default=50, help="每种做法重复次数")
+    args = parser.parse_args()
+    
+    use_temp_db()
+    models.save_lottery_results_bulk(generate_draws("kl8", args.rows))
+    type_id = models.get_lottery_type_id("kl8")
+    
+    default_app = Flask("default")
+    fast_app = Flask("fast")
+    fast_app.json = FastJSONProvider(fast_app)
+    
+    def respond(app, results):
+        with app.app_context():
+            return jsonify({'success': True, 'data': format_rows(results), 'count': len(results)}).get_data()
+    
+    def respond_fragments(results):
+        return draw_list_response([result[2] for result in results], count=len(results)).get_data()
+    
+    print("===== 序列化基准测试 =====")
+    print(f"每个响应{args.rows}期快乐8开奖, orjson{'可用' if serializers.orjson else '不可用'}")
+    
+    rows = models.get_all_results(type_id, 0, args.rows)
+    fragments = models.get_result_fragments(type_id, args.rows)
+    print("仅序列化（行已读出）")
+    old, baseline = timed("旧做法", lambda: respond(default_app, rows), args.repeat)
+    fast, _ = timed("orjson", lambda: respond(fast_app, rows), args.repeat, baseline)
+    rendered, _ = timed("预渲染片段", lambda: respond_fragments(fragments), args.repeat, baseline)
+    assert json.loads(old) == json.loads(fast) == json.loads(rendered), "三种做法的输出不一致"
+    
+    print("查询加序列化")
+    _, baseline = timed("旧做法", lambda: respond(default_app, models.get_all_results(type_id, 0, args.rows)), args.repeat)
+    timed("orjson", lambda: respond(fast_app, models.get_all_results(type_id, 0, args.rows)), args.repeat, baseline)
+    timed("预渲染片段", lambda: respond_fragments(models.get_result_fragments(type_id, args.rows)), args.repeat, baseline)
+    
+    # 未安装orjson时的退回路径
+    orjson, serializers.orjson, render.orjson = serializers.orjson, None, None
+    try:
+        print("标准库退回路径")
+        _, baseline = timed("渲染片段（入库时开销）", lambda: [render.render_draw(*tuple(row)[2:12]) for row in rows], args.repeat)
+        fallback, _ = timed("预渲染片段", lambda: respond_fragments(fragments), args.repeat)
+        assert json.loads(fallback) == json.loads(rendered), "退回路径输出不一致"
+    finally:
+        serializers.orjson = render.orjson = orjson
+
+if __name__ == "__main__":
+    main()
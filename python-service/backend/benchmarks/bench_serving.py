@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务模式基准测试：对比开发服务器（python app.py）与gunicorn生产模式（gunicorn -c gunicorn.conf.py）的吞吐量和延迟，
+并在压测过程中向gunicorn master发送HUP平滑重启，检查没有请求失败、调度器锁由新worker接管
+
+两种模式都以子进程启动，使用临时数据库副本（通过LOTTERY_DB_FILE指定），压测客户端在本进程中以多线程运行。
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_serving --seconds 10 --clients 8
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 压测请求：轻量查询为主，夹带统计和健康检查
+PATHS = (
+    '/api/lottery/ssq/latest?limit=10',
+    '/api/lottery/ssq/history?page=3&limit=20',
+    '/api/lottery/kl8/latest?limit=20',
+    '/api/lottery/ssq/stats',
+    '/health'
+)
+
+def start_server(command, port, db_file):
+    env = dict(os.environ, PORT=str(port), LOTTERY_DB_FILE=db_file, PYTHONUNBUFFERED='1')
+    log = open(os.path.join(os.path.dirname(db_file), f'server-{port}.log'), 'w')
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f'{base_url}/health', timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"服务启动超时：{' '.join(command)}")
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+def load(base_url, clients, seconds, during=None):
+    """clients个线程循环请求PATHS，返回(每秒请求数, 延迟列表, 失败列表, 重试次数)；during在压测开始后于后台执行
+    
+    平滑重启时旧worker会关闭空闲的keep-alive连接，恰好在这些连接上发出的请求得到RemoteProtocolError，
+    服务端并未处理该请求。与浏览器和反向代理的做法一致，这种情况对GET请求重试一次，单独计数。
+    """
+    latencies = []
+    failures = []
+    retries = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    
+    def client_loop(offset):
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            i = offset
+            while time.perf_counter() < deadline:
+                path = PATHS[i % len(PATHS)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    try:
+                        status = client.get(path).status_code
+                    except httpx.RemoteProtocolError:
+                        with lock:
+                            retries.append(path)
+                        status = client.get(path).status_code
+                    error = None if status == 200 else f'{path}: HTTP {status}'
+                except httpx.HTTPError as e:
+                    error = f'{path}: {type(e).__name__}'
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if error:
+                        failures.append(error)
+    
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    if during is not None:
+        threading.Thread(target=during, daemon=True).start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies, failures, len(retries)
+
+def report(label, throughput, latencies, failures, retries):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}: {throughput:.0f}请求/秒, p50 {statistics.median(latencies):.1f}毫秒, "
+          f"p99 {p99:.1f}毫秒, 失败{len(failures)}次, 空闲连接被关闭后重试{retries}次")
+
+def scheduler_lock_held():
+    """检查调度器锁是否被某个进程持有"""
+    with open(Config.SCHEDULER_LOCK_FILE, 'a+') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="开发服务器与gunicorn生产模式的吞吐量对比")
+    parser.add_argument("--seconds", type=float, default=10, help="每种模式的压测时长")
+    parser.add_argument("--clients", type=int, default=8, help="并发客户端线程数")
+    parser.add_argument("--port", type=int, default=5099, help="服务端口")
+    args = parser.parse_args()
+    
+    # 准备临时数据库并执行迁移，两种模式各用一份副本
+    source_db = use_temp_db()
+    models.save_lottery_results_bulk(generate_draws("ssq", 2000))
+    models.save_lottery_results_bulk(generate_draws("kl8", 2000))
+    models.get_connection_pool().close_all()
+    workdir = tempfile.mkdtemp()
+    
+    print("===== 服务模式基准测试 =====")
+    print(f"CPU核数: {os.cpu_count()}, 并发客户端: {args.clients}, 每种模式{args.seconds:.0f}秒")
+    
+    modes = [
+        ("开发服务器（python app.py）", [sys.executable, 'app.py']),
+        (f"gunicorn（{Config.SERVER_WORKERS}个worker × {Config.SERVER_THREADS}线程）",
+         [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'])
+    ]
+    for index, (label, command) in enumerate(modes):
+        db_file = os.path.join(workdir, f'mode{index}.db')
+        shutil.copy(source_db, db_file)
+        process, base_url = start_server(command, args.port, db_file)
+        try:
+            load(base_url, args.clients, 1)  # 预热
+            report(label, *load(base_url, args.clients, args.seconds))
+            if index == 0:
+                continue
+            
+            # 压测过程中平滑重启：所有请求都应成功
+            def reload():
+                time.sleep(args.seconds / 3)
+                os.kill(process.pid, signal.SIGHUP)
+            throughput, latencies, failures, retries = load(base_url, args.clients, args.seconds, during=reload)
+            report("gunicorn压测中HUP平滑重启", throughput, latencies, failures, retries)
+            assert not failures, f"平滑重启期间有请求失败：{failures[:5]}"
+            
+            # 旧worker退出后，新worker在重试间隔内接管调度器锁
+            if fcntl is not None:
+                deadline = time.time() + Config.SCHEDULER_LOCK_RETRY_SECONDS + 10
+                while not scheduler_lock_held() and time.time() < deadline:
+                    time.sleep(1)
+                assert scheduler_lock_held(), "平滑重启后没有worker接管定时任务"
+                with open(os.path.join(workdir, f'server-{args.port}.log')) as log:
+                    elected = log.read().count('数据清理定时任务已在进程')
+                print(f"调度器锁已由新worker接管，累计启动调度器{elected}次（每次只有一个进程持锁）")
+        finally:
+            stop_server(process)
+
+if __name__ == "__main__":
+    main()
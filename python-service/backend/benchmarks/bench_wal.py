@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读写并发基准测试：N个读线程 + 1个写线程，对比rollback日志与WAL模式下的读延迟
+
+用法（在backend目录下执行）：
+    python -m benchmarks.bench_wal --readers 4 --seconds 5
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run(journal_mode, readers, seconds):
+    """在指定日志模式下运行一轮，返回读延迟列表、读失败数和写入批次数"""
+    Config.DB_JOURNAL_MODE = journal_mode
+    use_temp_db()
+    draws = generate_draws("kl8", 20000)
+    models.save_lottery_results_bulk(draws)
+    type_id = draws[0]["type_id"]
+    issues = [draw["issue"] for draw in draws]
+    
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    writes = [0]
+    lock = threading.Lock()
+    
+    def reader():
+        local_latencies = []
+        local_errors = 0
+        index = 0
+        while not stop.is_set():
+            index += 1
+            start = time.perf_counter()
+            try:
+                models.get_result_by_issue(type_id, issues[index % len(issues)])
+                local_latencies.append(time.perf_counter() - start)
+            except Exception:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+    
+    def writer():
+        # 持续改写整张表，模拟数据清理等大事务写入
+        while not stop.is_set():
+            conn = models.get_db_connection()
+            try:
+                conn.execute('UPDATE lottery_result SET pool_money = ?', (str(writes[0]),))
+                conn.commit()
+            finally:
+                conn.close()
+            writes[0] += 1
+    
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, sum(errors), writes[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="rollback日志与WAL模式读写并发对比")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--seconds", type=float, default=5, help="每轮持续时间（秒）")
+    args = parser.parse_args()
+    
+    Config.DB_POOL_SIZE = args.readers
+    results = {mode: run(mode, args.readers, args.seconds) for mode in ("DELETE", "WAL")}
+    
+    print("===== 读写并发基准测试 =====")
+    print(f"读线程: {args.readers}, 写线程: 1, 每轮{args.seconds}秒")
+    for mode, (latencies, errors, writes) in results.items():
+        print(f"{mode:>6}: 读{len(latencies)}次, 失败{errors}次, 写入{writes}批, "
+              f"p50={statistics.median(latencies) * 1000:.2f}ms, p99={percentile(latencies, 99) * 1000:.2f}ms, max={max(latencies) * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制开奖公告接口的真实响应，保存为benchmarks/fixtures/draw_notice_<类型>.json，
+供解析器基准测试和本地桩服务器（benchmarks.upstream）回放
+
+请求沿用LotteryCrawler的会话、请求头、随机等待和重试；多页的条目合并到第一页响应的result中，
+保留接口原有的字段，便于回放时与线上行为一致。
+
+用法（在backend目录下执行，需要能访问cwl.gov.cn）：
+    python -m benchmarks.record_upstream
+    python -m benchmarks.record_upstream --codes ssq kl8 --page-size 30 --pages 3
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.upstream import FIXTURE_DIR
+from crawler.crawler import LOTTERY_CODES, LotteryCrawler
+
+def record(crawler, lottery_code, page_size, pages):
+    """逐页请求并合并条目，任何一页失败时返回None，避免保存不完整的样本"""
+    data = None
+    items = []
+    for page_no in range(1, pages + 1):
+        page = crawler._fetch_draw_notice(lottery_code, page_size, page_no)
+        if not page or page.get("state") != 0:
+            return None
+        data = data or page
+        items.extend(page.get("result", []))
+        if page_no >= int(page.get("pageCount") or pages):
+            break
+    return {**data, "result": items}
+
+def main():
+    parser = argparse.ArgumentParser(description="录制开奖公告接口响应作为基准测试样本")
+    parser.add_argument("--codes", nargs="+", default=LOTTERY_CODES, help="要录制的彩票类型")
+    parser.add_argument("--page-size", type=int, default=30, help="每页期数")
+    parser.add_argument("--pages", type=int, default=1, help="每个类型录制的页数")
+    parser.add_argument("--output", default=FIXTURE_DIR, help="样本输出目录")
+    args = parser.parse_args()
+    
+    os.makedirs(args.output, exist_ok=True)
+    crawler = LotteryCrawler()
+    failed = []
+    for code in args.codes:
+        data = record(crawler, code, args.page_size, args.pages)
+        if data is None:
+            print(f"{code}录制失败，保留原有样本")
+            failed.append(code)
+            continue
+        path = os.path.join(args.output, f"draw_notice_{code}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.write("\n")
+        print(f"{code}录制{len(data['result'])}期，保存到{path}")
+    
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试公共工具：临时数据库与合成开奖数据
+"""
+
+import datetime
+import os
+import random
+import tempfile
+
+import models.models as models
+
+# 各彩票类型的号码规则：(红球个数, 红球范围, 蓝球个数, 蓝球范围, 是否允许重复)
+GAME_RULES = {
+    "ssq": (6, range(1, 34), 1, range(1, 17), False),
+    "kl8": (20, range(1, 81), 0, None, False),
+    "qlc": (7, range(1, 31), 1, range(1, 31), False),
+    "3d": (3, range(0, 10), 0, None, True)
+}
+
+def use_temp_db():
+    """将models切换到临时数据库并初始化，返回数据库文件路径"""
+    models.DB_FILE = os.path.join(tempfile.mkdtemp(), "bench_lottery.db")
+    models.init_db()
+    return models.DB_FILE
+
+def _format_ball(code, number):
+    return str(number) if code == "3d" else f"{number:02d}"
+
+def generate_draws(code, count, type_id=None, start_date=None, seed=42):
+    """按时间倒序生成count期合成开奖数据，格式与save_lottery_result的入参一致"""
+    rng = random.Random(seed)
+    red_count, red_range, blue_count, blue_range, repeat = GAME_RULES[code]
+    type_id = type_id or models.get_lottery_type_id(code)
+    start_date = start_date or datetime.date(2025, 12, 31)
+    
+    draws = []
+    for i in range(count):
+        draw_date = start_date - datetime.timedelta(days=i)
+        if repeat:
+            red = [rng.choice(red_range) for _ in range(red_count)]
+        else:
+            red = sorted(rng.sample(red_range, red_count))
+        blue = sorted(rng.sample(blue_range, blue_count)) if blue_count else []
+        draws.append({
+            "type_id": type_id,
+            "issue": f"{draw_date.year}{count - i:05d}",
+            "draw_date": draw_date.strftime("%Y-%m-%d"),
+            "red_balls": [_format_ball(code, n) for n in red],
+            "blue_balls": ",".join(_format_ball(code, n) for n in blue) or None,
+            "sales": str(rng.randint(10 ** 7, 10 ** 9)),
+            "pool_money": str(rng.randint(10 ** 7, 10 ** 10)),
+            "first_prize_count": rng.randint(0, 20),
+            "first_prize_amount": str(rng.randint(10 ** 6, 10 ** 7)),
+            "second_prize_count": rng.randint(0, 200),
+            "second_prize_amount": str(rng.randint(10 ** 4, 10 ** 6))
+        })
+    return draws
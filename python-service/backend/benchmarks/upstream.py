@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟开奖公告接口（findDrawNotice）的本地桩服务器，供爬虫基准测试在没有网络的机器上复现上游行为
+
+支持分页（pageNo/pageSize）、期号范围（issueStart/issueEnd/issueCount）和开奖日期范围（dayStart/dayEnd），
+可以配置响应延迟，并按概率或按每个类型的前N次请求注入4xx/5xx错误，超过限速时返回429模拟上游限流。
+数据来自合成开奖（to_notice_item）或record_upstream录制的接口响应（from_fixtures）。
+
+单独启动（在backend目录下执行），然后用LotteryCrawler(base_url=输出的地址)爬取：
+    python -m benchmarks.upstream --port 8800 --latency 0.2 --error-rate 0.1 --throttle-rate 5
+"""
+
+import argparse
+import collections
+import glob
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+NOTICE_PATH = "/cwl_admin/front/cwlkj/search/kjxx/findDrawNotice"
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def to_notice_item(draw):
+    """把合成开奖转换为开奖公告接口返回的格式"""
+    return {
+        "code": draw["issue"],
+        "date": f"{draw['draw_date']}(一)",
+        "red": ",".join(draw["red_balls"]),
+        "blue": draw["blue_balls"] or "",
+        "blue2": "",
+        "sales": draw["sales"],
+        "poolmoney": draw["pool_money"],
+        "prizegrades": [
+            {"type": 1, "typenum": str(draw["first_prize_count"]), "typemoney": draw["first_prize_amount"]},
+            {"type": 2, "typenum": str(draw["second_prize_count"]), "typemoney": draw["second_prize_amount"]}
+        ]
+    }
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """读取录制的接口响应，返回{彩票类型代码: 按时间倒序的开奖公告条目}"""
+    history = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "draw_notice_*.json"))):
+        code = os.path.basename(path)[len("draw_notice_"):-len(".json")]
+        with open(path, encoding="utf-8") as f:
+            history[code] = json.load(f)["result"]
+    return history
+
+def issue_key(issue):
+    """期号的比较键：期号为"年份+序号"的数字串，先比长度再按字符串比较"""
+    return (len(issue), issue)
+
+class StubUpstream:
+    """模拟开奖公告接口：按期号倒序分页返回已"开奖"的数据
+    
+    latency为每次响应的延迟（秒），jitter为额外的随机延迟上限；error_rate为按概率返回error_statuses中某个状态码的比例，
+    fail_first为每个类型前N次请求固定返回错误（用于检查重试）；throttle_rate为每秒最多处理的请求数，超过时返回throttle_status。
+    统计请求次数、各状态码次数和同时处理中的最大请求数。
+    """
+    
+    def __init__(self, history, honor_issue_start=True, latency=0, jitter=0, error_rate=0, error_statuses=(500, 502, 503),
+                 fail_first=0, throttle_rate=None, throttle_status=429, seed=42):
+        # {彩票类型代码: 按时间倒序的全部开奖}，published之前的开奖尚未公布
+        self.history = history
+        self.published = {code: 0 for code in history}
+        self.honor_issue_start = honor_issue_start
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.fail_first = fail_first
+        self.throttle_rate = throttle_rate
+        self.throttle_status = throttle_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_stats()
+    
+    @classmethod
+    def from_fixtures(cls, fixture_dir=FIXTURE_DIR, **kwargs):
+        """用录制的接口响应创建桩服务器，全部开奖均已公布"""
+        upstream = cls(load_fixtures(fixture_dir), **kwargs)
+        for code, draws in upstream.history.items():
+            upstream.publish(code, len(draws))
+        return upstream
+    
+    def reset_stats(self):
+        with self.lock:
+            self.requests = 0
+            self.statuses = collections.Counter()
+            self.requests_by_code = collections.Counter()
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self._recent = collections.deque()
+    
+    def publish(self, code, count):
+        self.published[code] = min(self.published[code] + count, len(self.history[code]))
+    
+    def page(self, query):
+        code = query.get("name", [""])[0]
+        draws = self.history.get(code, [])
+        visible = draws[len(draws) - self.published.get(code, 0):]
+        issue_start = query.get("issueStart", [""])[0]
+        issue_end = query.get("issueEnd", [""])[0]
+        if self.honor_issue_start and (issue_start or issue_end):
+            low = issue_key(issue_start) if issue_start else (0, "")
+            high = issue_key(issue_end) if issue_end else (float("inf"), "")
+            visible = [item for item in visible if low <= issue_key(item["code"]) <= high]
+        issue_count = query.get("issueCount", [""])[0]
+        if issue_count:
+            visible = visible[:int(issue_count)]
+        day_start = query.get("dayStart", [""])[0]
+        day_end = query.get("dayEnd", [""])[0]
+        if day_start or day_end:
+            visible = [item for item in visible if (day_start or "0") <= item["date"][:10] <= (day_end or "9")]
+        page_no = int(query.get("pageNo", ["1"])[0])
+        page_size = int(query.get("pageSize", ["30"])[0])
+        return {
+            "state": 0,
+            "message": "查询成功",
+            "total": len(visible),
+            "pageNo": page_no,
+            "pageSize": page_size,
+            "pageCount": -(-len(visible) // page_size),
+            "result": visible[(page_no - 1) * page_size:page_no * page_size]
+        }
+    
+    def _status(self, code):
+        """决定本次请求的状态码，调用方需持有self.lock"""
+        self.requests += 1
+        self.requests_by_code[code] += 1
+        if self.throttle_rate:
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.throttle_rate:
+                return self.throttle_status
+            self._recent.append(now)
+        if self.requests_by_code[code] <= self.fail_first:
+            return self.error_statuses[0]
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.random.choice(self.error_statuses)
+        return 200
+    
+    def handle(self, query):
+        """处理一次开奖公告请求，返回(状态码, 响应体)"""
+        with self.lock:
+            status = self._status(query.get("name", [""])[0])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        try:
+            time.sleep(delay)
+            if status == 200:
+                with self.lock:
+                    body = json.dumps(self.page(query), ensure_ascii=False).encode("utf-8")
+            else:
+                body = json.dumps({"state": 1, "message": f"HTTP {status}"}).encode("utf-8")
+            return status, body
+        finally:
+            with self.lock:
+                self.statuses[status] += 1
+                self.in_flight -= 1
+    
+    def start(self, host="127.0.0.1", port=0):
+        upstream = self
+        
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == NOTICE_PATH:
+                    status, body = upstream.handle(parse_qs(url.query, keep_blank_values=True))
+                else:
+                    status, body = 200, b"ok"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer((host, port), StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="启动模拟开奖公告接口的本地桩服务器")
+    parser.add_argument("--port", type=int, default=8800, help="监听端口")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="录制的接口响应目录")
+    parser.add_argument("--latency", type=float, default=0, help="每次响应的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="额外随机延迟的上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="随机返回5xx的比例")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[500, 502, 503], help="注入的错误状态码")
+    parser.add_argument("--fail-first", type=int, default=0, help="每个类型前N次请求返回错误")
+    parser.add_argument("--throttle-rate", type=float, default=None, help="每秒最多处理的请求数，超过时返回429")
+    args = parser.parse_args()
+    
+    upstream = StubUpstream.from_fixtures(args.fixtures, latency=args.latency, jitter=args.jitter,
+                                          error_rate=args.error_rate, error_statuses=args.error_statuses,
+                                          fail_first=args.fail_first, throttle_rate=args.throttle_rate)
+    stub_url = upstream.start(port=args.port)
+    print(f"桩服务器已启动：{stub_url}{NOTICE_PATH}（{', '.join(f'{code} {len(draws)}期' for code, draws in upstream.history.items())}）")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"已处理{upstream.requests}次请求，状态码分布：{dict(upstream.statuses)}")
+    except KeyboardInterrupt:
+        upstream.server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,26 @@
+import os
+import tempfile
+
 # 应用配置
 class Config:
     # 数据库配置
     DATABASE_FILE = 'lottery.db'
+    # 数据库连接池配置
+    DB_POOL_ENABLED = True
+    DB_POOL_SIZE = 8  # 只读连接上限
+    DB_POOL_IDLE_TIMEOUT = 300  # 空闲连接回收时间（秒）
+    DB_POOL_WAIT_TIMEOUT = 30  # 等待可用连接的超时时间（秒）
+    # 数据库存储配置
+    DB_JOURNAL_MODE = 'WAL'  # WAL模式下读写互不阻塞
+    DB_SYNCHRONOUS = 'NORMAL'
+    DB_CACHE_SIZE_KB = 16384  # 每个连接的页缓存大小
+    DB_MMAP_SIZE = 256 * 1024 * 1024  # 内存映射读取的最大字节数
+    DB_BUSY_TIMEOUT_MS = 5000  # 遇到锁时的等待时间
+    DB_CHECKPOINT_MODE = 'PASSIVE'
+    DB_CHECKPOINT_INTERVAL_MINUTES = 30
+    DB_MIGRATION_BATCH_SIZE = 5000  # 迁移改写大表时每批提交的行数
+    # 列式快照（Arrow/Parquet）输出目录
+    SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'lottery-snapshots')
     
     # 爬虫配置
     CRAWLER_TIMEOUT = 15
@@ -11,17 +30,70 @@ class Config:
         "Referer": "https://www.cwl.gov.cn/",
         "X-Requested-With": "XMLHttpRequest"
     }
+    # 异步并发爬取：同一主机的最大并发请求数
+    CRAWLER_MAX_CONCURRENCY_PER_HOST = 4
+    # 异步并发爬取：令牌桶限速（平均每秒请求数与突发容量）
+    CRAWLER_RATE_PER_SECOND = 0.5
+    CRAWLER_BURST = 4
+    # 请求失败（网络错误或非200状态码）时的最大尝试次数与指数退避的初始等待（秒）
+    CRAWLER_MAX_RETRIES = 3
+    CRAWLER_RETRY_DELAY = 2
+    # 定时任务是否使用异步并发爬取
+    CRAWLER_CONCURRENT = True
+    # 增量爬取：只请求比数据库中最新期号更新的开奖，遇到已知期号即停止翻页
+    CRAWLER_INCREMENTAL = True
+    CRAWLER_INCREMENTAL_MAX_PAGES = 10  # 增量爬取最多请求的页数
+    # 历史回填（python -m crawler.backfill）：按开奖日期分区间并发请求，共享令牌桶限速
+    BACKFILL_START_DATE = '2003-01-01'  # 默认回填起始日期（双色球2003年开始发行）
+    BACKFILL_CHUNK_DAYS = 90  # 每个回填区间覆盖的天数，也是断点续传的粒度
+    BACKFILL_PAGE_SIZE = 100
+    BACKFILL_WORKERS = 4
+    BACKFILL_RATE_PER_SECOND = 2
+    BACKFILL_BURST = 4
     
     # 定时任务配置
     CRAWL_TIME = {
         "hour": 22,
         "minute": 30
     }
+    # 开奖日历轮询：按lottery_type.description中的开奖时间，开奖后才开始轮询该类型，获取到新一期即停止
+    DRAW_POLLER_ENABLED = True  # False时退回每天10:20爬取全部类型
+    DRAW_TIME_UTC_OFFSET_HOURS = 8  # 开奖时间为北京时间
+    DRAW_POLL_START_DELAY_MINUTES = 15  # 开奖后多久开始第一次请求
+    DRAW_POLL_INITIAL_INTERVAL_MINUTES = 5
+    DRAW_POLL_BACKOFF_FACTOR = 2
+    DRAW_POLL_MAX_INTERVAL_MINUTES = 60
+    DRAW_POLL_GIVE_UP_HOURS = 12  # 开奖后超过该时间仍未获取到则放弃本期，等待下一次开奖
+    DRAW_POLL_PAGE_SIZE = 5  # 轮询时每次请求的期数
     
     # API配置
     API_RATE_LIMIT = 100  # 每分钟请求次数限制
+    # API响应缓存：数据版本变化时自动失效，TTL兜底
+    API_CACHE_ENABLED = True
+    API_CACHE_BACKEND = 'memory'  # memory：进程内LRU；file：多个worker共享的文件缓存
+    API_CACHE_TTL_SECONDS = 300
+    API_CACHE_MAX_ENTRIES = 1024
+    API_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 仅memory后端
+    API_CACHE_DIR = '/dev/shm/lottery-api-cache' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'lottery-api-cache')
+    
+    # 号码分析进程池：CPU密集的分析接口交给独立进程计算
+    ANALYTICS_OFFLOAD_ENABLED = True
+    ANALYTICS_WORKERS = 2
+    ANALYTICS_MAX_PENDING = 8  # 排队和执行中的任务上限，超出返回429
+    ANALYTICS_TIMEOUT_SECONDS = 10  # 单个请求等待结果的超时时间，超出返回504
+    ANALYTICS_START_METHOD = 'forkserver'
     
     # 应用配置
     DEBUG = True
     HOST = '0.0.0.0'
     PORT = 5000
+    
+    # 生产模式（gunicorn -c gunicorn.conf.py）配置，可用环境变量WEB_CONCURRENCY、THREADS覆盖
+    SERVER_WORKERS = 2
+    SERVER_THREADS = 4  # 每个worker的线程数（gthread）
+    SERVER_TIMEOUT = 30  # worker无响应多久后被重启（秒）
+    SERVER_GRACEFUL_TIMEOUT = 30  # 平滑重启时等待进行中的请求完成的时间（秒）
+    SERVER_KEEPALIVE = 5
+    # 定时任务选主：多个worker中只有持有该文件锁的进程运行定时任务
+    SCHEDULER_LOCK_FILE = os.path.join(tempfile.gettempdir(), 'lottery-scheduler.lock')
+    SCHEDULER_LOCK_RETRY_SECONDS = 30  # 未抢到锁的进程重试间隔，持锁进程退出后由其他进程接管
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史开奖回填
+
+按开奖日期把回填范围切成若干区间，每个区间在backfill_checkpoint中有一条进度记录。
+固定数量的工作协程从队列中取区间，用dayStart/dayEnd请求开奖公告并翻完该区间的所有页，
+所有请求共享一个令牌桶限速；区间数据通过save_lottery_results_bulk写入后标记为完成。
+中断后重新执行只处理未完成和失败的区间；已登记的日期不会重复登记，截止日期推后（默认截止到今天）
+重新执行时只为新增的日期登记区间。区间写入后、标记完成前中断时该区间会被重新请求，
+批量写入对内容相同的记录不做修改，重复处理是安全的。
+
+用法（在backend目录下执行）：
+    python -m crawler.backfill                                  # 回填所有类型
+    python -m crawler.backfill --codes ssq --since 2020-01-01 --workers 4 --rate 2
+    python -m crawler.backfill --status                         # 查看回填进度
+    python -m crawler.backfill --codes kl8 --reset              # 清除进度后从头回填
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+
+from config.config import Config
+from crawler.crawler import LOTTERY_CODES, LotteryCrawler, TokenBucket, run_in_thread
+from models.models import (
+    get_backfill_progress, get_lottery_type_id, get_pending_backfill_chunks, plan_backfill,
+    record_backfill_chunk, reset_backfill, save_lottery_results_bulk
+)
+
+# 单个区间最多翻的页数，防止上游分页信息异常时无限请求
+MAX_PAGES_PER_CHUNK = 100
+
+def split_date_range(since, until, chunk_days):
+    """把[since, until]按chunk_days天切分为区间，返回[(day_start, day_end)]，从新到旧排列
+    
+    区间从since开始对齐，截止日期推后时已有区间的边界不变，只有最后一个区间延长或增加新区间。
+    """
+    chunks = []
+    day_start = since
+    while day_start <= until:
+        day_end = min(until, day_start + datetime.timedelta(days=chunk_days - 1))
+        chunks.append((day_start.isoformat(), day_end.isoformat()))
+        day_start = day_end + datetime.timedelta(days=1)
+    chunks.reverse()
+    return chunks
+
+class BackfillStats:
+    """回填进度统计"""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.done = 0
+        self.failed = 0
+        self.issues = 0
+        self.inserted = 0
+        self.updated = 0
+        self.started = time.perf_counter()
+    
+    def elapsed(self):
+        return time.perf_counter() - self.started
+    
+    def throughput(self):
+        """每秒回填的期数"""
+        return self.issues / max(self.elapsed(), 1e-9)
+    
+    def report(self):
+        return (f"区间{self.done + self.failed}/{self.chunks}（失败{self.failed}），{self.issues}期，"
+                f"新增{self.inserted}期，更新{self.updated}期，耗时{self.elapsed():.1f}秒，{self.throughput():.1f}期/秒")
+
+class Backfill:
+    """基于LotteryCrawler的并发分页回填"""
+    
+    def __init__(self, crawler, workers=None, rate=None, burst=None, page_size=None):
+        self.crawler = crawler
+        self.workers = workers or Config.BACKFILL_WORKERS
+        self.limiter = TokenBucket(rate or Config.BACKFILL_RATE_PER_SECOND, burst or Config.BACKFILL_BURST)
+        self.page_size = page_size or Config.BACKFILL_PAGE_SIZE
+        self.semaphores = {}
+        self.stats = None
+    
+    async def _fetch_chunk(self, client, code, day_start, day_end):
+        """请求一个日期区间的所有页，返回开奖条目列表，任何一页失败时返回None"""
+        items = []
+        for page_no in range(1, MAX_PAGES_PER_CHUNK + 1):
+            data = await self.crawler._fetch_draw_notice_async(
+                client, self.limiter, self.semaphores, code, self.page_size, page_no,
+                day_start=day_start, day_end=day_end
+            )
+            if not data or data.get("state") != 0:
+                return None
+            page = data.get("result", [])
+            items.extend(page)
+            if len(page) < self.page_size or page_no >= int(data.get("pageCount") or page_no + 1):
+                break
+        # 上游未按日期过滤时只保留区间内的开奖
+        return [item for item in items if day_start <= item.get("date", "")[:10] <= day_end]
+    
+    async def _process_chunk(self, client, code, type_id, day_start, day_end):
+        items = await self._fetch_chunk(client, code, day_start, day_end)
+        if items is None:
+            print(f"{code} {day_start}~{day_end}请求失败，下次回填时重试")
+            await run_in_thread(record_backfill_chunk, code, day_start, day_end, 'failed')
+            self.stats.failed += 1
+            return
+        
+        results = self.crawler.parse_draw_items(code, type_id, items)
+        if results:
+            summary = await run_in_thread(save_lottery_results_bulk, results)
+            self.stats.inserted += summary['inserted']
+            self.stats.updated += summary['updated']
+        await run_in_thread(record_backfill_chunk, code, day_start, day_end, 'done', len(results))
+        self.stats.done += 1
+        self.stats.issues += len(results)
+    
+    async def _worker(self, queue, client, progress_every):
+        while True:
+            try:
+                code, type_id, day_start, day_end = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._process_chunk(client, code, type_id, day_start, day_end)
+            except Exception as e:
+                print(f"{code} {day_start}~{day_end}回填出错：{e}")
+                await run_in_thread(record_backfill_chunk, code, day_start, day_end, 'failed')
+                self.stats.failed += 1
+            if (self.stats.done + self.stats.failed) % progress_every == 0:
+                print(f"回填进度：{self.stats.report()}")
+    
+    async def run_async(self, codes, since, until, chunk_days=None, limit=None, progress_every=20):
+        """回填codes在[since, until]内的开奖，limit为本次最多处理的区间数，返回BackfillStats"""
+        chunk_days = chunk_days or Config.BACKFILL_CHUNK_DAYS
+        pending = []
+        for code in codes:
+            type_id = await run_in_thread(get_lottery_type_id, code)
+            if not type_id:
+                print(f"未找到彩票类型：{code}，跳过")
+                continue
+            await run_in_thread(plan_backfill, code, split_date_range(since, until, chunk_days))
+            for day_start, day_end, _ in await run_in_thread(get_pending_backfill_chunks, code):
+                pending.append((code, type_id, day_start, day_end))
+        
+        # 各类型的区间按日期交替排队，从新到旧同时推进；limit用于分批执行
+        pending.sort(key=lambda chunk: chunk[2], reverse=True)
+        queue = asyncio.Queue()
+        for chunk in pending[:limit]:
+            queue.put_nowait(chunk)
+        
+        self.stats = BackfillStats(queue.qsize())
+        print(f"待回填{self.stats.chunks}个区间，{self.workers}个并发，限速每秒{self.limiter.rate}次请求")
+        async with self.crawler.async_client() as client:
+            await asyncio.gather(*(self._worker(queue, client, progress_every) for _ in range(self.workers)))
+        return self.stats
+    
+    def run(self, codes, since, until, chunk_days=None, limit=None):
+        return asyncio.run(self.run_async(codes, since, until, chunk_days, limit))
+
+def print_progress():
+    rows = get_backfill_progress()
+    if not rows:
+        print("没有回填记录")
+        return
+    for code, status, chunks, issues in rows:
+        print(f"{code:<4} {status:<8} {chunks:>4}个区间 {issues or 0:>6}期")
+
+def main():
+    parser = argparse.ArgumentParser(description="历史开奖回填")
+    parser.add_argument("--codes", nargs="+", default=LOTTERY_CODES, help="回填的彩票类型")
+    parser.add_argument("--since", default=Config.BACKFILL_START_DATE, help="起始开奖日期（YYYY-MM-DD）")
+    parser.add_argument("--until", default=datetime.date.today().isoformat(), help="截止开奖日期（YYYY-MM-DD）")
+    parser.add_argument("--chunk-days", type=int, default=Config.BACKFILL_CHUNK_DAYS, help="每个区间的天数")
+    parser.add_argument("--workers", type=int, default=Config.BACKFILL_WORKERS, help="并发请求数")
+    parser.add_argument("--rate", type=float, default=Config.BACKFILL_RATE_PER_SECOND, help="每秒最多请求次数")
+    parser.add_argument("--page-size", type=int, default=Config.BACKFILL_PAGE_SIZE, help="每页期数")
+    parser.add_argument("--limit", type=int, help="本次最多处理的区间数")
+    parser.add_argument("--status", action="store_true", help="只显示回填进度")
+    parser.add_argument("--reset", action="store_true", help="清除所选类型的回填进度后从头回填")
+    args = parser.parse_args()
+    
+    from models.models import ensure_db
+    ensure_db()
+    
+    if args.status:
+        print_progress()
+        return
+    if args.reset:
+        for code in args.codes:
+            reset_backfill(code)
+    
+    since = datetime.date.fromisoformat(args.since)
+    until = datetime.date.fromisoformat(args.until)
+    backfill = Backfill(LotteryCrawler(), args.workers, args.rate, page_size=args.page_size)
+    stats = backfill.run(args.codes, since, until, args.chunk_days, args.limit)
+    print(f"\n回填完成：{stats.report()}")
+    print_progress()
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,7 @@
 """
 
 from crawler.crawler import LotteryCrawler
-from models.models import get_lottery_type_id, save_lottery_result, log_crawl_task, mark_all_errors_as_fixed
+from models.models import get_lottery_type_id, save_lottery_results_bulk, log_crawl_task, mark_all_errors_as_fixed
 import time
 import random
 
@@ -48,43 +48,13 @@ def manual_crawl_3d():
                 print(f"未找到彩票类型：{lottery_code}")
                 return 0
             
-            # 处理每条开奖数据
-            saved_count = 0
-            for item in result_list:
-                try:
-                    # 解析日期
-                    date_str = item.get("date", "")
-                    if "(" in date_str:
-                        draw_date = date_str.split("(")[0]
-                    else:
-                        draw_date = date_str
-                    
-                    # 解析红球（3D只有红球）
-                    red_balls_str = item.get("red", "")
-                    red_balls = red_balls_str.split(",") if red_balls_str else []
-                    
-                    # 构建结果字典
-                    result = {
-                        "type_id": type_id,
-                        "issue": item.get("code", ""),
-                        "draw_date": draw_date,
-                        "red_balls": red_balls,
-                        "blue_balls": None,
-                        "sales": item.get("sales", ""),
-                        "pool_money": item.get("poolmoney", ""),
-                        "first_prize_count": 0,
-                        "first_prize_amount": "",
-                        "second_prize_count": 0,
-                        "second_prize_amount": ""
-                    }
-                    
-                    # 保存到数据库
-                    save_lottery_result(result)
-                    print(f"保存{lottery_code}期号：{result['issue']} 成功")
-                    saved_count += 1
-                except Exception as e:
-                    print(f"处理{lottery_code}期号数据时出错：{e}")
-                    continue
+            # 按3D的解析规则解析每条开奖数据（包括全部奖级）
+            results = crawler.parse_draw_items(lottery_code, type_id, result_list)
+            
+            # 在一个事务中批量保存到数据库
+            summary = save_lottery_results_bulk(results)
+            saved_count = len(summary['outcomes'])
+            print(f"保存{saved_count}期{lottery_code}数据：新增{summary['inserted']}期，更新{summary['updated']}期，未变化{summary['unchanged']}期")
             
             # 记录成功的爬取任务
             log_crawl_task(lottery_code, "SUCCESS")
@@ -1,13 +1,97 @@
+import asyncio
 import requests
 import random
+import threading
 import time
-from models.models import get_lottery_type_id, save_lottery_result
+from urllib.parse import urlsplit
+from config.config import Config
+from crawler.parsers import get_parser
+from models.models import get_lottery_type_id, releases_connections, save_lottery_results_bulk
+
+# 支持的彩票类型代码
+LOTTERY_CODES = ["ssq", "kl8", "qlc", "3d"]
+
+# 网络请求失败时使用的本地备份数据
+FALLBACK_DATA = {
+    "ssq": {
+        "state": 0,
+        "result": [
+            {"name": "双色球", "code": "2025140", "detailsLink": "/c/2025/12/04/638227.shtml", "videoLink": "/c/2025/12/04/638231.shtml", "date": "2025-12-04(四)", "week": "四", "red": "01,03,04,12,18,24", "blue": "05", "blue2": "", "sales": "362437084", "poolmoney": "2690606470", "content": "湖北3注，四川1注，共4注。", "prizegrades": [{"type": 1, "typenum": "4", "typemoney": "9980899"}, {"type": 2, "typenum": "126", "typemoney": "197654"}]},
+            {"name": "双色球", "code": "2025139", "detailsLink": "/c/2025/12/02/637913.shtml", "videoLink": "/c/2025/12/02/637917.shtml", "date": "2025-12-02(二)", "week": "二", "red": "02,05,17,22,30,33", "blue": "06", "blue2": "", "sales": "358264332", "poolmoney": "2655816573", "content": "安徽1注，山东1注，广东1注，共3注。", "prizegrades": [{"type": 1, "typenum": "3", "typemoney": "10000000"}, {"type": 2, "typenum": "142", "typemoney": "154433"}]}
+        ]
+    },
+    "kl8": {
+        "state": 0,
+        "result": [
+            {"name": "快乐8", "code": "2025324", "detailsLink": "/c/2025/12/04/638229.shtml", "videoLink": "/c/2025/12/04/638230.shtml", "date": "2025-12-04(四)", "week": "四", "red": "09,13,20,26,28,32,39,42,43,46,47,49,50,60,61,62,63,64,66,79", "blue": "", "blue2": "", "sales": "115617374", "poolmoney": "99414561.95", "prizegrades": [{"type": "x10z10", "typenum": "0", "typemoney": ""}, {"type": "x10z9", "typenum": "64", "typemoney": "8000.00"}]}
+        ]
+    },
+    "3d": {
+        "state": 0,
+        "result": [
+            {"name": "3D", "code": "2025324", "detailsLink": "/c/2025/12/04/638228.shtml", "videoLink": "", "date": "2025-12-04(四)", "week": "四", "red": "6,6,1", "blue": "", "blue2": "", "sales": "106347020", "poolmoney": "", "prizegrades": [{"type": 1, "typenum": "", "typemoney": ""}, {"type": 2, "typenum": "", "typemoney": ""}]}
+        ]
+    },
+    "qlc": {
+        "state": 0,
+        "result": [
+            {"name": "七乐彩", "code": "2025138", "detailsLink": "/c/2025/12/03/638120.shtml", "videoLink": "/c/2025/12/03/638125.shtml", "date": "2025-12-03(三)", "week": "三", "red": "07,09,10,12,22,23,24", "blue": "04", "blue2": "", "sales": "2777450", "poolmoney": "627683", "content": "共0注。", "prizegrades": [{"type": 1, "typenum": "0", "typemoney": "0"}, {"type": 2, "typenum": "7", "typemoney": "12809"}]}
+        ]
+    }
+}
+
+def run_in_thread(func, *args):
+    """在asyncio线程池中执行数据库操作，结束时归还该线程持有的连接（线程池中的线程会被复用）"""
+    return asyncio.to_thread(releases_connections(func), *args)
+
+def is_newer_issue(issue, known_issue):
+    """期号是否比已知期号新：期号为"年份+序号"的数字串，先比长度再按字符串比较"""
+    return (len(issue), issue) > (len(known_issue), known_issue)
+
+class TokenBucket:
+    """令牌桶限速器，同时支持线程阻塞等待和asyncio等待"""
+    
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    def _reserve(self):
+        """预占一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    def acquire(self):
+        """阻塞直到获得令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self):
+        """在事件循环中等待令牌，不阻塞线程"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
 
 class LotteryCrawler:
     """彩票数据爬取类"""
     
-    def __init__(self):
-        self.base_url = "https://www.cwl.gov.cn/cwl_admin/front/cwlkj/search/kjxx/findDrawNotice"
+    def __init__(self, base_url=None, home_url=None):
+        self.base_url = base_url or "https://www.cwl.gov.cn/cwl_admin/front/cwlkj/search/kjxx/findDrawNotice"
+        self.home_url = home_url or "https://www.cwl.gov.cn/"
+        # 同步模式下每次请求前的随机等待区间（秒）
+        self.request_delay = (1, 3)
         # 随机User-Agent列表，模拟不同浏览器
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -34,7 +118,7 @@ class LotteryCrawler:
         """初始访问首页，获取必要的cookies和会话信息"""
         try:
             # 先访问首页，获取必要的cookies
-            self.session.get("https://www.cwl.gov.cn/", timeout=15, allow_redirects=True)
+            self.session.get(self.home_url, timeout=15, allow_redirects=True)
         except Exception as e:
             print(f"初始访问失败，将继续尝试：{e}")
     
@@ -60,50 +144,59 @@ class LotteryCrawler:
         }
         self.session.headers.update(headers)
     
-    def crawl_lottery_data(self, lottery_code, page_size=30, force=False):
-        """爬取指定彩票类型的数据"""
-        import random
-        from models.models import can_crawl_today, log_crawl_error, log_crawl_task, mark_all_errors_as_fixed
-        
-        if not can_crawl_today(lottery_code, force):
-            print(f"今天已经成功爬取过{lottery_code}数据，跳过本次爬取")
-            return 0
-        
-        print(f"开始爬取{lottery_code}数据...")
-        
-        # 使用本地数据作为后备方案
-        fallback_data = {
-            "ssq": {
-                "state": 0,
-                "result": [
-                    {"name": "双色球", "code": "2025140", "detailsLink": "/c/2025/12/04/638227.shtml", "videoLink": "/c/2025/12/04/638231.shtml", "date": "2025-12-04(四)", "week": "四", "red": "01,03,04,12,18,24", "blue": "05", "blue2": "", "sales": "362437084", "poolmoney": "2690606470", "content": "湖北3注，四川1注，共4注。", "prizegrades": [{"type": 1, "typenum": "4", "typemoney": "9980899"}, {"type": 2, "typenum": "126", "typemoney": "197654"}]},
-                    {"name": "双色球", "code": "2025139", "detailsLink": "/c/2025/12/02/637913.shtml", "videoLink": "/c/2025/12/02/637917.shtml", "date": "2025-12-02(二)", "week": "二", "red": "02,05,17,22,30,33", "blue": "06", "blue2": "", "sales": "358264332", "poolmoney": "2655816573", "content": "安徽1注，山东1注，广东1注，共3注。", "prizegrades": [{"type": 1, "typenum": "3", "typemoney": "10000000"}, {"type": 2, "typenum": "142", "typemoney": "154433"}]}
-                ]
-            },
-            "kl8": {
-                "state": 0,
-                "result": [
-                    {"name": "快乐8", "code": "2025324", "detailsLink": "/c/2025/12/04/638229.shtml", "videoLink": "/c/2025/12/04/638230.shtml", "date": "2025-12-04(四)", "week": "四", "red": "09,13,20,26,28,32,39,42,43,46,47,49,50,60,61,62,63,64,66,79", "blue": "", "blue2": "", "sales": "115617374", "poolmoney": "99414561.95", "prizegrades": [{"type": "x10z10", "typenum": "0", "typemoney": ""}, {"type": "x10z9", "typenum": "64", "typemoney": "8000.00"}]}
-                ]
-            },
-            "3d": {
-                "state": 0,
-                "result": [
-                    {"name": "3D", "code": "2025324", "detailsLink": "/c/2025/12/04/638228.shtml", "videoLink": "", "date": "2025-12-04(四)", "week": "四", "red": "6,6,1", "blue": "", "blue2": "", "sales": "106347020", "poolmoney": "", "prizegrades": [{"type": 1, "typenum": "", "typemoney": ""}, {"type": 2, "typenum": "", "typemoney": ""}]}
-                ]
-            },
-            "qlc": {
-                "state": 0,
-                "result": [
-                    {"name": "七乐彩", "code": "2025138", "detailsLink": "/c/2025/12/03/638120.shtml", "videoLink": "/c/2025/12/03/638125.shtml", "date": "2025-12-03(三)", "week": "三", "red": "07,09,10,12,22,23,24", "blue": "04", "blue2": "", "sales": "2777450", "poolmoney": "627683", "content": "共0注。", "prizegrades": [{"type": 1, "typenum": "0", "typemoney": "0"}, {"type": 2, "typenum": "7", "typemoney": "12809"}]}
-                ]
-            }
+    def _build_params(self, lottery_code, page_size, page_no=1, issue_start=None, day_start=None, day_end=None):
+        """构建开奖公告接口的请求参数，issue_start不为空时只请求该期号及之后的开奖，
+        day_start、day_end（YYYY-MM-DD）限定开奖日期范围"""
+        return {
+            "name": lottery_code,
+            "issueCount": "",
+            "issueStart": issue_start or "",
+            "issueEnd": "",
+            "dayStart": day_start or "",
+            "dayEnd": day_end or "",
+            "pageNo": page_no,
+            "pageSize": page_size,
+            "week": "",
+            "systemType": "PC"
         }
+    
+    def _known_issue(self, lottery_code):
+        """数据库中该类型已有的最新期号，尚无数据时返回None"""
+        from models.models import get_data_version
         
-        # 尝试网络请求，带重试机制
-        max_retries = 3
-        retry_delay = 2
-        data = None
+        data_version = get_data_version(lottery_code)
+        return data_version['max_issue'] if data_version else None
+    
+    def _page_done(self, data, page, page_no, page_size, since_issue):
+        """增量爬取时判断是否还需要请求下一页：本页已出现已知期号、不足一页或已是最后一页时停止"""
+        if since_issue is None or len(page) < page_size:
+            return True
+        if any(not is_newer_issue(item.get("code", ""), since_issue) for item in page):
+            return True
+        return page_no >= int(data.get("pageCount") or page_no + 1)
+    
+    def _fetch_new_draw_notices(self, lottery_code, page_size, since_issue):
+        """增量请求开奖公告：带issueStart逐页请求，遇到已知期号即停止，返回合并后的数据
+        
+        任何一页请求失败都按整体失败处理（返回None），避免只保存较新的几页后最新期号越过中间缺失的开奖。
+        """
+        items = []
+        for page_no in range(1, Config.CRAWLER_INCREMENTAL_MAX_PAGES + 1):
+            data = self._fetch_draw_notice(lottery_code, page_size, page_no, since_issue)
+            if not data or data.get("state") != 0:
+                return data
+            page = data.get("result", [])
+            items.extend(page)
+            if self._page_done(data, page, page_no, page_size, since_issue):
+                break
+        else:
+            print(f"{lottery_code}增量爬取{Config.CRAWLER_INCREMENTAL_MAX_PAGES}页仍未遇到已知期号{since_issue}，中间可能有缺失的开奖需要回填")
+        return {**data, "result": items}
+    
+    def _fetch_draw_notice(self, lottery_code, page_size, page_no=1, issue_start=None):
+        """同步请求开奖公告接口，带重试机制，失败返回None"""
+        max_retries = Config.CRAWLER_MAX_RETRIES
+        retry_delay = Config.CRAWLER_RETRY_DELAY
         
         for attempt in range(max_retries):
             try:
@@ -111,32 +204,18 @@ class LotteryCrawler:
                 self._update_headers()
                 
                 # 添加随机延迟，避免请求过于频繁
-                delay = random.uniform(1, 3)
+                delay = random.uniform(*self.request_delay)
                 print(f"等待{delay:.2f}秒后发送请求...")
                 time.sleep(delay)
                 
-                # 构建请求参数
-                params = {
-                    "name": lottery_code,
-                    "issueCount": "",
-                    "issueStart": "",
-                    "issueEnd": "",
-                    "dayStart": "",
-                    "dayEnd": "",
-                    "pageNo": 1,
-                    "pageSize": page_size,
-                    "week": "",
-                    "systemType": "PC"
-                }
-                
                 # 发送请求
+                params = self._build_params(lottery_code, page_size, page_no, issue_start)
                 response = self.session.get(self.base_url, params=params, timeout=15, allow_redirects=True)
                 
                 # 检查响应状态
                 if response.status_code == 200:
-                    data = response.json()
                     print(f"网络请求成功，获取到{lottery_code}数据")
-                    break
+                    return response.json()
                 else:
                     print(f"请求失败，状态码：{response.status_code}，尝试第{attempt + 1}/{max_retries}次")
                     if attempt < max_retries - 1:
@@ -148,14 +227,48 @@ class LotteryCrawler:
                     # 指数退避
                     time.sleep(retry_delay * (2 ** attempt))
         
+        return None
+    
+    def parse_draw_items(self, lottery_code, type_id, items):
+        """把开奖公告接口返回的条目解析为save_lottery_results_bulk的入参，解析失败的条目记录错误后跳过"""
+        from models.models import log_crawl_error
+        
+        parser = get_parser(lottery_code)
+        results = []
+        for item in items:
+            try:
+                results.append(parser.parse(item, type_id))
+            except Exception as e:
+                error_msg = f"处理{lottery_code}期号数据时出错：{e}"
+                print(error_msg)
+                log_crawl_error(lottery_code, "DATA_PARSE_ERROR", error_msg)
+        
+        return results
+    
+    def _process_draw_notice(self, lottery_code, data, since_issue=None, use_fallback=True):
+        """解析接口返回的数据并入库，记录爬取任务和错误状态，since_issue不为空时只处理比它新的期号
+        
+        use_fallback为False时请求失败不使用本地备份数据，只记录失败的爬取任务并返回0，
+        不记录成功、也不把错误标记为已修复，由调用方（开奖日历轮询）退避后重试。
+        """
+        from models.models import log_crawl_error, log_crawl_task, mark_all_errors_as_fixed
+        
+        if not data and not use_fallback:
+            print(f"网络请求失败，{lottery_code}本次未获取到数据")
+            log_crawl_task(lottery_code, "FAILED")
+            return 0
+        
         # 如果网络请求失败，使用本地备份数据
         if not data:
             print(f"网络请求失败，使用本地备份数据")
-            data = fallback_data.get(lottery_code, {"state": 1})
+            data = FALLBACK_DATA.get(lottery_code, {"state": 1})
         
         if data.get("state") == 0:
             result_list = data.get("result", [])
             print(f"获取到{len(result_list)}期{lottery_code}数据")
+            if since_issue is not None:
+                result_list = [item for item in result_list if is_newer_issue(item.get("code", ""), since_issue)]
+                print(f"其中比已有的{since_issue}期新的有{len(result_list)}期")
             
             # 获取彩票类型ID
             type_id = get_lottery_type_id(lottery_code)
@@ -166,85 +279,23 @@ class LotteryCrawler:
                 log_crawl_task(lottery_code, "FAILED")
                 return 0
             
-            # 处理每条开奖数据
-            for item in result_list:
+            results = self.parse_draw_items(lottery_code, type_id, result_list)
+            
+            # 在一个事务中批量保存到数据库，没有新开奖时不访问开奖结果表
+            if results:
                 try:
-                    # 解析日期
-                    date_str = item.get("date", "")
-                    if "(" in date_str:
-                        draw_date = date_str.split("(")[0]
-                    else:
-                        draw_date = date_str
-                    
-                    # 解析红球和蓝球
-                    red_balls_str = item.get("red", "")
-                    red_balls = red_balls_str.split(",") if red_balls_str else []
-                    blue_balls_str = item.get("blue", "") or item.get("blue2", "")
-                    blue_balls = blue_balls_str if blue_balls_str else None
-                    
-                    # 解析一等奖和二等奖数据
-                    prize_grades = item.get("prizegrades", [])
-                    first_prize_count = 0
-                    first_prize_amount = ""
-                    second_prize_count = 0
-                    second_prize_amount = ""
-                    
-                    for prize in prize_grades:
-                        prize_type = prize.get("type", "")
-                        typenum = prize.get("typenum", "0")
-                        # 确保typenum是有效的数字字符串
-                        if not typenum or typenum.strip() == "":
-                            typenum = "0"
-                        
-                        if isinstance(prize_type, int):
-                            if prize_type == 1:
-                                first_prize_count = int(typenum)
-                                first_prize_amount = prize.get("typemoney", "")
-                            elif prize_type == 2:
-                                second_prize_count = int(typenum)
-                                second_prize_amount = prize.get("typemoney", "")
-                        elif isinstance(prize_type, str):
-                            # 处理福彩3D的特殊情况
-                            if lottery_code == "3d":
-                                # 福彩3D的一等奖对应单选
-                                if "单选" in prize_type:
-                                    first_prize_count = int(typenum)
-                                    first_prize_amount = prize.get("typemoney", "")
-                                # 福彩3D的二等奖对应组选
-                                elif "组选" in prize_type:
-                                    second_prize_count = int(typenum)
-                                    second_prize_amount = prize.get("typemoney", "")
-                            else:
-                                # 其他彩票类型的处理
-                                if "x1z1" in prize_type or "一等奖" in prize_type:
-                                    first_prize_count = int(typenum)
-                                    first_prize_amount = prize.get("typemoney", "")
-                                elif "x1z2" in prize_type or "二等奖" in prize_type:
-                                    second_prize_count = int(typenum)
-                                    second_prize_amount = prize.get("typemoney", "")
-                    
-                    # 构建结果字典
-                    result = {
-                        "type_id": type_id,
-                        "issue": item.get("code", ""),
-                        "draw_date": draw_date,
-                        "red_balls": red_balls,
-                        "blue_balls": blue_balls,
-                        "sales": item.get("sales", ""),
-                        "pool_money": item.get("poolmoney", ""),
-                        "first_prize_count": first_prize_count,
-                        "first_prize_amount": first_prize_amount,
-                        "second_prize_count": second_prize_count,
-                        "second_prize_amount": second_prize_amount
-                    }
-                    
-                    # 保存到数据库
-                    save_lottery_result(result)
-                    print(f"保存{lottery_code}期号：{result['issue']} 成功")
+                    summary = save_lottery_results_bulk(results)
                 except Exception as e:
-                    error_msg = f"处理{lottery_code}期号数据时出错：{e}"
+                    error_msg = f"保存{lottery_code}数据时出错：{e}"
                     print(error_msg)
-                    log_crawl_error(lottery_code, "DATA_PARSE_ERROR", error_msg)
+                    log_crawl_error(lottery_code, "DB_ERROR", error_msg)
+                    log_crawl_task(lottery_code, "FAILED")
+                    return 0
+                for _, issue, outcome in summary['outcomes']:
+                    print(f"保存{lottery_code}期号：{issue} 成功（{outcome}）")
+                print(f"{lottery_code}新增{summary['inserted']}期，更新{summary['updated']}期，未变化{summary['unchanged']}期")
+            else:
+                print(f"{lottery_code}没有新开奖")
             
             # 记录成功的爬取任务
             log_crawl_task(lottery_code, "SUCCESS")
@@ -262,13 +313,160 @@ class LotteryCrawler:
             log_crawl_task(lottery_code, "FAILED")
             return 0
     
-    def crawl_all_lottery_data(self, force=False):
-        """爬取所有彩票类型的数据"""
-        lottery_codes = ["ssq", "kl8", "qlc", "3d"]
+    
+    def crawl_lottery_data(self, lottery_code, page_size=30, force=False, incremental=None, use_fallback=True):
+        """爬取指定彩票类型的数据
+        
+        incremental为True（默认取Config.CRAWLER_INCREMENTAL）时只请求比数据库中最新期号更新的开奖，
+        数据库中还没有该类型数据时退回只请求第一页。use_fallback见_process_draw_notice。
+        """
+        from models.models import can_crawl_today
+        
+        if not can_crawl_today(lottery_code, force):
+            print(f"今天已经成功爬取过{lottery_code}数据，跳过本次爬取")
+            return 0
+        
+        if incremental is None:
+            incremental = Config.CRAWLER_INCREMENTAL
+        since_issue = self._known_issue(lottery_code) if incremental else None
+        if since_issue is not None:
+            print(f"开始增量爬取{lottery_code}数据（{since_issue}期之后）...")
+            data = self._fetch_new_draw_notices(lottery_code, page_size, since_issue)
+        else:
+            print(f"开始爬取{lottery_code}数据...")
+            data = self._fetch_draw_notice(lottery_code, page_size)
+        return self._process_draw_notice(lottery_code, data, since_issue, use_fallback)
+    
+    def _async_client_headers(self):
+        """基于同步会话的请求头构建异步客户端请求头，去掉HTTP/2不允许的逐跳头"""
+        hop_by_hop = {"connection", "keep-alive", "upgrade-insecure-requests", "te"}
+        return {k: v for k, v in self.session.headers.items() if k.lower() not in hop_by_hop}
+    
+    def async_client(self):
+        """创建共享的异步HTTP客户端，沿用同步会话的请求头和cookies，优先使用HTTP/2"""
+        import httpx
+        
+        client_kwargs = {
+            "headers": self._async_client_headers(),
+            "cookies": self.session.cookies.get_dict(),
+            "timeout": Config.CRAWLER_TIMEOUT,
+            "follow_redirects": True
+        }
+        try:
+            return httpx.AsyncClient(http2=True, **client_kwargs)
+        except ImportError:
+            # 未安装h2时退回HTTP/1.1
+            return httpx.AsyncClient(**client_kwargs)
+    
+    async def _fetch_new_draw_notices_async(self, client, limiter, semaphores, lottery_code, page_size, since_issue):
+        """_fetch_new_draw_notices的异步版本"""
+        items = []
+        for page_no in range(1, Config.CRAWLER_INCREMENTAL_MAX_PAGES + 1):
+            data = await self._fetch_draw_notice_async(client, limiter, semaphores, lottery_code, page_size, page_no, since_issue)
+            if not data or data.get("state") != 0:
+                return data
+            page = data.get("result", [])
+            items.extend(page)
+            if self._page_done(data, page, page_no, page_size, since_issue):
+                break
+        else:
+            print(f"{lottery_code}增量爬取{Config.CRAWLER_INCREMENTAL_MAX_PAGES}页仍未遇到已知期号{since_issue}，中间可能有缺失的开奖需要回填")
+        return {**data, "result": items}
+    
+    async def _fetch_draw_notice_async(self, client, limiter, semaphores, lottery_code, page_size, page_no=1,
+                                       issue_start=None, day_start=None, day_end=None):
+        """异步请求开奖公告接口，使用令牌桶限速替代阻塞等待，失败返回None"""
+        import httpx
+        
+        # 按主机限制并发数
+        host = urlsplit(self.base_url).netloc
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(Config.CRAWLER_MAX_CONCURRENCY_PER_HOST)
+        semaphore = semaphores[host]
+        
+        max_retries = Config.CRAWLER_MAX_RETRIES
+        retry_delay = Config.CRAWLER_RETRY_DELAY
+        
+        for attempt in range(max_retries):
+            try:
+                async with semaphore:
+                    waited = await limiter.acquire_async()
+                    if waited > 0:
+                        print(f"{lottery_code}限速等待{waited:.2f}秒后发送请求...")
+                    
+                    headers = {"User-Agent": random.choice(self.user_agents)}
+                    params = self._build_params(lottery_code, page_size, page_no, issue_start, day_start, day_end)
+                    response = await client.get(self.base_url, params=params, headers=headers)
+                
+                if response.status_code == 200:
+                    print(f"网络请求成功，获取到{lottery_code}数据（{response.http_version}）")
+                    return response.json()
+                else:
+                    print(f"请求失败，状态码：{response.status_code}，尝试第{attempt + 1}/{max_retries}次")
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"请求出错：{e}，尝试第{attempt + 1}/{max_retries}次")
+            
+            if attempt < max_retries - 1:
+                # 指数退避，只挂起当前协程
+                await asyncio.sleep(retry_delay * (2 ** attempt))
+        
+        return None
+    
+    async def _crawl_lottery_data_async(self, client, limiter, semaphores, lottery_code, page_size, force, incremental):
+        """异步爬取单个彩票类型，数据库操作放到线程中执行"""
+        from models.models import can_crawl_today
+        
+        if not await run_in_thread(can_crawl_today, lottery_code, force):
+            print(f"今天已经成功爬取过{lottery_code}数据，跳过本次爬取")
+            return 0
+        
+        since_issue = await run_in_thread(self._known_issue, lottery_code) if incremental else None
+        if since_issue is not None:
+            print(f"开始增量爬取{lottery_code}数据（{since_issue}期之后）...")
+            data = await self._fetch_new_draw_notices_async(client, limiter, semaphores, lottery_code, page_size, since_issue)
+        else:
+            print(f"开始爬取{lottery_code}数据...")
+            data = await self._fetch_draw_notice_async(client, limiter, semaphores, lottery_code, page_size)
+        return await run_in_thread(self._process_draw_notice, lottery_code, data, since_issue)
+    
+    async def crawl_all_lottery_data_async(self, force=False, page_size=30, lottery_codes=None, incremental=None):
+        """并发爬取所有彩票类型，共享一个HTTP/2客户端，返回{彩票代码: 期数或异常}"""
+        lottery_codes = lottery_codes or LOTTERY_CODES
+        if incremental is None:
+            incremental = Config.CRAWLER_INCREMENTAL
+        limiter = TokenBucket(Config.CRAWLER_RATE_PER_SECOND, Config.CRAWLER_BURST)
+        semaphores = {}
+        
+        async with self.async_client() as client:
+            counts = await asyncio.gather(
+                *(self._crawl_lottery_data_async(client, limiter, semaphores, code, page_size, force, incremental) for code in lottery_codes),
+                return_exceptions=True
+            )
+        
+        return dict(zip(lottery_codes, counts))
+    
+    def crawl_all_lottery_data(self, force=False, concurrent=False, incremental=None):
+        """爬取所有彩票类型的数据，concurrent=True时使用异步并发模式"""
+        if concurrent:
+            try:
+                results = asyncio.run(self.crawl_all_lottery_data_async(force, incremental=incremental))
+            except ImportError as e:
+                print(f"异步爬取依赖缺失（{e}），改为顺序爬取")
+                return self.crawl_all_lottery_data(force, incremental=incremental)
+            
+            total_count = 0
+            for code, count in results.items():
+                if isinstance(count, Exception):
+                    print(f"{code}爬取失败：{count}")
+                else:
+                    total_count += count
+            print(f"\n并发爬取完成，共获取{total_count}期数据")
+            return total_count
+        
         total_count = 0
         
-        for code in lottery_codes:
-            count = self.crawl_lottery_data(code, 30, force)
+        for code in LOTTERY_CODES:
+            count = self.crawl_lottery_data(code, 30, force, incremental)
             total_count += count
         
         print(f"\n爬取完成，共获取{total_count}期数据")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖日历轮询
+
+每种彩票只在固定的日子和时间开奖（lottery_type.description，如"每周二、四、日21:15开奖"）。
+调度器不再每天固定时间爬取全部类型，而是按开奖日历为每个类型计算下一次开奖时间，
+开奖后START_DELAY开始请求该类型，尚未出现新一期时按指数退避加大间隔继续轮询，
+新一期入库（data_version.max_draw_date到达开奖日期）后立即停止，转入下一次开奖。
+
+DrawPoller本身不读时钟也不睡眠：tick(now)执行到期的轮询并返回下一次需要唤醒的时间，
+由调用方（LotteryScheduler用APScheduler的一次性任务）在该时间再次调用，测试中可直接传入假时钟。
+"""
+
+import datetime
+import re
+
+from config.config import Config
+
+# 中文星期到datetime.weekday()的映射
+WEEKDAY_NAMES = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6}
+
+DRAW_TIMEZONE = datetime.timezone(datetime.timedelta(hours=Config.DRAW_TIME_UTC_OFFSET_HOURS))
+
+class DrawSchedule:
+    """一个彩票类型的开奖日历：开奖的星期几和开奖时间（北京时间）"""
+    
+    def __init__(self, weekdays, hour, minute):
+        self.weekdays = tuple(sorted(weekdays))
+        self.hour = hour
+        self.minute = minute
+    
+    def __repr__(self):
+        return f'DrawSchedule(weekdays={self.weekdays}, time={self.hour:02d}:{self.minute:02d})'
+    
+    def _draw_on(self, date):
+        return datetime.datetime(date.year, date.month, date.day, self.hour, self.minute, tzinfo=DRAW_TIMEZONE)
+    
+    def next_draw(self, after):
+        """严格晚于after的下一次开奖时间"""
+        date = after.astimezone(DRAW_TIMEZONE).date()
+        for offset in range(8):
+            day = date + datetime.timedelta(days=offset)
+            if day.weekday() in self.weekdays and self._draw_on(day) > after:
+                return self._draw_on(day)
+        raise ValueError(f"开奖日历为空：{self}")
+    
+    def previous_draw(self, before):
+        """不晚于before的最近一次开奖时间"""
+        date = before.astimezone(DRAW_TIMEZONE).date()
+        for offset in range(8):
+            day = date - datetime.timedelta(days=offset)
+            if day.weekday() in self.weekdays and self._draw_on(day) <= before:
+                return self._draw_on(day)
+        raise ValueError(f"开奖日历为空：{self}")
+
+def parse_draw_schedule(description):
+    """从开奖说明解析开奖日历，支持"每日21:30开奖"和"每周二、四、日21:15开奖"，无法解析时返回None"""
+    if not description:
+        return None
+    match = re.search(r'每(日|天|周([一二三四五六日天、,，]+))\s*(\d{1,2})[:：](\d{2})', description)
+    if not match:
+        return None
+    if match.group(2):
+        weekdays = {WEEKDAY_NAMES[name] for name in match.group(2) if name in WEEKDAY_NAMES}
+    else:
+        weekdays = set(range(7))
+    if not weekdays:
+        return None
+    return DrawSchedule(weekdays, int(match.group(3)), int(match.group(4)))
+
+def load_draw_calendar():
+    """读取lottery_type中各类型的开奖日历，返回{彩票类型代码: DrawSchedule}，无法解析的类型跳过"""
+    from models.models import get_db_connection
+    
+    conn = get_db_connection(read_only=True)
+    rows = conn.execute('SELECT code, description FROM lottery_type').fetchall()
+    conn.close()
+    
+    calendar = {}
+    for code, description in rows:
+        schedule = parse_draw_schedule(description)
+        if schedule is None:
+            print(f"无法解析{code}的开奖时间（{description}），不做开奖日历轮询")
+            continue
+        calendar[code] = schedule
+    return calendar
+
+def draw_stored(code, draw_at):
+    """判断开奖日期为draw_at当天或更晚的一期是否已经入库"""
+    from models.models import get_data_version
+    
+    data_version = get_data_version(code)
+    max_draw_date = data_version['max_draw_date'] if data_version else None
+    return bool(max_draw_date) and max_draw_date[:10] >= draw_at.date().isoformat()
+
+class PollState:
+    """一个彩票类型当前等待的开奖及轮询进度"""
+    
+    def __init__(self, code, schedule, draw_at, next_poll_at, interval):
+        self.code = code
+        self.schedule = schedule
+        self.draw_at = draw_at
+        self.next_poll_at = next_poll_at
+        self.interval = interval
+        self.attempts = 0
+
+class DrawPoller:
+    """按开奖日历轮询各彩票类型
+    
+    poll(code, draw_at)执行一次上游请求并返回该期是否已经入库；is_stored(code, draw_at)只查询数据库，
+    用于启动时判断最近一次开奖是否已有数据。两者都可替换，便于用假时钟和假上游测试。
+    """
+    
+    def __init__(self, calendar, poll, is_stored=draw_stored, start_delay=None, initial_interval=None,
+                 backoff_factor=None, max_interval=None, give_up_after=None):
+        self.calendar = calendar
+        self.poll = poll
+        self.is_stored = is_stored
+        self.start_delay = start_delay or datetime.timedelta(minutes=Config.DRAW_POLL_START_DELAY_MINUTES)
+        self.initial_interval = initial_interval or datetime.timedelta(minutes=Config.DRAW_POLL_INITIAL_INTERVAL_MINUTES)
+        self.backoff_factor = backoff_factor or Config.DRAW_POLL_BACKOFF_FACTOR
+        self.max_interval = max_interval or datetime.timedelta(minutes=Config.DRAW_POLL_MAX_INTERVAL_MINUTES)
+        self.give_up_after = give_up_after or datetime.timedelta(hours=Config.DRAW_POLL_GIVE_UP_HOURS)
+        self.states = {}
+        # 已完成的开奖：[(彩票类型代码, 开奖时间, 入库时间或None（放弃）, 请求次数)]
+        self.history = []
+    
+    def _wait_for(self, code, schedule, draw_at):
+        self.states[code] = PollState(code, schedule, draw_at, draw_at + self.start_delay, self.initial_interval)
+    
+    def start(self, now):
+        """为每个类型确定要等待的开奖：最近一次开奖尚未入库且未超过放弃时间时先补抓，否则等待下一次"""
+        for code, schedule in self.calendar.items():
+            previous = schedule.previous_draw(now)
+            if now - previous < self.give_up_after and not self.is_stored(code, previous):
+                self._wait_for(code, schedule, previous)
+            else:
+                self._wait_for(code, schedule, schedule.next_draw(now))
+        return self.next_wakeup()
+    
+    def next_wakeup(self):
+        """下一次需要调用tick的时间"""
+        return min((state.next_poll_at for state in self.states.values()), default=None)
+    
+    def _finish(self, state, now, stored_at):
+        self.history.append((state.code, state.draw_at, stored_at, state.attempts))
+        self._wait_for(state.code, state.schedule, state.schedule.next_draw(max(now, state.draw_at)))
+    
+    def tick(self, now):
+        """执行所有到期的轮询，返回下一次唤醒时间"""
+        for state in list(self.states.values()):
+            if now < state.next_poll_at:
+                continue
+            if now - state.draw_at > self.give_up_after:
+                print(f"{state.code}在{state.draw_at:%Y-%m-%d %H:%M}开奖后{self.give_up_after}内未获取到新一期，放弃本期轮询")
+                self._finish(state, now, None)
+                continue
+            
+            state.attempts += 1
+            try:
+                found = self.poll(state.code, state.draw_at)
+            except Exception as e:
+                print(f"{state.code}轮询出错：{e}")
+                found = False
+            
+            if found:
+                print(f"{state.code}第{state.attempts}次轮询获取到{state.draw_at:%Y-%m-%d}开奖，距开奖{now - state.draw_at}")
+                self._finish(state, now, now)
+            else:
+                state.next_poll_at = now + state.interval
+                state.interval = min(state.interval * self.backoff_factor, self.max_interval)
+        return self.next_wakeup()
+
+def crawl_poll(crawler, page_size=None):
+    """生成实际的轮询函数：强制爬取该类型最近几期，再检查目标开奖是否已经入库
+    
+    与定时爬取（LotteryScheduler.safe_crawl_all_lottery_data）一样，存在未修复的爬取错误时不爬取；
+    请求失败时不使用本地备份数据，也不记录爬取成功，本次轮询按未入库处理并退避重试。
+    """
+    page_size = page_size or Config.DRAW_POLL_PAGE_SIZE
+    
+    def poll(code, draw_at):
+        from models.models import has_unfixed_errors
+        
+        if has_unfixed_errors():
+            print(f"存在未修复的爬取错误，跳过{code}本次轮询")
+            return False
+        crawler.crawl_lottery_data(code, page_size, force=True, use_fallback=False)
+        return draw_stored(code, draw_at)
+    return poll
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖公告解析器
+
+每种彩票注册一个DrawParser，奖级规则在创建时编译成查找表：接口中的奖级代码（整数1、2或
+"x10z9"、"单选"这样的文本，统一按文本查找）-> (排序, 奖级名称)。解析一条开奖只遍历一次prizegrades，
+逐个查表取出全部奖级，不再对每个奖级做isinstance和子串判断。
+
+一、二等奖仍按原解析规则的奖级代码（整数1、2或"一等奖"、"二等奖"等中文名称）填入lottery_result的
+first_prize_*、second_prize_*列，同一条开奖中有多个奖级符合时取排在最后的一个（与原解析循环的覆盖顺序一致），
+全部奖级按排序放在结果字典的prize_grades中，由save_lottery_results_bulk写入prize_grade表。
+未登记的奖级代码不会丢弃，排在已登记奖级之后。
+"""
+
+from models.models import parse_amount_cents
+
+# 未登记奖级的排序起点
+UNKNOWN_GRADE_POSITION = 1000
+
+# 每个解析器缓存的金额文本个数上限
+AMOUNT_CACHE_SIZE = 4096
+
+CHINESE_GRADE_NAMES = ('一等奖', '二等奖', '三等奖', '四等奖', '五等奖', '六等奖', '七等奖')
+
+def parse_winner_count(text):
+    """中奖注数：空值按0处理，兼容带千位分隔符的文本"""
+    if isinstance(text, int):
+        return text
+    text = (text or '').strip()
+    if text.isdigit():
+        return int(text)
+    text = text.replace(',', '')
+    return int(text) if text else 0
+
+class DrawParser:
+    """一种彩票的开奖解析规则
+    
+    grades为[(奖级代码, 奖级名称)]，按奖级从高到低排列；aliases为{别名代码: 奖级代码}，
+    first、second为填入一、二等奖列的奖级代码（接口中的原始写法，不经别名转换）。
+    """
+    
+    def __init__(self, code, grades, aliases=None, first=('1', '一等奖'), second=('2', '二等奖')):
+        self.code = code
+        self.grade_table = {}
+        for position, (grade, name) in enumerate(grades, 1):
+            self.grade_table[grade] = (position, name)
+        for alias, grade in (aliases or {}).items():
+            self.grade_table[alias] = self.grade_table[grade]
+        self.first = frozenset(first)
+        self.second = frozenset(second)
+        # 固定奖金的奖级每期金额相同，缓存金额文本到分值的换算结果
+        self.amount_cents = {}
+    
+    def parse_grades(self, prize_grades):
+        """解析prizegrades，返回按排序排列的[(排序, 奖级代码, 奖级名称, 中奖注数, 单注奖金, 单注奖金（分）)]"""
+        grades = []
+        grade_table = self.grade_table
+        amount_cents = self.amount_cents
+        unknown = UNKNOWN_GRADE_POSITION
+        last_position = 0
+        ordered = True
+        for prize in prize_grades:
+            grade = str(prize.get("type", ""))
+            position, name = grade_table.get(grade) or (None, grade)
+            if position is None:
+                unknown += 1
+                position = unknown
+            if position < last_position:
+                ordered = False
+            last_position = position
+            amount = prize.get("typemoney") or ""
+            cents = amount_cents.get(amount)
+            if cents is None:
+                cents = parse_amount_cents(amount)
+                if len(amount_cents) < AMOUNT_CACHE_SIZE:
+                    amount_cents[amount] = cents
+            grades.append((position, grade, name, parse_winner_count(prize.get("typenum")), amount, cents))
+        # 接口通常已按奖级从高到低返回，只有乱序时才需要排序
+        if not ordered:
+            grades.sort()
+        return grades
+    
+    def parse(self, item, type_id):
+        """把一条开奖公告解析为save_lottery_results_bulk的入参"""
+        red = item.get("red") or ""
+        blue = item.get("blue") or item.get("blue2") or None
+        sales = item.get("sales") or ""
+        pool_money = item.get("poolmoney") or ""
+        grades = self.parse_grades(item.get("prizegrades") or ())
+        
+        first = second = None
+        for grade in grades:
+            if grade[1] in self.first:
+                first = grade
+            elif grade[1] in self.second:
+                second = grade
+        return {
+            "type_id": type_id,
+            "issue": item.get("code", ""),
+            "draw_date": item.get("date", "").partition("(")[0],
+            "red_balls": red.split(",") if red else [],
+            "blue_balls": blue,
+            "sales": sales,
+            "pool_money": pool_money,
+            "first_prize_count": first[3] if first else 0,
+            "first_prize_amount": first[4] if first else "",
+            "second_prize_count": second[3] if second else 0,
+            "second_prize_amount": second[4] if second else "",
+            # 金额统一在此处解析为以分为单位的整数
+            "sales_cents": parse_amount_cents(sales),
+            "pool_money_cents": parse_amount_cents(pool_money),
+            "first_prize_amount_cents": first[5] if first else None,
+            "second_prize_amount_cents": second[5] if second else None,
+            "prize_grades": grades
+        }
+
+# 已注册的解析器：{彩票类型代码: DrawParser}
+PARSERS = {}
+
+def register_parser(parser):
+    PARSERS[parser.code] = parser
+    return parser
+
+def get_parser(lottery_code):
+    """获取彩票类型的解析器，未注册的类型使用只按整数奖级解析的通用规则"""
+    parser = PARSERS.get(lottery_code)
+    if parser is None:
+        parser = PARSERS[lottery_code] = DrawParser(lottery_code, [])
+    return parser
+
+def _kl8_grades():
+    """快乐8：选十到选一，每种玩法按中奖个数从多到少"""
+    grades = []
+    for picked in range(10, 0, -1):
+        for hit in range(picked, -1, -1):
+            grades.append((f"x{picked}z{hit}", f"选{picked}中{hit}"))
+    return grades
+
+# 双色球、七乐彩的奖级代码有整数和中文名称两种写法
+register_parser(DrawParser(
+    "ssq",
+    [(str(level), name) for level, name in enumerate(CHINESE_GRADE_NAMES[:6], 1)] + [("7", "福运奖")],
+    aliases={**{name: str(level) for level, name in enumerate(CHINESE_GRADE_NAMES[:6], 1)}, "福运奖": "7"}
+))
+register_parser(DrawParser(
+    "qlc",
+    [(str(level), name) for level, name in enumerate(CHINESE_GRADE_NAMES, 1)],
+    aliases={name: str(level) for level, name in enumerate(CHINESE_GRADE_NAMES, 1)}
+))
+# 3D的奖级代码有整数和中文两种写法：1为单选，2为组选3，3为组选6
+# 二等奖列沿用原解析规则：整数写法只取2（组选3），中文写法取任一组选奖级，两个都有时取后出现的
+register_parser(DrawParser(
+    "3d",
+    [("单选", "单选"), ("组选3", "组选3"), ("组选6", "组选6")],
+    aliases={"1": "单选", "2": "组选3", "3": "组选6", "组三": "组选3", "组六": "组选6"},
+    first=("1", "单选"),
+    second=("2", "组选3", "组选6")
+))
+# 快乐8沿用原解析规则：一、二等奖列对应选一中一、选一中二（后者不存在，始终为空），全部奖级见prize_grade
+register_parser(DrawParser(
+    "kl8",
+    _kl8_grades(),
+    aliases={"一等奖": "x1z1"},
+    first=("x1z1", "一等奖"),
+    second=("x1z2", "二等奖")
+))
@@ -0,0 +1,72 @@
+"""
+gunicorn生产模式配置
+
+app.py末尾的app.run(debug=True)是单进程的Werkzeug开发服务器，只用于本地调试。生产环境使用gunicorn：
+    gunicorn -c gunicorn.conf.py
+    WEB_CONCURRENCY=4 THREADS=8 PORT=5000 gunicorn -c gunicorn.conf.py
+
+worker数量、线程数和超时默认取自Config.SERVER_*，可用环境变量覆盖。
+
+平滑重启：kill -HUP <master进程号>。master先在子进程中执行新代码的数据库迁移，再启动新的worker，
+旧worker停止接受新连接，处理完正在执行的请求（最长graceful_timeout秒）后退出，重启过程中的请求不会失败。
+
+master进程从不导入backend下的应用模块（配置文件按路径读取，迁移在子进程中执行），
+fork出的worker的sys.modules中没有旧代码，平滑重启后的worker会重新导入全部模块。
+修改gunicorn.conf.py本身的设置（如bind、workers）仍需完整重启master。
+
+定时任务通过文件锁只在一个worker中运行（见scheduler.SchedulerLock），持锁的worker退出后由其他worker接管。
+"""
+
+import os
+import runpy
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 与app.py一致，保证从其他目录启动时也能导入backend下的模块
+sys.path.insert(0, BACKEND_DIR)
+
+# 按路径执行配置文件而不是import config.config：模块不会留在master的sys.modules中被worker继承
+Config = runpy.run_path(os.path.join(BACKEND_DIR, 'config', 'config.py'))['Config']
+
+wsgi_app = 'app:app'
+bind = os.environ.get('BIND', f"{Config.HOST}:{os.environ.get('PORT', Config.PORT)}")
+
+# gthread：每个worker一个进程、多个线程，SQLite读连接池按线程分配连接
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', Config.SERVER_WORKERS))
+threads = int(os.environ.get('THREADS', Config.SERVER_THREADS))
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+
+# 不预加载应用：每个worker自己导入app、建立数据库连接并参与调度器选主，
+# 避免fork后共享SQLite连接和文件锁；平滑重启时也会重新导入新代码
+preload_app = False
+
+accesslog = os.environ.get('ACCESS_LOG')
+errorlog = '-'
+
+def migrate_db(server):
+    """在子进程中执行数据库初始化和迁移，worker启动时不再有待执行的迁移，避免多个worker同时迁移
+    
+    子进程每次都按磁盘上的代码导入models，master本身不导入，平滑重启时新增的迁移同样会执行。
+    """
+    result = subprocess.run([sys.executable, '-m', 'models.models'], cwd=BACKEND_DIR)
+    if result.returncode != 0:
+        server.log.error(f"数据库迁移失败，退出码{result.returncode}")
+
+def on_starting(server):
+    """master启动时执行一次数据库迁移"""
+    migrate_db(server)
+
+def on_reload(server):
+    """平滑重启（HUP）时在启动新worker之前执行新代码中的迁移"""
+    migrate_db(server)
+
+def worker_exit(server, worker):
+    """worker退出时停止定时任务并释放选主锁，由其他worker接管"""
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.stop_background_jobs()
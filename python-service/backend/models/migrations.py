@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库版本迁移
+
+数据库版本记录在 PRAGMA user_version 中，迁移步骤按版本号顺序执行，每个步骤在自己的事务中
+完成并同时更新版本号。大表改写通过 MigrationContext.for_each_batch 按rowid分批提交，
+每批只短暂持有写锁，爬虫和API的读写可以在批次之间穿插进行。
+
+用法（在backend目录下执行）：
+    python -m models.migrations              # 执行所有待执行的迁移
+    python -m models.migrations --dry-run    # 在数据库副本上试运行并输出耗时报告
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from config.config import Config
+
+# 已注册的迁移步骤：[(版本号, 说明, 函数)]，按版本号升序排列
+MIGRATIONS = []
+
+def migration(version, description):
+    """注册一个迁移步骤，被装饰的函数接收MigrationContext"""
+    def decorator(func):
+        if any(existing[0] == version for existing in MIGRATIONS):
+            raise ValueError(f"迁移版本号重复：{version}")
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+class MigrationContext:
+    """迁移步骤的执行上下文，封装事务和分批处理"""
+    
+    def __init__(self, conn, batch_size=None):
+        self.conn = conn
+        self.batch_size = batch_size or Config.DB_MIGRATION_BATCH_SIZE
+        self.batches = 0
+        self.rows = 0
+    
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+    
+    def column_exists(self, table, column):
+        return any(row[1] == column for row in self.conn.execute(f'PRAGMA table_info({table})'))
+    
+    def add_column(self, table, column, declaration):
+        """添加列，列已存在时跳过，便于中断后重新执行"""
+        if not self.column_exists(table, column):
+            self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    
+    def for_each_batch(self, table, handler, batch_size=None):
+        """按rowid区间分批处理大表，每批单独提交
+        
+        handler(conn, start_rowid, end_rowid) 处理 [start_rowid, end_rowid) 区间内的行，
+        返回处理的行数。调用前会先提交当前事务，处理完成后重新开启事务。
+        """
+        batch_size = batch_size or self.batch_size
+        self.conn.execute('COMMIT')
+        
+        bounds = self.conn.execute(f'SELECT MIN(rowid), MAX(rowid) FROM {table}').fetchone()
+        if bounds[0] is not None:
+            start = bounds[0]
+            while start <= bounds[1]:
+                end = start + batch_size
+                self.conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self.rows += handler(self.conn, start, end) or 0
+                    self.conn.execute('COMMIT')
+                except Exception:
+                    self.conn.execute('ROLLBACK')
+                    raise
+                self.batches += 1
+                start = end
+        
+        self.conn.execute('BEGIN IMMEDIATE')
+    
+    def batched_update(self, table, set_sql, where_sql='1', params=(), batch_size=None):
+        """分批执行 UPDATE table SET set_sql WHERE where_sql"""
+        def handler(conn, start, end):
+            return conn.execute(f'''
+                UPDATE {table} SET {set_sql}
+                WHERE rowid >= ? AND rowid < ? AND ({where_sql})
+            ''', tuple(params) + (start, end)).rowcount
+        self.for_each_batch(table, handler, batch_size)
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def pending_migrations(conn, target=None):
+    """返回尚未执行的迁移步骤"""
+    current = get_schema_version(conn)
+    return [step for step in MIGRATIONS if step[0] > current and (target is None or step[0] <= target)]
+
+def migrate(conn, target=None, batch_size=None):
+    """执行所有待执行的迁移，返回每个步骤的执行报告"""
+    report = []
+    isolation_level = conn.isolation_level
+    # 手动管理事务，避免sqlite3模块在DDL前后自动提交
+    conn.isolation_level = None
+    try:
+        for version, description, func in pending_migrations(conn, target):
+            context = MigrationContext(conn, batch_size)
+            start = time.perf_counter()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                func(context)
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            report.append({
+                'version': version,
+                'description': description,
+                'seconds': time.perf_counter() - start,
+                'batches': context.batches,
+                'rows': context.rows
+            })
+            print(f"数据库迁移到版本{version}：{description}（{report[-1]['seconds']:.3f}秒）")
+    finally:
+        conn.isolation_level = isolation_level
+    return report
+
+def dry_run(db_file, target=None, batch_size=None):
+    """在数据库副本上执行迁移并返回耗时报告，原数据库不受影响"""
+    source = sqlite3.connect(f'file:{db_file}?mode=ro', uri=True)
+    copy_file = os.path.join(tempfile.mkdtemp(), 'migration_dry_run.db')
+    copy = sqlite3.connect(copy_file)
+    try:
+        source.backup(copy)
+        return migrate(copy, target, batch_size)
+    finally:
+        copy.close()
+        source.close()
+        os.remove(copy_file)
+
+@migration(1, '创建基础数据表')
+def create_base_tables(ctx):
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS lottery_type (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            code TEXT NOT NULL UNIQUE,
+            description TEXT
+        )
+    ''')
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS lottery_result (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type_id INTEGER NOT NULL,
+            issue TEXT NOT NULL,
+            draw_date TEXT NOT NULL,
+            red_balls TEXT NOT NULL,
+            blue_balls TEXT,
+            sales TEXT,
+            pool_money TEXT,
+            first_prize_count INTEGER,
+            first_prize_amount TEXT,
+            second_prize_count INTEGER,
+            second_prize_amount TEXT,
+            FOREIGN KEY (type_id) REFERENCES lottery_type(id),
+            UNIQUE(type_id, issue)
+        )
+    ''')
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_error (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lottery_code TEXT NOT NULL,
+            error_type TEXT NOT NULL,
+            error_message TEXT NOT NULL,
+            crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_fixed INTEGER DEFAULT 0,
+            fix_time TIMESTAMP,
+            fix_note TEXT
+        )
+    ''')
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_task (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lottery_code TEXT NOT NULL,
+            crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT NOT NULL
+        )
+    ''')
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS cleanup_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cleanup_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deleted_rows INTEGER,
+            backup_file TEXT,
+            status TEXT,
+            error_message TEXT
+        )
+    ''')
+
+@migration(2, '添加常用查询路径索引')
+def create_access_path_indexes(ctx):
+    # 最新结果、历史分页和统计中的 WHERE type_id = ? ORDER BY draw_date DESC
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_lottery_result_type_date
+        ON lottery_result (type_id, draw_date DESC, issue DESC)
+    ''')
+    # can_crawl_today按彩票类型、状态和时间范围查找
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crawl_task_code_status_time
+        ON crawl_task (lottery_code, status, crawl_time)
+    ''')
+    # 只索引未修复的错误，已修复的记录不占索引空间
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crawl_error_unfixed
+        ON crawl_error (lottery_code) WHERE is_fixed = 0
+    ''')
+
+def _amount_cents_sql(column):
+    """将金额文本列换算为分的SQL表达式，空值或非数字返回NULL"""
+    cleaned = f"REPLACE(TRIM({column}), ',', '')"
+    return f'''CASE WHEN {cleaned} <> '' AND {cleaned} NOT GLOB '*[^0-9.]*'
+        THEN CAST(ROUND(CAST({cleaned} AS REAL) * 100) AS INTEGER) END'''
+
+@migration(3, '金额字段增加以分为单位的整数列')
+def add_amount_cents_columns(ctx):
+    amount_columns = ('sales', 'pool_money', 'first_prize_amount', 'second_prize_amount')
+    for column in amount_columns:
+        ctx.add_column('lottery_result', f'{column}_cents', 'INTEGER')
+    
+    # 分批回填已有数据
+    ctx.batched_update(
+        'lottery_result',
+        ', '.join(f'{column}_cents = {_amount_cents_sql(column)}' for column in amount_columns)
+    )
+    
+    # 覆盖趋势统计查询，聚合时无需回表
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_lottery_result_type_date_amounts
+        ON lottery_result (type_id, draw_date, sales_cents, pool_money_cents, first_prize_count, first_prize_amount_cents)
+    ''')
+
+@migration(4, '号码拆分到lottery_ball表并增加号码位图列')
+def add_lottery_ball_table(ctx):
+    from models.models import ball_mask, parse_ball_numbers
+    
+    # 每期每个号码一行；冗余type_id以便按类型直接走索引统计
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS lottery_ball (
+            result_id INTEGER NOT NULL,
+            type_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            number INTEGER NOT NULL,
+            PRIMARY KEY (result_id, kind, position)
+        ) WITHOUT ROWID
+    ''')
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_lottery_ball_type_kind_number
+        ON lottery_ball (type_id, kind, number, result_id)
+    ''')
+    # 开奖结果被删除（如数据清理）时同步删除号码
+    ctx.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_lottery_result_delete_balls
+        AFTER DELETE ON lottery_result
+        BEGIN
+            DELETE FROM lottery_ball WHERE result_id = OLD.id;
+        END
+    ''')
+    ctx.add_column('lottery_result', 'red_mask_lo', 'INTEGER NOT NULL DEFAULT 0')
+    ctx.add_column('lottery_result', 'red_mask_hi', 'INTEGER NOT NULL DEFAULT 0')
+    
+    def backfill(conn, start, end):
+        rows = conn.execute('''
+            SELECT id, type_id, red_balls, blue_balls FROM lottery_result
+            WHERE rowid >= ? AND rowid < ?
+        ''', (start, end)).fetchall()
+        masks = []
+        balls = []
+        for result_id, type_id, red_balls, blue_balls in rows:
+            red_numbers = parse_ball_numbers(red_balls)
+            masks.append(ball_mask(red_numbers) + (result_id,))
+            for kind, numbers in (('red', red_numbers), ('blue', parse_ball_numbers(blue_balls))):
+                balls.extend((result_id, type_id, kind, position, number) for position, number in enumerate(numbers))
+        conn.executemany('UPDATE lottery_result SET red_mask_lo = ?, red_mask_hi = ? WHERE id = ?', masks)
+        conn.executemany('DELETE FROM lottery_ball WHERE result_id = ?', [(row[0],) for row in rows])
+        conn.executemany('''
+            INSERT INTO lottery_ball (result_id, type_id, kind, position, number) VALUES (?, ?, ?, ?, ?)
+        ''', balls)
+        return len(rows)
+    
+    ctx.for_each_batch('lottery_result', backfill)
+
+@migration(5, '增加号码统计表ball_stats')
+def add_ball_stats_table(ctx):
+    from models.models import BALL_STATS_COLUMNS, BALL_STATS_REBUILD_SQL
+    
+    # 每个彩票类型每个号码一行，开奖入库时增量更新，/stats直接读取
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS ball_stats (
+            type_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            number INTEGER NOT NULL,
+            hit_count INTEGER NOT NULL,
+            last_issue TEXT NOT NULL,
+            last_draw_date TEXT NOT NULL,
+            current_gap INTEGER NOT NULL,
+            PRIMARY KEY (type_id, kind, number)
+        )
+    ''')
+    ctx.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ball_stats_type_last_draw
+        ON ball_stats (type_id, last_draw_date, last_issue)
+    ''')
+    
+    ctx.execute('DELETE FROM ball_stats')
+    for (type_id,) in ctx.execute('SELECT id FROM lottery_type').fetchall():
+        ctx.execute(f'INSERT INTO ball_stats ({BALL_STATS_COLUMNS}) {BALL_STATS_REBUILD_SQL}', (type_id,))
+
+@migration(6, '增加数据版本表data_version')
+def add_data_version_table(ctx):
+    # 每个彩票类型一行，开奖数据变化时版本号加一，用于API缓存失效
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            type_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    ctx.execute('''
+        INSERT OR IGNORE INTO data_version (type_id, version)
+        SELECT id, 1 FROM lottery_type
+    ''')
+
+@migration(7, '数据版本表增加记录数、最新期号和开奖日期')
+def add_data_version_summary(ctx):
+    # 用于生成HTTP ETag和Last-Modified，条件请求无需再查询lottery_result
+    ctx.add_column('data_version', 'row_count', 'INTEGER NOT NULL DEFAULT 0')
+    ctx.add_column('data_version', 'max_issue', 'TEXT')
+    ctx.add_column('data_version', 'max_draw_date', 'TEXT')
+    ctx.execute('''
+        UPDATE data_version SET
+            row_count = (SELECT COUNT(*) FROM lottery_result WHERE type_id = data_version.type_id),
+            max_issue = (SELECT MAX(issue) FROM lottery_result WHERE type_id = data_version.type_id),
+            max_draw_date = (SELECT MAX(draw_date) FROM lottery_result WHERE type_id = data_version.type_id)
+    ''')
+
+@migration(8, '开奖结果增加预渲染的JSON片段列')
+def add_result_json_column(ctx):
+    from models.render import render_draw
+    
+    # 列表接口直接拼接该列，不再逐行构造字典再序列化
+    ctx.add_column('lottery_result', 'result_json', 'TEXT')
+    
+    def backfill(conn, start, end):
+        rows = conn.execute('''
+            SELECT id, issue, draw_date, red_balls, blue_balls, sales, pool_money,
+                   first_prize_count, first_prize_amount, second_prize_count, second_prize_amount
+            FROM lottery_result
+            WHERE rowid >= ? AND rowid < ?
+        ''', (start, end)).fetchall()
+        conn.executemany(
+            'UPDATE lottery_result SET result_json = ? WHERE id = ?',
+            [(render_draw(*row[1:]), row[0]) for row in rows]
+        )
+        return len(rows)
+    
+    ctx.for_each_batch('lottery_result', backfill)
+
+@migration(9, '增加历史回填进度表backfill_checkpoint')
+def add_backfill_checkpoint_table(ctx):
+    # 历史回填按(彩票类型, 开奖日期区间)分块，每块保存后记录状态，中断后从未完成的块继续
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+            lottery_code TEXT NOT NULL,
+            day_start TEXT NOT NULL,
+            day_end TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            issues INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (lottery_code, day_start, day_end)
+        )
+    ''')
+
+def _backfill_content_hash(ctx):
+    """按CONTENT_COLUMNS重新计算全部开奖的内容哈希"""
+    from models.models import CONTENT_COLUMNS, row_content_hash
+    
+    content_columns = ', '.join(CONTENT_COLUMNS)
+    
+    def backfill(conn, start, end):
+        rows = conn.execute(f'''
+            SELECT id, {content_columns} FROM lottery_result
+            WHERE rowid >= ? AND rowid < ?
+        ''', (start, end)).fetchall()
+        conn.executemany(
+            'UPDATE lottery_result SET content_hash = ? WHERE id = ?',
+            [(row_content_hash(row[1:]), row[0]) for row in rows]
+        )
+        return len(rows)
+    
+    ctx.for_each_batch('lottery_result', backfill)
+
+@migration(10, '开奖结果增加内容哈希列')
+def add_content_hash_column(ctx):
+    # 重复爬取时只比较哈希，内容未变化的行不再读出全部列比较、不再计算派生列，也不会被写入
+    ctx.add_column('lottery_result', 'content_hash', 'TEXT')
+    _backfill_content_hash(ctx)
+
+@migration(11, '增加奖级明细表prize_grade')
+def add_prize_grade_table(ctx):
+    # 每期每个奖级一行，lottery_result只保留一、二等奖
+    ctx.execute('''
+        CREATE TABLE IF NOT EXISTS prize_grade (
+            result_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            grade TEXT NOT NULL,
+            name TEXT NOT NULL,
+            winner_count INTEGER NOT NULL DEFAULT 0,
+            amount TEXT,
+            amount_cents INTEGER,
+            PRIMARY KEY (result_id, position)
+        ) WITHOUT ROWID
+    ''')
+    # 开奖结果被删除（如数据清理）时同步删除奖级
+    ctx.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_lottery_result_delete_prize_grades
+        AFTER DELETE ON lottery_result
+        BEGIN
+            DELETE FROM prize_grade WHERE result_id = OLD.id;
+        END
+    ''')
+
+@migration(12, '内容哈希不再包含奖级明细')
+def recompute_content_hash(ctx):
+    # 曾按奖级明细计算哈希的行改为只按CONTENT_COLUMNS计算，与迁移10和未带奖级明细的写入一致
+    _backfill_content_hash(ctx)
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库版本迁移")
+    parser.add_argument("--db", help="数据库文件，默认使用models.DB_FILE")
+    parser.add_argument("--dry-run", action="store_true", help="在数据库副本上试运行并输出耗时报告")
+    parser.add_argument("--target", type=int, help="迁移到指定版本")
+    parser.add_argument("--batch-size", type=int, help="大表分批处理的每批行数")
+    args = parser.parse_args()
+    
+    if args.db:
+        db_file = args.db
+    else:
+        from models.models import DB_FILE
+        db_file = DB_FILE
+    
+    conn = sqlite3.connect(db_file)
+    current = get_schema_version(conn)
+    pending = pending_migrations(conn, args.target)
+    print(f"数据库: {db_file}")
+    print(f"当前版本: {current}, 待执行迁移: {len(pending)}个")
+    
+    if args.dry_run:
+        conn.close()
+        report = dry_run(db_file, args.target, args.batch_size)
+        print("\n===== 迁移试运行报告 =====")
+        for step in report:
+            print(f"版本{step['version']} {step['description']}: {step['seconds']:.3f}秒, "
+                  f"{step['batches']}批, {step['rows']}行")
+        print(f"合计: {sum(step['seconds'] for step in report):.3f}秒")
+    else:
+        migrate(conn, args.target, args.batch_size)
+        conn.close()
+        print("迁移完成")
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,54 @@
+import functools
+import hashlib
+import itertools
+from collections import Counter
+import re
 import sqlite3
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import os
+import threading
+import time
+from models.render import render_draw
+from config.config import Config
+from models.migrations import migrate
 
-# 数据库文件路径，与Node.js后端保持一致
-DB_FILE = '/Users/eddie/工作空间/05workspace/01project/04mp_auto_push_caipiao/mp-auto-push/python-service/backend/lottery.db'
+# 数据库文件路径，与Node.js后端保持一致；部署时可用环境变量LOTTERY_DB_FILE指定
+DB_FILE = os.environ.get('LOTTERY_DB_FILE', '/Users/eddie/工作空间/05workspace/01project/04mp_auto_push_caipiao/mp-auto-push/python-service/backend/lottery.db')
+
+def configure_connection(conn, read_only=False):
+    """为新打开的连接设置缓存、内存映射和锁等待等PRAGMA"""
+    conn.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}')
+    conn.execute(f'PRAGMA cache_size = {-int(Config.DB_CACHE_SIZE_KB)}')
+    conn.execute(f'PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}')
+    if not read_only:
+        conn.execute(f'PRAGMA synchronous = {Config.DB_SYNCHRONOUS}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+
+def configure_storage(conn):
+    """设置数据库日志模式，返回实际生效的模式"""
+    try:
+        return conn.execute(f'PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}').fetchone()[0]
+    except sqlite3.OperationalError as e:
+        # 只读环境下无法切换日志模式，沿用数据库当前的设置
+        print(f"警告：无法设置日志模式{Config.DB_JOURNAL_MODE}：{e}")
+        return None
+
+def checkpoint_wal(mode=None):
+    """执行WAL检查点，将WAL文件中的内容写回数据库文件
+    
+    返回(busy, wal页数, 已写回页数)；非WAL模式下返回None。
+    """
+    mode = (mode or Config.DB_CHECKPOINT_MODE).upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"不支持的检查点模式：{mode}")
+    
+    conn = get_db_connection()
+    try:
+        if conn.execute('PRAGMA journal_mode').fetchone()[0].lower() != 'wal':
+            return None
+        return tuple(conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
+    finally:
+        conn.close()
 
 def init_db():
     """初始化数据库，创建必要的数据表"""
@@ -15,79 +61,17 @@ def init_db():
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
         
-        # 设置事务为只读模式，尝试先进行表结构检查
-        cursor.execute('PRAGMA read_uncommitted = 1')
-        
-        # 检查表是否存在，不存在则创建
-        tables_to_create = {
-            'lottery_type': '''
-                CREATE TABLE IF NOT EXISTS lottery_type (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    code TEXT NOT NULL UNIQUE,
-                    description TEXT
-                )
-            ''',
-            'lottery_result': '''
-                CREATE TABLE IF NOT EXISTS lottery_result (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    type_id INTEGER NOT NULL,
-                    issue TEXT NOT NULL,
-                    draw_date TEXT NOT NULL,
-                    red_balls TEXT NOT NULL,
-                    blue_balls TEXT,
-                    sales TEXT,
-                    pool_money TEXT,
-                    first_prize_count INTEGER,
-                    first_prize_amount TEXT,
-                    second_prize_count INTEGER,
-                    second_prize_amount TEXT,
-                    FOREIGN KEY (type_id) REFERENCES lottery_type(id),
-                    UNIQUE(type_id, issue)
-                )
-            ''',
-            'crawl_error': '''
-                CREATE TABLE IF NOT EXISTS crawl_error (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    lottery_code TEXT NOT NULL,
-                    error_type TEXT NOT NULL,
-                    error_message TEXT NOT NULL,
-                    crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_fixed INTEGER DEFAULT 0,
-                    fix_time TIMESTAMP,
-                    fix_note TEXT
-                )
-            ''',
-            'crawl_task': '''
-                CREATE TABLE IF NOT EXISTS crawl_task (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    lottery_code TEXT NOT NULL,
-                    crawl_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT NOT NULL
-                )
-            ''',
-            'cleanup_log': '''
-                CREATE TABLE IF NOT EXISTS cleanup_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cleanup_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    deleted_rows INTEGER,
-                    backup_file TEXT,
-                    status TEXT,
-                    error_message TEXT
-                )
-            '''
-        }
+        # 设置日志模式（WAL模式持久化在数据库文件中）
+        configure_storage(conn)
         
-        # 逐个创建表，捕获写入错误
-        for table_name, create_sql in tables_to_create.items():
-            try:
-                cursor.execute(create_sql)
-            except sqlite3.OperationalError as e:
-                if "readonly" in str(e).lower():
-                    print(f"警告：无法创建表{table_name}，可能是只读环境")
-                    break
-                else:
-                    raise
+        # 按版本执行数据库迁移（建表、建索引等）
+        try:
+            migrate(conn)
+        except sqlite3.OperationalError as e:
+            if "readonly" in str(e).lower():
+                print(f"警告：无法执行数据库迁移，可能是只读环境：{e}")
+            else:
+                raise
         
         # 插入初始彩票类型数据，使用try-except捕获写入错误
         lottery_types = [
@@ -96,6 +80,9 @@ def init_db():
             ('七乐彩', 'qlc', '每周一、三、五21:15开奖'),
             ('福彩3D', '3d', '每日21:15开奖')
         ]
+        # 只插入缺少的类型，已初始化的数据库不再开启写事务
+        existing_codes = {row[0] for row in cursor.execute('SELECT code FROM lottery_type')}
+        lottery_types = [lottery_type for lottery_type in lottery_types if lottery_type[1] not in existing_codes]
         
         try:
             cursor.executemany('''
@@ -134,20 +121,50 @@ def init_db():
         import traceback
         traceback.print_exc()
 
-def get_db_connection(read_only=False):
-    """获取数据库连接"""
+# 本进程中已执行过init_db的数据库文件
+_initialized_db_files = set()
+_init_lock = threading.Lock()
+
+def ensure_db():
+    """首次使用数据库前执行init_db，同一进程对同一数据库文件只执行一次
+    
+    表结构检查（迁移版本、初始数据）的结果按DB_FILE记住，应用不必在导入时初始化数据库，
+    由第一个请求触发；gunicorn部署时迁移已由master启动的子进程执行，worker中的检查不再有待执行的迁移。
+    """
+    if DB_FILE in _initialized_db_files:
+        return
+    with _init_lock:
+        if DB_FILE not in _initialized_db_files:
+            init_db()
+            _initialized_db_files.add(DB_FILE)
+
+class ClosingConnection(sqlite3.Connection):
+    """未启用连接池时使用的连接：与PooledConnection一致，with块结束时提交或回滚后关闭连接"""
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+def _connect(read_only=False, check_same_thread=True):
+    """打开一个新的数据库连接，无法读写时退回只读连接"""
     try:
         if read_only:
-            conn = sqlite3.connect(f'file:{DB_FILE}?mode=ro', uri=True)
+            conn = sqlite3.connect(f'file:{DB_FILE}?mode=ro', uri=True, check_same_thread=check_same_thread,
+                                   factory=ClosingConnection)
         else:
-            conn = sqlite3.connect(DB_FILE)
+            conn = sqlite3.connect(DB_FILE, check_same_thread=check_same_thread, factory=ClosingConnection)
+        configure_connection(conn, read_only)
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.OperationalError as e:
         if "readonly" in str(e).lower():
             print(f"警告：无法获取读写连接，尝试只读连接：{e}")
             try:
-                conn = sqlite3.connect(f'file:{DB_FILE}?mode=ro', uri=True)
+                conn = sqlite3.connect(f'file:{DB_FILE}?mode=ro', uri=True, check_same_thread=check_same_thread,
+                                       factory=ClosingConnection)
+                configure_connection(conn, read_only=True)
                 conn.row_factory = sqlite3.Row
                 return conn
             except Exception as ro_error:
@@ -156,26 +173,350 @@ def get_db_connection(read_only=False):
         else:
             raise
 
+class PooledConnection:
+    """从连接池借出的连接，close()时归还连接池而不是真正关闭"""
+    
+    def __init__(self, pool, lease, writer):
+        self._pool = pool
+        self._lease = lease
+        self._writer = writer
+    
+    def __getattr__(self, name):
+        return getattr(self._lease[0], name)
+    
+    def close(self):
+        """归还连接，重复调用无副作用"""
+        if self._lease is not None:
+            self._pool._release(self._lease, self._writer)
+            self._lease = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+        return False
+
+class ConnectionPool:
+    """线程感知的SQLite连接池：多个只读连接 + 一个串行化的写连接
+    
+    同一线程内重复获取会复用已借出的连接；空闲超过idle_timeout的只读连接会被回收。
+    """
+    
+    def __init__(self, db_file, size=8, idle_timeout=300, wait_timeout=30):
+        self.db_file = db_file
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open_readers = 0
+        self._writer_conn = None
+        self._writer_lock = threading.Lock()
+        self._stats = {
+            'reader_hits': 0,
+            'reader_misses': 0,
+            'reader_waits': 0,
+            'reader_wait_time': 0.0,
+            'writer_acquires': 0,
+            'writer_waits': 0,
+            'writer_wait_time': 0.0,
+            'evictions': 0
+        }
+    
+    def _evict_idle_locked(self):
+        """关闭空闲超时的只读连接，调用方需持有self._cond"""
+        deadline = time.monotonic() - self.idle_timeout
+        keep = []
+        for conn, last_used in self._idle:
+            if last_used < deadline:
+                conn.close()
+                self._open_readers -= 1
+                self._stats['evictions'] += 1
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+    
+    def _acquire_reader(self):
+        lease = getattr(self._local, 'reader', None)
+        if lease is not None:
+            lease[1] += 1
+            with self._cond:
+                self._stats['reader_hits'] += 1
+            return lease
+        
+        conn = None
+        with self._cond:
+            self._evict_idle_locked()
+            wait_start = None
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                    self._stats['reader_hits'] += 1
+                    break
+                if self._open_readers < self.size:
+                    self._open_readers += 1
+                    self._stats['reader_misses'] += 1
+                    break
+                if wait_start is None:
+                    wait_start = time.monotonic()
+                    self._stats['reader_waits'] += 1
+                remaining = self.wait_timeout - (time.monotonic() - wait_start)
+                if remaining <= 0:
+                    self._stats['reader_wait_time'] += time.monotonic() - wait_start
+                    raise sqlite3.OperationalError("数据库连接池已耗尽，等待只读连接超时")
+                self._cond.wait(remaining)
+            if wait_start is not None:
+                self._stats['reader_wait_time'] += time.monotonic() - wait_start
+        
+        if conn is None:
+            try:
+                conn = _connect(read_only=True, check_same_thread=False)
+            except Exception:
+                with self._cond:
+                    self._open_readers -= 1
+                    self._cond.notify()
+                raise
+        
+        lease = [conn, 1]
+        self._local.reader = lease
+        return lease
+    
+    def _acquire_writer(self):
+        lease = getattr(self._local, 'writer', None)
+        if lease is not None:
+            lease[1] += 1
+            return lease
+        
+        if not self._writer_lock.acquire(blocking=False):
+            wait_start = time.monotonic()
+            acquired = self._writer_lock.acquire(timeout=self.wait_timeout)
+            with self._cond:
+                self._stats['writer_waits'] += 1
+                self._stats['writer_wait_time'] += time.monotonic() - wait_start
+            if not acquired:
+                raise sqlite3.OperationalError("等待数据库写连接超时")
+        
+        try:
+            if self._writer_conn is None:
+                self._writer_conn = _connect(check_same_thread=False)
+        except Exception:
+            self._writer_lock.release()
+            raise
+        
+        with self._cond:
+            self._stats['writer_acquires'] += 1
+        lease = [self._writer_conn, 1]
+        self._local.writer = lease
+        return lease
+    
+    def acquire(self, read_only=False):
+        """借出一个连接，使用完毕后调用close()归还"""
+        if read_only:
+            return PooledConnection(self, self._acquire_reader(), False)
+        return PooledConnection(self, self._acquire_writer(), True)
+    
+    def _release(self, lease, writer, force=False):
+        attr = 'writer' if writer else 'reader'
+        # 连接已被强制归还（例如请求结束时统一清理），旧的代理不再生效
+        if getattr(self._local, attr, None) is not lease:
+            return
+        lease[1] = 0 if force else lease[1] - 1
+        if lease[1] > 0:
+            return
+        
+        setattr(self._local, attr, None)
+        conn = lease[0]
+        if writer:
+            # 未提交的事务直接丢弃，与关闭连接的行为保持一致
+            if conn.in_transaction:
+                conn.rollback()
+            self._writer_lock.release()
+        else:
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+    
+    def release_thread(self):
+        """归还当前线程仍持有的所有连接"""
+        for attr, writer in (('reader', False), ('writer', True)):
+            lease = getattr(self._local, attr, None)
+            if lease is not None:
+                self._release(lease, writer, force=True)
+    
+    def close_all(self):
+        """关闭所有空闲连接和写连接"""
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            self._open_readers -= len(self._idle)
+            self._idle = []
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+    
+    def stats(self):
+        """返回连接池命中、未命中和等待耗时统计"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open_readers'] = self._open_readers
+            stats['idle_readers'] = len(self._idle)
+        total = stats['reader_hits'] + stats['reader_misses']
+        stats['reader_hit_ratio'] = stats['reader_hits'] / total if total else 0.0
+        return stats
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool():
+    """获取当前数据库文件对应的连接池，DB_FILE变化时重建"""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.db_file == DB_FILE:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.db_file != DB_FILE:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(
+                DB_FILE,
+                size=Config.DB_POOL_SIZE,
+                idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+                wait_timeout=Config.DB_POOL_WAIT_TIMEOUT
+            )
+        return _pool
+
+def release_thread_connections():
+    """归还当前线程持有的连接，供Flask请求结束时调用"""
+    if _pool is not None:
+        _pool.release_thread()
+
+def releases_connections(func):
+    """包装在后台线程中执行的函数（定时任务、asyncio.to_thread等），结束时归还该线程持有的连接
+    
+    这些线程没有Flask请求结束时的清理，出错后未归还的写连接会让本进程之后的写入全部等待超时。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            release_thread_connections()
+    return wrapper
+
+def get_pool_stats():
+    """获取连接池统计信息"""
+    if not Config.DB_POOL_ENABLED:
+        return {'enabled': False}
+    stats = get_connection_pool().stats()
+    stats['enabled'] = True
+    return stats
+
+def get_db_connection(read_only=False):
+    """获取数据库连接，启用连接池时返回池化连接，close()即归还
+    
+    写入时使用with get_db_connection() as conn:，正常结束提交、出错回滚，并且一定会归还连接。
+    """
+    if not Config.DB_POOL_ENABLED:
+        return _connect(read_only)
+    return get_connection_pool().acquire(read_only)
+
 def get_lottery_type_id(code):
     """根据彩票类型代码获取类型ID"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     cursor.execute('SELECT id FROM lottery_type WHERE code = ?', (code,))
     result = cursor.fetchone()
     conn.close()
     return result['id'] if result else None
 
-def save_lottery_result(result):
-    """保存彩票开奖结果到数据库"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# lottery_result中由爬虫写入的列，顺序与_result_to_row一致
+RESULT_COLUMNS = (
+    'type_id', 'issue', 'draw_date', 'red_balls', 'blue_balls', 'sales', 'pool_money',
+    'first_prize_count', 'first_prize_amount', 'second_prize_count', 'second_prize_amount',
+    'sales_cents', 'pool_money_cents', 'first_prize_amount_cents', 'second_prize_amount_cents',
+    'red_mask_lo', 'red_mask_hi', 'result_json', 'content_hash'
+)
+
+# 号码位图：0-39号存入低位整数，40-80号存入高位整数，避免占用符号位
+BALL_MASK_SPLIT = 40
+
+# 各彩票类型号码的显示位数，未列出的类型按两位补零
+BALL_LABEL_WIDTH = {'3d': 1}
+
+# 各彩票类型红球号码的取值范围（含两端）
+RED_BALL_RANGE = {'ssq': (1, 33), 'kl8': (1, 80), 'qlc': (1, 30), '3d': (0, 9)}
+
+# 各彩票类型蓝球（七乐彩为特别号）的取值范围（含两端），没有蓝球的类型不列出
+BLUE_BALL_RANGE = {'ssq': (1, 16), 'qlc': (1, 30)}
+
+def ball_number_range(lottery_code, kind='red'):
+    """彩票类型某类号码的取值范围(最小号码, 最大号码)，未登记的类型返回None"""
+    return (RED_BALL_RANGE if kind == 'red' else BLUE_BALL_RANGE).get(lottery_code)
+
+# 位图能表示的号码范围：低位和高位整数各用63位
+BALL_MASK_RANGE = (0, BALL_MASK_SPLIT + 62)
+
+def parse_ball_numbers(text):
+    """将逗号分隔的号码文本解析为整数列表"""
+    if not text:
+        return []
+    return [int(ball) for ball in text.split(',') if ball.strip().isdigit()]
+
+def ball_mask(numbers):
+    """将号码集合编码为(低位, 高位)两个整数位图，重复号码只记一次，超出BALL_MASK_RANGE的号码抛出ValueError"""
+    low = high = 0
+    for number in numbers:
+        if not BALL_MASK_RANGE[0] <= number <= BALL_MASK_RANGE[1]:
+            raise ValueError(f"号码{number}超出位图范围{BALL_MASK_RANGE[0]}-{BALL_MASK_RANGE[1]}")
+        if number < BALL_MASK_SPLIT:
+            low |= 1 << number
+        else:
+            high |= 1 << (number - BALL_MASK_SPLIT)
+    return low, high
+
+def format_ball_number(lottery_code, number):
+    """按彩票类型格式化号码，例如双色球的1号显示为01"""
+    return str(number).zfill(BALL_LABEL_WIDTH.get(lottery_code, 2))
+
+def parse_amount_cents(value):
+    """将接口返回的金额文本（如"99414561.95"、"1,000"）换算为以分为单位的整数，空值返回None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    text = str(value).strip().replace(',', '')
+    if text.isdigit():
+        # 接口金额绝大多数是整数元，不必经过Decimal
+        return int(text) * 100
+    if not text:
+        return None
+    try:
+        return int((Decimal(text) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        return None
+
+# 开奖的原始内容列，其余列（金额分值、号码位图、JSON片段）都由它们计算得到
+CONTENT_COLUMNS = RESULT_COLUMNS[2:11]
+
+def row_content_hash(values):
+    """开奖内容的哈希：只按CONTENT_COLUMNS的取值计算，内容完全相同的开奖哈希相同
     
-    cursor.execute('''
-        INSERT OR REPLACE INTO lottery_result (
-            type_id, issue, draw_date, red_balls, blue_balls, sales, pool_money,
-            first_prize_count, first_prize_amount, second_prize_count, second_prize_amount
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    奖级明细不计入哈希，由save_lottery_results_bulk与prize_grade中已保存的奖级直接比较，
+    同一期开奖无论是否带奖级明细、经由哪条路径写入，哈希都一致。
+    """
+    return hashlib.blake2b(repr(tuple(values)).encode('utf-8'), digest_size=16).hexdigest()
+
+def _content_row(result):
+    """爬虫结果字典中的type_id、issue和CONTENT_COLUMNS，按数据库中的存储形式规整"""
+    return (
         result['type_id'],
         result['issue'],
         result['draw_date'],
@@ -187,36 +528,603 @@ def save_lottery_result(result):
         result['first_prize_amount'] or '',
         result['second_prize_count'] or 0,
         result['second_prize_amount'] or ''
-    ))
+    )
+
+def _result_to_row(result, content, content_hash):
+    """由爬虫结果字典和_content_row补齐其余列，得到按RESULT_COLUMNS排列的数据库行
+    
+    金额的整数列优先使用爬虫归一化时解析好的*_cents字段，缺失时再从文本解析。
+    倒数第二列是按models.render.DRAW_FIELDS预渲染的JSON片段，内容变化时随其他列一起更新。
+    只为新增和内容有变化的开奖调用，未变化的开奖只需计算内容哈希。
+    """
+    def cents(field):
+        key = f'{field}_cents'
+        return result[key] if key in result else parse_amount_cents(result[field])
     
-    conn.commit()
+    row = content + (
+        cents('sales'),
+        cents('pool_money'),
+        cents('first_prize_amount'),
+        cents('second_prize_amount')
+    ) + ball_mask(parse_ball_numbers(content[3]))
+    return row + (render_draw(*row[1:11]), content_hash)
+
+def _select_by_keys(cursor, columns, keys):
+    """按(type_id, issue)批量查询，每个彩票类型一次查询，返回{(type_id, issue): 数据库行}"""
+    issues_by_type = {}
+    for type_id, issue in keys:
+        issues_by_type.setdefault(type_id, set()).add(issue)
+    
+    found = {}
+    for type_id, issues in issues_by_type.items():
+        issues = list(issues)
+        placeholders = ','.join('?' * len(issues))
+        cursor.execute(f'''
+            SELECT type_id, issue, {', '.join(columns)} FROM lottery_result
+            WHERE type_id = ? AND issue IN ({placeholders})
+        ''', [type_id] + issues)
+        for row in cursor.fetchall():
+            found[(row[0], row[1])] = tuple(row)[2:]
+    return found
+
+# 判断已有记录是否变化所需的列：内容哈希，以及决定号码统计能否增量更新的开奖日期和号码
+EXISTING_ROW_COLUMNS = ('content_hash', 'draw_date', 'red_balls', 'blue_balls')
+
+def _fetch_existing_rows(cursor, rows):
+    """一次查询取出本批次中已存在记录的哈希、开奖日期和号码，返回{(type_id, issue): 按EXISTING_ROW_COLUMNS排列的值}"""
+    return _select_by_keys(cursor, EXISTING_ROW_COLUMNS, [(row[0], row[1]) for row in rows])
+
+def _write_balls(cursor, rows):
+    """为新增或变化的开奖结果重写lottery_ball中的逐个号码"""
+    if not rows:
+        return
+    result_ids = _select_by_keys(cursor, ('id',), [(row[0], row[1]) for row in rows])
+    ball_rows = []
+    for row in rows:
+        result_id = result_ids[(row[0], row[1])][0]
+        for kind, text in (('red', row[3]), ('blue', row[4])):
+            for position, number in enumerate(parse_ball_numbers(text)):
+                ball_rows.append((result_id, row[0], kind, position, number))
+    
+    cursor.executemany('DELETE FROM lottery_ball WHERE result_id = ?', [(ids[0],) for ids in result_ids.values()])
+    cursor.executemany('''
+        INSERT INTO lottery_ball (result_id, type_id, kind, position, number) VALUES (?, ?, ?, ?, ?)
+    ''', ball_rows)
+
+def _fetch_prize_grades(cursor, keys):
+    """批量取出已存在记录的全部奖级，返回{(type_id, issue): 按PRIZE_GRADES_SQL的列排列的奖级元组}"""
+    issues_by_type = {}
+    for type_id, issue in keys:
+        issues_by_type.setdefault(type_id, set()).add(issue)
+    
+    found = {}
+    for type_id, issues in issues_by_type.items():
+        issues = list(issues)
+        placeholders = ','.join('?' * len(issues))
+        cursor.execute(f'''
+            SELECT lottery_result.issue, prize_grade.position, prize_grade.grade, prize_grade.name,
+                   prize_grade.winner_count, prize_grade.amount, prize_grade.amount_cents
+            FROM lottery_result
+            JOIN prize_grade ON prize_grade.result_id = lottery_result.id
+            WHERE lottery_result.type_id = ? AND lottery_result.issue IN ({placeholders})
+            ORDER BY lottery_result.issue, prize_grade.position
+        ''', [type_id] + issues)
+        for row in cursor.fetchall():
+            found[(type_id, row[0])] = found.get((type_id, row[0]), ()) + (tuple(row)[1:],)
+    return found
+
+def _write_prize_grades(cursor, grades_by_key):
+    """为新增或变化的开奖结果重写prize_grade中的全部奖级，grades_by_key为{(type_id, issue): 奖级列表}"""
+    if not grades_by_key:
+        return
+    result_ids = _select_by_keys(cursor, ('id',), list(grades_by_key))
+    cursor.executemany('DELETE FROM prize_grade WHERE result_id = ?', [(ids[0],) for ids in result_ids.values()])
+    cursor.executemany('''
+        INSERT INTO prize_grade (result_id, position, grade, name, winner_count, amount, amount_cents)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(result_ids[key][0],) + tuple(grade) for key, grades in grades_by_key.items() for grade in grades])
+
+def _latest_ball_stats_draw(cursor, lottery_type_id):
+    """返回ball_stats已统计到的最新一期(draw_date, issue)，尚无统计时返回None"""
+    cursor.execute(LATEST_BALL_STATS_DRAW_SQL, (lottery_type_id,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+def _apply_draw_to_ball_stats(cursor, row):
+    """把一期新开奖计入ball_stats：所有号码遗漏加一，本期开出的号码次数累加、遗漏清零"""
+    type_id, issue, draw_date = row[0], row[1], row[2]
+    cursor.execute('UPDATE ball_stats SET current_gap = current_gap + 1 WHERE type_id = ?', (type_id,))
+    hits = []
+    for kind, text in (('red', row[3]), ('blue', row[4])):
+        for number, count in Counter(parse_ball_numbers(text)).items():
+            hits.append((type_id, kind, number, count, issue, draw_date))
+    cursor.executemany(BALL_STATS_HIT_SQL, hits)
+
+def _rebuild_ball_stats(cursor, lottery_type_id):
+    """根据lottery_ball全量重算一个彩票类型的ball_stats"""
+    cursor.execute('DELETE FROM ball_stats WHERE type_id = ?', (lottery_type_id,))
+    cursor.execute(f'INSERT INTO ball_stats ({BALL_STATS_COLUMNS}) {BALL_STATS_REBUILD_SQL}', (lottery_type_id,))
+
+def _update_ball_stats(cursor, inserts, rebuild_types):
+    """按本批次的变化维护ball_stats
+    
+    新增的开奖都晚于已统计的最新一期时逐期增量更新，否则（补录历史数据、号码被修改）
+    整体重算该彩票类型。
+    """
+    rebuild_types = set(rebuild_types)
+    inserts_by_type = {}
+    for row in inserts:
+        inserts_by_type.setdefault(row[0], []).append(row)
+    
+    for type_id, rows in inserts_by_type.items():
+        if type_id in rebuild_types:
+            continue
+        rows.sort(key=lambda row: (row[2], row[1]))
+        latest = _latest_ball_stats_draw(cursor, type_id)
+        if latest is not None and (rows[0][2], rows[0][1]) <= latest:
+            rebuild_types.add(type_id)
+            continue
+        for row in rows:
+            _apply_draw_to_ball_stats(cursor, row)
+    
+    for type_id in rebuild_types:
+        _rebuild_ball_stats(cursor, type_id)
+
+def _bump_data_version(cursor, type_ids):
+    """开奖数据变化后将对应彩票类型的数据版本号加一，并刷新记录数、最新期号和开奖日期"""
+    cursor.executemany('''
+        INSERT INTO data_version (type_id, version, updated_at, row_count, max_issue, max_draw_date)
+        SELECT ?, 1, CURRENT_TIMESTAMP, COUNT(*), MAX(issue), MAX(draw_date)
+        FROM lottery_result WHERE type_id = ?
+        ON CONFLICT (type_id) DO UPDATE SET
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP,
+            row_count = excluded.row_count,
+            max_issue = excluded.max_issue,
+            max_draw_date = excluded.max_draw_date
+    ''', [(type_id, type_id) for type_id in set(type_ids)])
+
+def save_lottery_results_bulk(results, chunk_size=500):
+    """批量保存彩票开奖结果
+    
+    每个批次在一个BEGIN IMMEDIATE事务中完成：先取得写锁，再一次性查出已存在记录的内容哈希，
+    内容相同的记录不写入；新记录和有变化的记录用一条INSERT ... ON CONFLICT DO UPDATE写入，
+    号码有变化时重写lottery_ball，带奖级明细（prize_grades）且与已保存的奖级不同的记录重写prize_grade，
+    再维护ball_stats统计和数据版本号。未带奖级明细的记录保留已保存的奖级，不算作变化。
+    查询前已持有写锁，其他进程不能在查询和写入之间插入同一期号，新增和更新的判断与实际写入一致，
+    新增记录不会被重复计入ball_stats。
+    返回各类结果的数量以及每行的处理结果(type_id, issue, 'inserted' | 'updated' | 'unchanged')。
+    """
+    summary = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'outcomes': []}
+    upsert_sql = f'''
+        INSERT INTO lottery_result ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})
+        ON CONFLICT (type_id, issue) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in RESULT_COLUMNS[2:])}
+        WHERE lottery_result.content_hash IS NOT excluded.content_hash
+    '''
+    
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        iterator = iter(results)
+        while True:
+            batch = list(itertools.islice(iterator, chunk_size))
+            if not batch:
+                break
+            
+            contents = [_content_row(result) for result in batch]
+            # 先取得写锁再查询已存在的记录，避免查询之后其他进程写入同一期号
+            if not conn.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
+            existing = _fetch_existing_rows(cursor, contents)
+            stored_grades = _fetch_prize_grades(cursor, [content[:2] for result, content in zip(batch, contents)
+                                                         if content[:2] in existing and result.get('prize_grades') is not None])
+            inserts = []
+            changed = {}
+            balls_changed = {}
+            grades_changed = {}
+            rebuild_types = set()
+            for result, content in zip(batch, contents):
+                key = content[:2]
+                prize_grades = result.get('prize_grades')
+                if prize_grades is not None:
+                    prize_grades = tuple(tuple(grade) for grade in prize_grades)
+                content_hash = row_content_hash(content[2:])
+                old = existing.get(key)
+                if old is None:
+                    outcome = 'inserted'
+                elif old[0] == content_hash:
+                    # 未带奖级明细时沿用已保存的奖级；带奖级明细时与已保存的奖级不同才算变化
+                    if prize_grades is None or stored_grades.get(key, ()) == prize_grades:
+                        outcome = 'unchanged'
+                    else:
+                        outcome = 'updated'
+                else:
+                    outcome = 'updated'
+                    # 已有开奖的日期或号码被修改时增量统计不再成立
+                    if old[1:] != content[2:5]:
+                        rebuild_types.add(key[0])
+                if outcome != 'unchanged':
+                    row = _result_to_row(result, content, content_hash)
+                    changed[key] = row
+                    if outcome == 'inserted':
+                        inserts.append(row)
+                    # 只有金额等其他列变化时号码明细不需要重写
+                    if old is None or old[2:] != content[3:5]:
+                        balls_changed[key] = row
+                    if prize_grades is not None:
+                        grades_changed[key] = prize_grades
+                # 同一批次中重复出现的期号以最后一次为准
+                existing[key] = (content_hash,) + content[2:5]
+                if prize_grades is not None:
+                    stored_grades[key] = prize_grades
+                summary[outcome] += 1
+                summary['outcomes'].append((key[0], key[1], outcome))
+            
+            cursor.executemany(upsert_sql, list(changed.values()))
+            _write_balls(cursor, list(balls_changed.values()))
+            _write_prize_grades(cursor, grades_changed)
+            _update_ball_stats(cursor, inserts, rebuild_types)
+            _bump_data_version(cursor, [key[0] for key in changed])
+            conn.commit()
+    finally:
+        conn.close()
+    
+    return summary
+
+def save_lottery_result(result):
+    """保存彩票开奖结果到数据库，返回'inserted'、'updated'或'unchanged'"""
+    return save_lottery_results_bulk([result])['outcomes'][0][2]
+
+# 查询语句集中定义，便于verify_query_plans.py检查执行计划
+LATEST_RESULTS_SQL = '''
+    SELECT * FROM lottery_result WHERE type_id = ? ORDER BY draw_date DESC LIMIT ?
+'''
+ALL_RESULTS_SQL = '''
+    SELECT * FROM lottery_result WHERE type_id = ? ORDER BY draw_date DESC, issue DESC LIMIT ? OFFSET ?
+'''
+# 游标分页：从上一页最后一条的(draw_date, issue)之后继续读取，深翻页不需要跳过offset行
+RESULTS_AFTER_SQL = '''
+    SELECT * FROM lottery_result
+    WHERE type_id = ? AND (draw_date, issue) < (?, ?)
+    ORDER BY draw_date DESC, issue DESC
+    LIMIT ?
+'''
+# 列表接口只读取排序键和预渲染的JSON片段
+LATEST_RESULT_JSON_SQL = '''
+    SELECT draw_date, issue, result_json FROM lottery_result
+    WHERE type_id = ?
+    ORDER BY draw_date DESC, issue DESC
+    LIMIT ?
+'''
+RESULT_JSON_PAGE_SQL = '''
+    SELECT draw_date, issue, result_json FROM lottery_result
+    WHERE type_id = ?
+    ORDER BY draw_date DESC, issue DESC
+    LIMIT ? OFFSET ?
+'''
+RESULT_JSON_AFTER_SQL = '''
+    SELECT draw_date, issue, result_json FROM lottery_result
+    WHERE type_id = ? AND (draw_date, issue) < (?, ?)
+    ORDER BY draw_date DESC, issue DESC
+    LIMIT ?
+'''
+RESULT_COUNT_SQL = '''
+    SELECT COUNT(*) FROM lottery_result WHERE type_id = ?
+'''
+RECENT_DRAWS_SQL = '''
+    SELECT issue, red_balls, blue_balls
+    FROM lottery_result
+    WHERE type_id = ?
+    ORDER BY draw_date DESC
+    LIMIT ?
+'''
+UNFIXED_ERROR_COUNT_SQL = '''
+    SELECT COUNT(*) FROM crawl_error
+    WHERE is_fixed = 0 AND lottery_code = ?
+'''
+ALL_UNFIXED_ERROR_COUNT_SQL = '''
+    SELECT COUNT(*) FROM crawl_error
+    WHERE is_fixed = 0
+'''
+# crawl_time以UTC存储，将本地日期的起止时间换算成UTC后做范围比较，可以使用索引
+TODAY_SUCCESS_COUNT_SQL = '''
+    SELECT COUNT(*) FROM crawl_task
+    WHERE lottery_code = ? AND status = 'SUCCESS'
+      AND crawl_time >= datetime('now', 'localtime', 'start of day', 'utc')
+      AND crawl_time < datetime('now', 'localtime', 'start of day', '+1 day', 'utc')
+'''
+
+# 按周期聚合销量、奖池和一等奖数据，只读取覆盖索引中的列
+TREND_PERIOD_FORMATS = {
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y'
+}
+PERIOD_TRENDS_SQL = '''
+    SELECT strftime(?, draw_date) AS period,
+           COUNT(*) AS draws,
+           SUM(sales_cents) AS total_sales_cents,
+           AVG(sales_cents) AS avg_sales_cents,
+           MAX(pool_money_cents) AS max_pool_money_cents,
+           MIN(pool_money_cents) AS min_pool_money_cents,
+           SUM(first_prize_count) AS first_prize_count,
+           MAX(first_prize_amount_cents) AS max_first_prize_amount_cents
+    FROM lottery_result
+    WHERE type_id = ? AND draw_date >= ?
+    GROUP BY period
+    ORDER BY period
+'''
+POOL_TREND_SQL = '''
+    SELECT draw_date, sales_cents, pool_money_cents
+    FROM lottery_result
+    WHERE type_id = ? AND draw_date >= ?
+    ORDER BY draw_date
+'''
+
+def get_period_trends(lottery_type_id, period='month', since=''):
+    """按周/月/年聚合销量和奖池趋势，金额单位为分"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(PERIOD_TRENDS_SQL, (TREND_PERIOD_FORMATS[period], lottery_type_id, since))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def get_pool_trend(lottery_type_id, since=''):
+    """获取每期销量和奖池金额序列，金额单位为分"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(POOL_TREND_SQL, (lottery_type_id, since))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+# 号码统计：基于lottery_ball索引和号码位图，不再逐行解析号码文本
+BALL_FREQUENCY_SQL = '''
+    SELECT number, COUNT(*) AS count
+    FROM lottery_ball
+    WHERE type_id = ? AND kind = ?
+    GROUP BY number
+'''
+CO_OCCURRENCE_SQL = '''
+    SELECT other.number, COUNT(*) AS count
+    FROM lottery_ball AS ball
+    JOIN lottery_ball AS other ON other.result_id = ball.result_id AND other.kind = ball.kind
+    WHERE ball.type_id = ? AND ball.kind = ? AND ball.number = ? AND other.number <> ball.number
+    GROUP BY other.number
+'''
+DRAWS_CONTAINING_SQL = '''
+    SELECT * FROM lottery_result
+    WHERE type_id = ? AND (red_mask_lo & ?) = ? AND (red_mask_hi & ?) = ?
+    ORDER BY draw_date DESC
+    LIMIT ?
+'''
+DRAWS_CONTAINING_COUNT_SQL = '''
+    SELECT COUNT(*) FROM lottery_result
+    WHERE type_id = ? AND (red_mask_lo & ?) = ? AND (red_mask_hi & ?) = ?
+'''
+
+def get_ball_frequency(lottery_type_id, kind='red'):
+    """统计每个号码的出现次数，返回[(号码, 次数)]"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(BALL_FREQUENCY_SQL, (lottery_type_id, kind))
+    results = [(row[0], row[1]) for row in cursor.fetchall()]
+    conn.close()
+    return results
+
+def get_co_occurrence(lottery_type_id, number, kind='red'):
+    """统计与指定号码同期开出的其他号码及次数，返回[(号码, 次数)]"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(CO_OCCURRENCE_SQL, (lottery_type_id, kind, number))
+    results = [(row[0], row[1]) for row in cursor.fetchall()]
+    conn.close()
+    return results
+
+def get_draws_containing(lottery_type_id, numbers, limit=20):
+    """查询同时包含所有指定红球号码的开奖结果，返回(最近的limit期, 总期数)"""
+    low, high = ball_mask(numbers)
+    params = (lottery_type_id, low, low, high, high)
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(DRAWS_CONTAINING_SQL, params + (limit,))
+    results = cursor.fetchall()
+    cursor.execute(DRAWS_CONTAINING_COUNT_SQL, params)
+    total = cursor.fetchone()[0]
+    conn.close()
+    return results, total
+
+# 号码统计表：每个号码的出现次数、最近开出的期号和当前遗漏期数，随开奖增量维护
+BALL_STATS_COLUMNS = 'type_id, kind, number, hit_count, last_issue, last_draw_date, current_gap'
+BALL_STATS_SQL = '''
+    SELECT number, hit_count, last_issue, last_draw_date, current_gap
+    FROM ball_stats
+    WHERE type_id = ? AND kind = ?
+'''
+LATEST_BALL_STATS_DRAW_SQL = '''
+    SELECT last_draw_date, last_issue FROM ball_stats
+    WHERE type_id = ?
+    ORDER BY last_draw_date DESC, last_issue DESC
+    LIMIT 1
+'''
+BALL_STATS_HIT_SQL = f'''
+    INSERT INTO ball_stats ({BALL_STATS_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, 0)
+    ON CONFLICT (type_id, kind, number) DO UPDATE SET
+        hit_count = hit_count + excluded.hit_count,
+        last_issue = excluded.last_issue,
+        last_draw_date = excluded.last_draw_date,
+        current_gap = 0
+'''
+# age为距最新一期的期数；MIN(age)聚合时SQLite取同一行的issue和draw_date作为最近开出的一期
+BALL_STATS_REBUILD_SQL = '''
+    WITH draws AS (
+        SELECT id, issue, draw_date,
+               ROW_NUMBER() OVER (ORDER BY draw_date DESC, issue DESC) - 1 AS age
+        FROM lottery_result
+        WHERE type_id = ?
+    )
+    SELECT ball.type_id, ball.kind, ball.number, COUNT(*), draws.issue, draws.draw_date, MIN(draws.age)
+    FROM lottery_ball AS ball
+    JOIN draws ON draws.id = ball.result_id
+    GROUP BY ball.type_id, ball.kind, ball.number
+'''
+
+def get_ball_stats(lottery_type_id, kind='red'):
+    """读取号码统计表，返回每个号码的出现次数、最近开出期号和当前遗漏"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(BALL_STATS_SQL, (lottery_type_id, kind))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def rebuild_ball_stats(lottery_type_id=None):
+    """全量重建号码统计表，不指定类型时重建所有彩票类型，返回重建的类型数"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if lottery_type_id is None:
+            cursor.execute('SELECT id FROM lottery_type')
+            type_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            type_ids = [lottery_type_id]
+        for type_id in type_ids:
+            _rebuild_ball_stats(cursor, type_id)
+        _bump_data_version(cursor, type_ids)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(type_ids)
+
+def check_ball_stats(conn, lottery_type_id):
+    """对比增量维护的ball_stats与全量重算结果，返回不一致的号码列表[(kind, number, 当前值, 重算值)]"""
+    stored = {
+        (row[1], row[2]): tuple(row[3:])
+        for row in conn.execute(f'SELECT {BALL_STATS_COLUMNS} FROM ball_stats WHERE type_id = ?', (lottery_type_id,))
+    }
+    rebuilt = {
+        (row[1], row[2]): tuple(row[3:])
+        for row in conn.execute(BALL_STATS_REBUILD_SQL, (lottery_type_id,))
+    }
+    return [
+        (key[0], key[1], stored.get(key), rebuilt.get(key))
+        for key in sorted(set(stored) | set(rebuilt))
+        if stored.get(key) != rebuilt.get(key)
+    ]
+
+# 数据版本：开奖数据每次变化后加一，API缓存以版本号作为键的一部分
+DATA_VERSION_COLUMNS = '''
+    lottery_type.id AS type_id,
+    lottery_type.code AS code,
+    COALESCE(data_version.version, 0) AS version,
+    data_version.updated_at AS updated_at,
+    COALESCE(data_version.row_count, 0) AS row_count,
+    data_version.max_issue AS max_issue,
+    data_version.max_draw_date AS max_draw_date
+'''
+DATA_VERSION_BY_CODE_SQL = f'''
+    SELECT {DATA_VERSION_COLUMNS}
+    FROM lottery_type
+    LEFT JOIN data_version ON data_version.type_id = lottery_type.id
+    WHERE lottery_type.code = ?
+'''
+ALL_DATA_VERSIONS_SQL = f'''
+    SELECT {DATA_VERSION_COLUMNS}
+    FROM lottery_type
+    LEFT JOIN data_version ON data_version.type_id = lottery_type.id
+    ORDER BY lottery_type.id
+'''
+
+def get_data_version(code):
+    """获取彩票类型当前的数据版本（版本号、更新时间、记录数、最新期号和开奖日期），类型不存在时返回None"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(DATA_VERSION_BY_CODE_SQL, (code,))
+    result = cursor.fetchone()
+    conn.close()
+    return result
+
+def get_all_data_versions():
+    """获取所有彩票类型的数据版本"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(ALL_DATA_VERSIONS_SQL)
+    results = cursor.fetchall()
     conn.close()
+    return results
 
 def get_latest_results(lottery_type_id, limit=10):
     """获取最新的开奖结果"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM lottery_result WHERE type_id = ? ORDER BY draw_date DESC LIMIT ?
-    ''', (lottery_type_id, limit))
+    cursor.execute(LATEST_RESULTS_SQL, (lottery_type_id, limit))
     results = cursor.fetchall()
     conn.close()
     return results
 
 def get_all_results(lottery_type_id, offset=0, limit=20):
     """获取所有开奖结果，支持分页"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM lottery_result WHERE type_id = ? ORDER BY draw_date DESC LIMIT ? OFFSET ?
-    ''', (lottery_type_id, limit, offset))
+    cursor.execute(ALL_RESULTS_SQL, (lottery_type_id, limit, offset))
     results = cursor.fetchall()
     conn.close()
     return results
 
+def get_results_after(lottery_type_id, draw_date, issue, limit=20):
+    """获取排在(draw_date, issue)之后的开奖结果，用于游标分页"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(RESULTS_AFTER_SQL, (lottery_type_id, draw_date, issue, limit))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def get_result_fragments(lottery_type_id, limit=20, offset=0, after=None):
+    """按开奖日期倒序读取预渲染的JSON片段，返回[(draw_date, issue, result_json)]
+    
+    after为(draw_date, issue)时从该期之后继续读取（游标分页），否则跳过offset行。
+    行直接以元组返回，不构造sqlite3.Row。
+    """
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    if after is not None:
+        cursor.execute(RESULT_JSON_AFTER_SQL, (lottery_type_id, after[0], after[1], limit))
+    elif offset:
+        cursor.execute(RESULT_JSON_PAGE_SQL, (lottery_type_id, limit, offset))
+    else:
+        cursor.execute(LATEST_RESULT_JSON_SQL, (lottery_type_id, limit))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+EXPORT_RESULTS_SQL = '''
+    SELECT * FROM lottery_result WHERE type_id = ? ORDER BY draw_date, issue
+'''
+
+def iter_results(lottery_type_id, batch_size=1000):
+    """按开奖日期顺序逐批读取全部开奖结果，每次产出一批行，内存占用与历史数据量无关
+    
+    使用独立的只读连接而不是连接池：流式响应在请求结束、连接池归还线程连接之后才会被消费完。
+    导出是一次性的顺序扫描，关闭内存映射，避免整个数据库文件被映射进进程、推高RSS。
+    """
+    conn = _connect(read_only=True, check_same_thread=False)
+    conn.execute('PRAGMA mmap_size = 0')
+    try:
+        cursor = conn.execute(EXPORT_RESULTS_SQL, (lottery_type_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
 def get_result_by_issue(lottery_type_id, issue):
     """根据期号获取开奖结果"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     cursor.execute('''
         SELECT * FROM lottery_result WHERE type_id = ? AND issue = ?
@@ -227,14 +1135,12 @@ def get_result_by_issue(lottery_type_id, issue):
 
 def log_crawl_error(lottery_code, error_type, error_message):
     """记录爬取错误"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO crawl_error (lottery_code, error_type, error_message)
-        VALUES (?, ?, ?)
-    ''', (lottery_code, error_type, error_message))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO crawl_error (lottery_code, error_type, error_message)
+            VALUES (?, ?, ?)
+        ''', (lottery_code, error_type, error_message))
 
 def has_unfixed_errors(lottery_code=None):
     """检查是否有未修复的错误"""
@@ -245,20 +1151,14 @@ def has_unfixed_errors(lottery_code=None):
     logger = logging.getLogger(__name__)
     
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(read_only=True)
         cursor = conn.cursor()
         if lottery_code:
             logger.info(f"检查{lottery_code}是否有未修复的错误")
-            cursor.execute('''
-                SELECT COUNT(*) FROM crawl_error
-                WHERE is_fixed = 0 AND lottery_code = ?
-            ''', (lottery_code,))
+            cursor.execute(UNFIXED_ERROR_COUNT_SQL, (lottery_code,))
         else:
             logger.info("检查所有彩票类型是否有未修复的错误")
-            cursor.execute('''
-                SELECT COUNT(*) FROM crawl_error
-                WHERE is_fixed = 0
-            ''')
+            cursor.execute(ALL_UNFIXED_ERROR_COUNT_SQL)
         count = cursor.fetchone()[0]
         conn.close()
         logger.info(f"未修复的错误数量: {count}")
@@ -270,28 +1170,24 @@ def has_unfixed_errors(lottery_code=None):
 
 def mark_error_as_fixed(error_id, fix_note=""):
     """标记错误为已修复"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE crawl_error
-        SET is_fixed = 1, fix_time = CURRENT_TIMESTAMP, fix_note = ?
-        WHERE id = ?
-    ''', (fix_note, error_id))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE crawl_error
+            SET is_fixed = 1, fix_time = CURRENT_TIMESTAMP, fix_note = ?
+            WHERE id = ?
+        ''', (fix_note, error_id))
 
 def mark_all_errors_as_fixed(lottery_code, fix_note=""):
     """自动修复指定彩票类型的所有错误"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE crawl_error
-        SET is_fixed = 1, fix_time = CURRENT_TIMESTAMP, fix_note = ?
-        WHERE lottery_code = ? AND is_fixed = 0
-    ''', (fix_note, lottery_code))
-    affected_rows = cursor.rowcount
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE crawl_error
+            SET is_fixed = 1, fix_time = CURRENT_TIMESTAMP, fix_note = ?
+            WHERE lottery_code = ? AND is_fixed = 0
+        ''', (fix_note, lottery_code))
+        affected_rows = cursor.rowcount
     return affected_rows
 
 def can_crawl_today(lottery_code, force=False):
@@ -299,17 +1195,11 @@ def can_crawl_today(lottery_code, force=False):
     if force:
         return True
     
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     
-    # 获取今天的本地日期
-    today = conn.execute("SELECT DATE('now', 'localtime')").fetchone()[0]
-    
-    # 检查今天是否有成功的爬取记录
-    cursor.execute('''
-        SELECT COUNT(*) FROM crawl_task
-        WHERE DATE(crawl_time, 'localtime') = ? AND lottery_code = ? AND status = 'SUCCESS'
-    ''', (today, lottery_code))
+    # 检查今天（本地日期）是否有成功的爬取记录
+    cursor.execute(TODAY_SUCCESS_COUNT_SQL, (lottery_code,))
     success_count = cursor.fetchone()[0]
     
     if success_count > 0:
@@ -321,19 +1211,161 @@ def can_crawl_today(lottery_code, force=False):
 
 def log_crawl_task(lottery_code, status):
     """记录爬取任务"""
-    conn = get_db_connection()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO crawl_task (lottery_code, status)
+            VALUES (?, ?)
+        ''', (lottery_code, status))
+
+PRIZE_GRADES_SQL = '''
+    SELECT prize_grade.position, prize_grade.grade, prize_grade.name, prize_grade.winner_count,
+           prize_grade.amount, prize_grade.amount_cents
+    FROM lottery_result
+    JOIN prize_grade ON prize_grade.result_id = lottery_result.id
+    WHERE lottery_result.type_id = ? AND lottery_result.issue = ?
+    ORDER BY prize_grade.position
+'''
+
+def get_prize_grades(lottery_type_id, issue):
+    """获取一期开奖的全部奖级，按奖级从高到低排列"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(PRIZE_GRADES_SQL, (lottery_type_id, issue))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+BACKFILL_PENDING_SQL = '''
+    SELECT day_start, day_end, attempts FROM backfill_checkpoint
+    WHERE lottery_code = ? AND status != 'done'
+    ORDER BY day_start DESC
+'''
+
+def _unplanned_ranges(day_start, day_end, planned):
+    """从日期区间中扣除已登记的区间planned（按day_start排序），返回剩余的[(day_start, day_end)]"""
+    import datetime
+    
+    ranges = []
+    for start, end in planned:
+        if end < day_start or start > day_end:
+            continue
+        if start > day_start:
+            ranges.append((day_start, (datetime.date.fromisoformat(start) - datetime.timedelta(days=1)).isoformat()))
+        day_start = (datetime.date.fromisoformat(end) + datetime.timedelta(days=1)).isoformat()
+        if day_start > day_end:
+            return ranges
+    ranges.append((day_start, day_end))
+    return ranges
+
+def plan_backfill(lottery_code, chunks):
+    """登记回填的日期区间[(day_start, day_end)]，返回新登记的区间数
+    
+    已登记的日期保留原有进度，不再重复登记：区间与已有区间重叠的部分被扣除，只登记剩余的日期。
+    区间划分与上次不同（如截止日期推后）时也只会增加新的日期，不会重新请求已完成的范围。
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT day_start, day_end FROM backfill_checkpoint WHERE lottery_code = ? ORDER BY day_start
+        ''', (lottery_code,))
+        planned = cursor.fetchall()
+        rows = [(lottery_code, start, end) for day_start, day_end in chunks
+                for start, end in _unplanned_ranges(day_start, day_end, planned)]
+        cursor.executemany('''
+            INSERT OR IGNORE INTO backfill_checkpoint (lottery_code, day_start, day_end)
+            VALUES (?, ?, ?)
+        ''', rows)
+        return len(rows)
+
+def get_pending_backfill_chunks(lottery_code):
+    """获取尚未完成的回填区间（含失败的区间），按开奖日期从新到旧排列"""
+    conn = get_db_connection(read_only=True)
+    cursor = conn.cursor()
+    cursor.execute(BACKFILL_PENDING_SQL, (lottery_code,))
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def record_backfill_chunk(lottery_code, day_start, day_end, status, issues=0):
+    """记录一个回填区间的处理结果，status为'done'或'failed'"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE backfill_checkpoint
+            SET status = ?, issues = ?, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE lottery_code = ? AND day_start = ? AND day_end = ?
+        ''', (status, issues, lottery_code, day_start, day_end))
+
+def get_backfill_progress():
+    """按彩票类型和状态汇总回填进度，返回[(彩票类型代码, 状态, 区间数, 期数)]"""
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     cursor.execute('''
-        INSERT INTO crawl_task (lottery_code, status)
-        VALUES (?, ?)
-    ''', (lottery_code, status))
-    conn.commit()
+        SELECT lottery_code, status, COUNT(*), SUM(issues) FROM backfill_checkpoint
+        GROUP BY lottery_code, status ORDER BY lottery_code, status
+    ''')
+    results = cursor.fetchall()
     conn.close()
+    return results
+
+def reset_backfill(lottery_code):
+    """清除彩票类型的回填进度，下次回填从头开始"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM backfill_checkpoint WHERE lottery_code = ?', (lottery_code,))
+
+# 以(type_id, draw_date)开头、可以按开奖日期顺序读取的索引
+RESULT_DATE_INDEXES = ('idx_lottery_result_type_date', 'idx_lottery_result_type_date_amounts')
+
+# 查询计划检查：(名称, SQL, 参数, 期望使用的索引，多个可选索引用元组表示)
+QUERY_PLAN_EXPECTATIONS = [
+    ('最新开奖结果', LATEST_RESULTS_SQL, (1, 10), RESULT_DATE_INDEXES),
+    ('历史结果分页', ALL_RESULTS_SQL, (1, 20, 0), 'idx_lottery_result_type_date'),
+    ('全量导出', EXPORT_RESULTS_SQL, (1,), 'idx_lottery_result_type_date'),
+    ('历史结果游标分页', RESULTS_AFTER_SQL, (1, '2025-01-01', '2025001', 20), 'idx_lottery_result_type_date'),
+    ('最新开奖片段', LATEST_RESULT_JSON_SQL, (1, 10), 'idx_lottery_result_type_date'),
+    ('历史开奖片段分页', RESULT_JSON_PAGE_SQL, (1, 20, 20), 'idx_lottery_result_type_date'),
+    ('历史开奖片段游标分页', RESULT_JSON_AFTER_SQL, (1, '2025-01-01', '2025001', 20), 'idx_lottery_result_type_date'),
+    ('历史结果总数', RESULT_COUNT_SQL, (1,), RESULT_DATE_INDEXES + ('sqlite_autoindex_lottery_result_1',)),
+    ('最近开奖号码', RECENT_DRAWS_SQL, (1, 5), RESULT_DATE_INDEXES),
+    ('未修复错误数（按类型）', UNFIXED_ERROR_COUNT_SQL, ('ssq',), 'idx_crawl_error_unfixed'),
+    ('未修复错误数（全部）', ALL_UNFIXED_ERROR_COUNT_SQL, (), 'idx_crawl_error_unfixed'),
+    ('今日成功爬取次数', TODAY_SUCCESS_COUNT_SQL, ('ssq',), 'idx_crawl_task_code_status_time'),
+    ('奖级明细', PRIZE_GRADES_SQL, (1, '2025001'), 'sqlite_autoindex_lottery_result_1'),
+    ('未完成的回填区间', BACKFILL_PENDING_SQL, ('ssq',), 'sqlite_autoindex_backfill_checkpoint_1'),
+    ('周期趋势统计', PERIOD_TRENDS_SQL, ('%Y-%m', 1, ''), 'idx_lottery_result_type_date_amounts'),
+    ('奖池趋势', POOL_TREND_SQL, (1, ''), 'idx_lottery_result_type_date_amounts'),
+    ('号码频率', BALL_FREQUENCY_SQL, (1, 'red'), 'idx_lottery_ball_type_kind_number'),
+    ('号码同现', CO_OCCURRENCE_SQL, (1, 'red', 1), 'idx_lottery_ball_type_kind_number'),
+    ('号码统计表', BALL_STATS_SQL, (1, 'red'), 'sqlite_autoindex_ball_stats_1'),
+    ('数据版本', DATA_VERSION_BY_CODE_SQL, ('ssq',), 'sqlite_autoindex_lottery_type_1'),
+    ('号码统计最新一期', LATEST_BALL_STATS_DRAW_SQL, (1,), 'idx_ball_stats_type_last_draw'),
+    ('包含指定号码的开奖', DRAWS_CONTAINING_SQL, (1, 2, 2, 0, 0, 20), RESULT_DATE_INDEXES)
+]
+
+def explain_query_plan(conn, sql, params=()):
+    """返回查询计划中每一步的描述"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+def check_query_plans(conn):
+    """检查常用查询是否使用了预期索引，返回不符合预期的查询列表[(名称, 期望索引, 查询计划)]"""
+    failures = []
+    for name, sql, params, index_name in QUERY_PLAN_EXPECTATIONS:
+        plan = explain_query_plan(conn, sql, params)
+        index_names = index_name if isinstance(index_name, tuple) else (index_name,)
+        used_indexes = {name for step in plan for name in re.findall(r'INDEX (\w+)', step)}
+        uses_index = bool(used_indexes.intersection(index_names))
+        # 全表扫描或额外排序说明索引没有覆盖到查询（按表达式分组的临时B树不算）
+        full_scan = any(step.startswith('SCAN ') and 'INDEX' not in step for step in plan)
+        temp_sort = any('USE TEMP B-TREE FOR ORDER BY' in step for step in plan)
+        if not uses_index or full_scan or temp_sort:
+            failures.append((name, index_name, plan))
+    return failures
 
 # 数据库自动清理相关功能
 def backup_database():
     """备份数据库文件"""
-    import shutil
     import datetime
     
     try:
@@ -345,8 +1377,14 @@ def backup_database():
         # 生成备份文件名
         backup_file = os.path.join(backup_dir, f'lottery_backup_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
         
-        # 复制数据库文件
-        shutil.copy2(DB_FILE, backup_file)
+        # 使用SQLite在线备份，WAL中尚未写回的数据也会包含在内
+        source = sqlite3.connect(f'file:{DB_FILE}?mode=ro', uri=True)
+        target = sqlite3.connect(backup_file)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
         
         print(f"数据库备份成功：{backup_file}")
         return backup_file
@@ -386,54 +1424,48 @@ def clean_old_data():
         one_year_ago_str = one_year_ago.strftime("%Y-%m-%d")
         logger.info(f"清理{one_year_ago_str}之前的数据")
         
-        # 3. 执行数据清理
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 尝试清理彩票结果数据
-        try:
-            cursor.execute('''
-                DELETE FROM lottery_result
-                WHERE draw_date < ?
-            ''', (one_year_ago_str,))
-            deleted_rows = cursor.rowcount
-            conn.commit()
+        # 3. 执行数据清理（出错时也要归还写连接）
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
             
-            logger.info(f"成功清理{deleted_rows}条过期数据")
-        except sqlite3.OperationalError as e:
-            if "readonly" in str(e).lower():
-                logger.warning(f"无法执行数据清理，数据库为只读：{e}")
-                deleted_rows = 0
-                conn.rollback()
-            else:
-                raise
-        
-        # 4. 记录清理任务到数据库（创建清理日志表）
-        try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cleanup_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cleanup_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    deleted_rows INTEGER,
-                    backup_file TEXT,
-                    status TEXT,
-                    error_message TEXT
-                )
-            ''')
+            # 尝试清理彩票结果数据
+            try:
+                cursor.execute('''
+                    DELETE FROM lottery_result
+                    WHERE draw_date < ?
+                ''', (one_year_ago_str,))
+                deleted_rows = cursor.rowcount
+                # 删除历史开奖后出现次数和遗漏都已变化，重算号码统计表
+                cursor.execute('SELECT id FROM lottery_type')
+                type_ids = [row[0] for row in cursor.fetchall()]
+                for type_id in type_ids:
+                    _rebuild_ball_stats(cursor, type_id)
+                if deleted_rows:
+                    _bump_data_version(cursor, type_ids)
+                conn.commit()
+                
+                logger.info(f"成功清理{deleted_rows}条过期数据")
+            except sqlite3.OperationalError as e:
+                if "readonly" in str(e).lower():
+                    logger.warning(f"无法执行数据清理，数据库为只读：{e}")
+                    deleted_rows = 0
+                    conn.rollback()
+                else:
+                    raise
             
-            cursor.execute('''
-                INSERT INTO cleanup_log (deleted_rows, backup_file, status, error_message)
-                VALUES (?, ?, ?, ?)
-            ''', (deleted_rows, backup_file, "success", ""))
-            conn.commit()
-        except sqlite3.OperationalError as e:
-            if "readonly" in str(e).lower():
-                logger.warning(f"无法记录清理日志，数据库为只读：{e}")
-                conn.rollback()
-            else:
-                raise
-        
-        conn.close()
+            # 4. 记录清理任务到数据库（清理日志表由数据库迁移创建）
+            try:
+                cursor.execute('''
+                    INSERT INTO cleanup_log (deleted_rows, backup_file, status, error_message)
+                    VALUES (?, ?, ?, ?)
+                ''', (deleted_rows, backup_file, "success", ""))
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                if "readonly" in str(e).lower():
+                    logger.warning(f"无法记录清理日志，数据库为只读：{e}")
+                    conn.rollback()
+                else:
+                    raise
         
         logger.info("数据清理任务执行完成")
         return {
@@ -447,26 +1479,13 @@ def clean_old_data():
         
         # 记录错误日志到数据库
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cleanup_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cleanup_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    deleted_rows INTEGER,
-                    backup_file TEXT,
-                    status TEXT,
-                    error_message TEXT
-                )
-            ''')
-            
-            cursor.execute('''
-                INSERT INTO cleanup_log (deleted_rows, backup_file, status, error_message)
-                VALUES (?, ?, ?, ?)
-            ''', (0, backup_file, "error", str(e)))
-            conn.commit()
-            conn.close()
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO cleanup_log (deleted_rows, backup_file, status, error_message)
+                    VALUES (?, ?, ?, ?)
+                ''', (0, backup_file, "error", str(e)))
         except Exception as db_error:
             logger.error(f"记录清理日志失败：{str(db_error)}")
         
@@ -479,7 +1498,7 @@ def clean_old_data():
 
 def get_cleanup_logs(limit=20):
     """获取清理日志"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -0,0 +1,50 @@
+"""
+开奖结果的JSON片段渲染
+
+开奖结果在入库时按DRAW_FIELDS渲染成JSON片段存入lottery_result.result_json，
+/latest、/history等列表接口只需读出片段按字节拼接（见api.serializers.draw_list_response）。
+渲染属于数据层，只依赖orjson或标准库json，不依赖Flask。
+
+orjson可用时用orjson渲染，不可用时退回标准库json，两种实现输出的字节一致：紧凑分隔符、不转义非ASCII字符。
+"""
+
+import json
+from json.encoder import encode_basestring
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 预渲染片段中的字段，与/latest、/history返回的每期结果一致
+DRAW_FIELDS = (
+    'issue', 'draw_date', 'red_balls', 'blue_balls', 'sales', 'pool_money',
+    'first_prize_count', 'first_prize_amount', 'second_prize_count', 'second_prize_amount'
+)
+
+def _encode_value(value):
+    """标准库退回路径中单个字段的编码，开奖字段只有文本、整数和空值"""
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if type(value) is int:
+        return str(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def render_draw(issue, draw_date, red_balls, blue_balls, sales, pool_money,
+                first_prize_count, first_prize_amount, second_prize_count, second_prize_amount):
+    """把一期开奖渲染为JSON对象文本，参数为数据库中的原始列值，号码仍是逗号分隔文本"""
+    values = (
+        issue, draw_date, red_balls.split(',') if red_balls else [], blue_balls or None, sales, pool_money,
+        first_prize_count, first_prize_amount, second_prize_count, second_prize_amount
+    )
+    if orjson is not None:
+        return orjson.dumps(dict(zip(DRAW_FIELDS, values))).decode('utf-8')
+    
+    # 没有orjson时按固定字段顺序直接拼接，比构造字典再调用json.dumps快
+    parts = []
+    for field, value in zip(DRAW_FIELDS, values):
+        encoded = '[' + ','.join(map(encode_basestring, value)) + ']' if isinstance(value, list) else _encode_value(value)
+        parts.append(f'"{field}":{encoded}')
+    return '{' + ','.join(parts) + '}'
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式快照导出
+
+把每个彩票类型的全部开奖结果导出为带类型的Arrow IPC文件（可选Parquet），供分析人员直接读取，
+不必再拷贝lottery.db并在pandas中拆分red_balls字符串：
+    issue           string
+    draw_date       date32
+    red_balls       fixed_size_list<int8>   号码个数按该类型最常见的个数确定，个数不符的行为null
+    blue_balls      fixed_size_list<int8>   没有蓝球的类型不包含该列
+    *_cents         int64                   金额，单位为分
+    *_count         int32
+
+Arrow文件不压缩，读取方可以用pyarrow.memory_map零拷贝打开；API直接以文件方式发送。
+快照文件名带数据版本号，只有该类型的data_version变化时才重新生成。
+
+用法（在backend目录下执行）：
+    python -m models.snapshot              # 刷新所有过期的快照
+    python -m models.snapshot --parquet    # 同时生成Parquet文件
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+from collections import Counter
+
+from config.config import Config
+
+SNAPSHOT_FORMATS = ('arrow', 'parquet')
+
+AMOUNT_COLUMNS = ('sales_cents', 'pool_money_cents', 'first_prize_amount_cents', 'second_prize_amount_cents')
+COUNT_COLUMNS = ('first_prize_count', 'second_prize_count')
+
+def snapshot_path(code, version, fmt='arrow', directory=None):
+    """快照文件路径，文件名包含彩票类型和数据版本号"""
+    return os.path.join(directory or Config.SNAPSHOT_DIR, f'{code}-v{version}.{fmt}')
+
+def _ball_column(pa, ball_lists):
+    """把号码列表转换为定长int8列表列，个数与最常见个数不符的行记为null"""
+    counts = Counter(len(balls) for balls in ball_lists if balls)
+    if not counts:
+        return None
+    width = counts.most_common(1)[0][0]
+    values = []
+    mask = []
+    for balls in ball_lists:
+        valid = len(balls) == width
+        values.extend(balls if valid else [0] * width)
+        mask.append(not valid)
+    return pa.FixedSizeListArray.from_arrays(
+        pa.array(values, type=pa.int8()), width, mask=pa.array(mask, type=pa.bool_())
+    )
+
+def build_snapshot_table(type_id, code, version):
+    """读取一个彩票类型的全部开奖结果，构建Arrow表"""
+    import datetime
+    
+    import pyarrow as pa
+    
+    from models.models import iter_results, parse_ball_numbers
+    
+    columns = {name: [] for name in ('issue', 'draw_date', 'red_balls', 'blue_balls') + AMOUNT_COLUMNS + COUNT_COLUMNS}
+    for rows in iter_results(type_id):
+        for row in rows:
+            columns['issue'].append(row['issue'])
+            columns['draw_date'].append(datetime.date.fromisoformat(row['draw_date'][:10]))
+            columns['red_balls'].append(parse_ball_numbers(row['red_balls']))
+            columns['blue_balls'].append(parse_ball_numbers(row['blue_balls']))
+            for name in AMOUNT_COLUMNS + COUNT_COLUMNS:
+                columns[name].append(row[name])
+    
+    arrays = {
+        'issue': pa.array(columns['issue'], type=pa.string()),
+        'draw_date': pa.array(columns['draw_date'], type=pa.date32())
+    }
+    for name in ('red_balls', 'blue_balls'):
+        array = _ball_column(pa, columns[name])
+        if array is not None:
+            arrays[name] = array
+    for name in AMOUNT_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.int64())
+    for name in COUNT_COLUMNS:
+        arrays[name] = pa.array(columns[name], type=pa.int32())
+    
+    metadata = {'lottery_code': code, 'data_version': str(version)}
+    return pa.table(arrays).replace_schema_metadata(metadata)
+
+def _write_atomic(path, writer):
+    """先写临时文件再重命名，读取方不会读到写了一半的快照
+    
+    临时文件用mkstemp创建，同一进程中多个线程同时生成同一版本时各写各的文件，互不删除。
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.tmp-', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _snapshot_version(path):
+    """从快照文件名中取出数据版本号，不是快照文件时返回None"""
+    name = os.path.basename(path)
+    if '.tmp-' in name:
+        return None
+    version = name.rsplit('-v', 1)[-1].split('.', 1)[0]
+    return int(version) if version.isdigit() else None
+
+def _remove_stale(code, version, directory):
+    """删除旧版本的快照，保留当前版本和上一个版本
+    
+    上一个版本可能正被刚解析到旧路径的请求打开，留到下一次版本变化时再删除。
+    """
+    versions = {path: _snapshot_version(path) for path in glob.glob(os.path.join(directory, f'{code}-v*.*'))}
+    previous = max((v for v in versions.values() if v is not None and v < version), default=None)
+    for path, path_version in versions.items():
+        if path_version is not None and path_version < version and path_version != previous:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def ensure_snapshot(code, formats=('arrow',), directory=None):
+    """确保指定彩票类型当前数据版本的快照存在，返回{格式: 文件路径}；类型不存在时返回None
+    
+    数据版本未变化时直接返回已有文件，否则重新生成并删除旧版本的快照。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    from models.models import get_data_version
+    
+    directory = directory or Config.SNAPSHOT_DIR
+    data_version = get_data_version(code)
+    if data_version is None:
+        return None
+    
+    version = data_version['version']
+    paths = {fmt: snapshot_path(code, version, fmt, directory) for fmt in formats}
+    missing = [fmt for fmt, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        os.makedirs(directory, exist_ok=True)
+        table = build_snapshot_table(data_version['type_id'], code, version)
+        for fmt in missing:
+            if fmt == 'arrow':
+                def write_arrow(path):
+                    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                _write_atomic(paths[fmt], write_arrow)
+            else:
+                _write_atomic(paths[fmt], lambda path: pq.write_table(table, path))
+        print(f"已生成{code}快照（数据版本{version}，{table.num_rows}行）：{', '.join(missing)}")
+    
+    # 其他格式的当前版本快照保留，只删除旧版本
+    _remove_stale(code, version, directory)
+    return paths
+
+def open_snapshot_file(code, fmt='arrow', directory=None):
+    """打开当前数据版本的快照文件，返回二进制文件对象；类型不存在时返回None
+    
+    文件打开之后即使被删除也能继续读取；解析路径与打开之间文件被并发清理时重新生成一次。
+    """
+    for attempt in range(2):
+        paths = ensure_snapshot(code, (fmt,), directory)
+        if paths is None:
+            return None
+        try:
+            return open(paths[fmt], 'rb')
+        except FileNotFoundError:
+            if attempt:
+                raise
+
+def open_snapshot(code, directory=None):
+    """以内存映射方式打开Arrow快照，返回零拷贝读取的pyarrow.Table"""
+    import pyarrow as pa
+    
+    paths = ensure_snapshot(code, ('arrow',), directory)
+    if paths is None:
+        return None
+    return pa.ipc.open_file(pa.memory_map(paths['arrow'], 'r')).read_all()
+
+def export_snapshots(formats=('arrow',), directory=None):
+    """刷新所有彩票类型的快照，返回{彩票类型代码: {格式: 文件路径}}"""
+    from models.models import get_all_data_versions
+    
+    return {row['code']: ensure_snapshot(row['code'], formats, directory) for row in get_all_data_versions()}
+
+def main():
+    parser = argparse.ArgumentParser(description="导出列式快照")
+    parser.add_argument("--dir", help="快照目录，默认使用Config.SNAPSHOT_DIR")
+    parser.add_argument("--parquet", action="store_true", help="同时生成Parquet文件")
+    args = parser.parse_args()
+    
+    formats = SNAPSHOT_FORMATS if args.parquet else ('arrow',)
+    for code, paths in export_snapshots(formats, args.dir).items():
+        for fmt, path in paths.items():
+            print(f"{code} {fmt}: {path} ({os.path.getsize(path) / 1024:.1f}KB)")
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,120 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from crawler.crawler import LotteryCrawler
+import os
+import threading
+
+from config.config import Config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class SchedulerLock:
+    """基于文件锁的定时任务选主
+    
+    gunicorn等多进程部署中每个worker都会导入app.py，定时任务只应在一个进程中运行。
+    各进程启动时尝试以非阻塞方式锁定同一个文件，抢到锁的进程启动定时任务；其余进程在后台线程中
+    定期重试，持锁进程退出（平滑重启、崩溃）时操作系统自动释放锁，由其他进程接管。
+    没有fcntl的平台（Windows开发环境）只有单进程，直接视为当选。
+    """
+    
+    def __init__(self, path=None, retry_seconds=None):
+        self.path = path or Config.SCHEDULER_LOCK_FILE
+        self.retry_seconds = retry_seconds or Config.SCHEDULER_LOCK_RETRY_SECONDS
+        self._file = None
+        self._stopped = threading.Event()
+    
+    @property
+    def held(self):
+        return self._file is not None or fcntl is None
+    
+    def try_acquire(self):
+        """尝试获取锁，成功时在锁文件中写入当前进程号"""
+        if self.held:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+    
+    def run_when_elected(self, start):
+        """当选后执行start：立即抢到锁时同步执行并返回True，否则在后台线程中等待接管并返回False"""
+        if self.try_acquire():
+            start()
+            return True
+        
+        def wait_for_lock():
+            while not self._stopped.wait(self.retry_seconds):
+                if self.try_acquire():
+                    print(f"进程{os.getpid()}接管定时任务")
+                    start()
+                    return
+        
+        threading.Thread(target=wait_for_lock, name='scheduler-election', daemon=True).start()
+        return False
+    
+    def release(self):
+        """停止等待并释放锁"""
+        self._stopped.set()
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
 
 class LotteryScheduler:
     """彩票数据定时爬取调度器"""
     
     def __init__(self):
+        # 在创建调度器时才导入APScheduler和爬虫，app.py只用到SchedulerLock时不必加载它们
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from crawler.crawler import LotteryCrawler
+        
         self.scheduler = BackgroundScheduler()
         self.crawler = LotteryCrawler()
     
+    def add_job(self, func, *args, **kwargs):
+        """添加定时任务，任务结束时归还执行线程持有的数据库连接"""
+        from models.models import releases_connections
+        
+        return self.scheduler.add_job(releases_connections(func), *args, **kwargs)
+    
     def start(self):
         """启动定时任务"""
-        # 每天10:20执行一次数据爬取
-        self.scheduler.add_job(
-            self.safe_crawl_all_lottery_data,
-            'cron',
-            hour=10,
-            minute=20,
-            id='daily_crawl',
-            name='每日彩票数据爬取',
+        if Config.DRAW_POLLER_ENABLED:
+            # 按开奖日历在各类型开奖后轮询，获取到新一期即停止
+            self.start_draw_poller()
+        else:
+            # 每天10:20执行一次数据爬取
+            self.add_job(
+                self.safe_crawl_all_lottery_data,
+                'cron',
+                hour=10,
+                minute=20,
+                id='daily_crawl',
+                name='每日彩票数据爬取',
+                replace_existing=True
+            )
+        
+        # 定期执行WAL检查点，避免WAL文件持续增长
+        self.add_job(
+            self.checkpoint_database,
+            'interval',
+            minutes=Config.DB_CHECKPOINT_INTERVAL_MINUTES,
+            id='wal_checkpoint',
+            name='数据库WAL检查点',
             replace_existing=True
         )
         
         # 添加一个立即执行的任务，用于初始化数据（只执行一次）
         from datetime import datetime
-        self.scheduler.add_job(
+        self.add_job(
             self.safe_crawl_all_lottery_data,
             'date',
             run_date=datetime.now(),
@@ -57,13 +148,76 @@ class LotteryScheduler:
             
             logger.info("所有已知爬取错误均已修复，开始执行爬取任务")
             print("所有已知爬取错误均已修复，开始执行爬取任务")
-            self.crawler.crawl_all_lottery_data()
+            self.crawler.crawl_all_lottery_data(concurrent=Config.CRAWLER_CONCURRENT)
             logger.info("爬取任务执行完成")
+            self.export_snapshots()
         except Exception as e:
             logger.error(f"执行爬取任务时发生错误: {e}", exc_info=True)
             print(f"执行爬取任务时发生错误: {e}")
             return
     
+    def start_draw_poller(self):
+        """加载开奖日历并安排第一次轮询"""
+        from datetime import datetime
+        from crawler.draw_poller import DRAW_TIMEZONE, DrawPoller, crawl_poll, load_draw_calendar
+        
+        calendar = load_draw_calendar()
+        for code, schedule in calendar.items():
+            print(f"{code}开奖日历：{schedule}")
+        self.draw_poller = DrawPoller(calendar, crawl_poll(self.crawler))
+        self._schedule_draw_poll(self.draw_poller.start(datetime.now(DRAW_TIMEZONE)))
+    
+    def _schedule_draw_poll(self, run_date):
+        """用一次性任务在run_date唤醒轮询，每次唤醒后按下一次唤醒时间重新安排"""
+        if run_date is None:
+            return
+        self.add_job(
+            self.draw_poll_tick,
+            'date',
+            run_date=run_date,
+            id='draw_poll',
+            name='开奖日历轮询',
+            replace_existing=True,
+            misfire_grace_time=None
+        )
+    
+    def draw_poll_tick(self):
+        """执行到期的轮询，有新开奖入库时刷新列式快照"""
+        from datetime import datetime
+        from crawler.draw_poller import DRAW_TIMEZONE
+        
+        finished = len(self.draw_poller.history)
+        try:
+            next_wakeup = self.draw_poller.tick(datetime.now(DRAW_TIMEZONE))
+        except Exception as e:
+            print(f"开奖日历轮询出错: {e}")
+            next_wakeup = self.draw_poller.next_wakeup()
+        if any(stored_at for _, _, stored_at, _ in self.draw_poller.history[finished:]):
+            self.export_snapshots()
+        self._schedule_draw_poll(next_wakeup)
+    
+    def export_snapshots(self):
+        """爬取完成后刷新列式快照，只有数据版本变化的彩票类型会重新生成"""
+        try:
+            from models.snapshot import export_snapshots
+            export_snapshots()
+        except ImportError:
+            print("未安装pyarrow，跳过列式快照导出")
+        except Exception as e:
+            print(f"导出列式快照时发生错误: {e}")
+    
+    def checkpoint_database(self):
+        """执行WAL检查点"""
+        from models.models import checkpoint_wal
+        
+        try:
+            result = checkpoint_wal()
+            if result is not None:
+                busy, wal_pages, checkpointed = result
+                print(f"WAL检查点完成：WAL共{wal_pages}页，已写回{checkpointed}页{'（有读者占用）' if busy else ''}")
+        except Exception as e:
+            print(f"执行WAL检查点时发生错误: {e}")
+    
     def stop(self):
         """停止定时任务"""
         self.scheduler.shutdown()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码查询参数检查脚本
+在临时数据库上确认/draws?contains=和/analytics/rolling?number=按彩票类型的号码范围校验号码，
+超出范围时返回400而不是500，遗漏表包含号码范围内从未开出的号码
+
+用法：
+    python verify_ball_queries.py
+"""
+
+import sys
+import tempfile
+
+from flask import Flask
+
+import models.models as models
+from api.api import api_bp
+from benchmarks.synthetic import generate_draws, use_temp_db
+from config.config import Config
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{': ' + detail if detail else ''}")
+    return passed
+
+def main():
+    use_temp_db()
+    Config.SNAPSHOT_DIR = tempfile.mkdtemp()
+    Config.ANALYTICS_OFFLOAD_ENABLED = False
+    models.save_lottery_results_bulk(generate_draws("ssq", 50))
+    models.save_lottery_results_bulk(generate_draws("kl8", 50))
+    models.save_lottery_results_bulk(generate_draws("3d", 50))
+    
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.teardown_appcontext(lambda exception=None: models.release_thread_connections())
+    client = app.test_client()
+    
+    print("===== 号码查询参数检查 =====")
+    results = []
+    for url in ('/api/lottery/ssq/draws?contains=200', '/api/lottery/ssq/draws?contains=-1',
+                '/api/lottery/ssq/draws?contains=1,34', '/api/lottery/ssq/draws?contains=0',
+                '/api/lottery/kl8/draws?contains=81', '/api/lottery/ssq/draws?contains=99999999999999999999'):
+        response = client.get(url)
+        body = response.get_json(silent=True) or {}
+        results.append(check(f"{url} 返回400", response.status_code == 400 and 'error' in body,
+                             f"状态码{response.status_code}, {body.get('error')}"))
+    
+    for url in ('/api/lottery/ssq/draws?contains=1,33', '/api/lottery/kl8/draws?contains=80'):
+        response = client.get(url)
+        results.append(check(f"{url} 返回200", response.status_code == 200, f"状态码{response.status_code}"))
+    
+    for url in ('/api/lottery/ssq/analytics/rolling?number=0', '/api/lottery/ssq/analytics/rolling?number=34',
+                '/api/lottery/ssq/analytics/rolling?kind=blue&number=17', '/api/lottery/ssq/analytics/rolling?window=0'):
+        response = client.get(url)
+        body = response.get_json(silent=True) or {}
+        results.append(check(f"{url} 返回400", response.status_code == 400 and 'error' in body,
+                             f"状态码{response.status_code}, {body.get('error')}"))
+    
+    for url in ('/api/lottery/ssq/analytics/rolling?number=33', '/api/lottery/ssq/analytics/rolling?kind=blue&number=16',
+                '/api/lottery/3d/analytics/rolling?number=0'):
+        response = client.get(url)
+        results.append(check(f"{url} 返回200", response.status_code == 200, f"状态码{response.status_code}"))
+    
+    numbers = [row['number'] for row in client.get('/api/lottery/ssq/analytics/omission?kind=blue').get_json()['data']]
+    results.append(check("遗漏表按号码范围列出全部号码", numbers == [f'{n:02d}' for n in range(1, 17)], f"{numbers[0]}-{numbers[-1]}，共{len(numbers)}个"))
+    
+    try:
+        models.ball_mask([200])
+        results.append(check("ball_mask拒绝位图范围之外的号码", False))
+    except ValueError as e:
+        results.append(check("ball_mask拒绝位图范围之外的号码", True, str(e)))
+    
+    if not all(results):
+        sys.exit(1)
+    print("\n号码查询参数检查通过")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码统计表一致性检查脚本
+对比随开奖增量维护的ball_stats与根据lottery_ball全量重算的结果，必要时重建
+
+用法：
+    python verify_ball_stats.py                  # 检查models.DB_FILE
+    python verify_ball_stats.py --db lottery.db
+    python verify_ball_stats.py --rebuild        # 全量重建后再检查
+"""
+
+import argparse
+import sqlite3
+import sys
+
+import models.models as models
+
+def main():
+    parser = argparse.ArgumentParser(description="号码统计表一致性检查")
+    parser.add_argument("--db", help="要检查的数据库文件，默认使用models.DB_FILE")
+    parser.add_argument("--rebuild", action="store_true", help="先全量重建号码统计表")
+    args = parser.parse_args()
+    
+    if args.db:
+        models.DB_FILE = args.db
+    
+    if args.rebuild:
+        count = models.rebuild_ball_stats()
+        print(f"已重建{count}个彩票类型的号码统计")
+    
+    conn = sqlite3.connect(models.DB_FILE)
+    print("===== 号码统计表一致性检查 =====")
+    total_failures = 0
+    for type_id, code, name in conn.execute('SELECT id, code, name FROM lottery_type ORDER BY id').fetchall():
+        failures = models.check_ball_stats(conn, type_id)
+        total_failures += len(failures)
+        status = "❌" if failures else "✅"
+        print(f"{status} {name}({code}): {len(failures)}个号码不一致")
+        for kind, number, stored, rebuilt in failures[:10]:
+            print(f"    {kind} {number}: 当前{stored}, 重算{rebuilt}")
+    conn.close()
+    
+    if total_failures:
+        print(f"\n共{total_failures}个号码不一致，可使用 --rebuild 重建")
+        sys.exit(1)
+    
+    print("\n号码统计表与重算结果一致")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件请求检查脚本
+在临时数据库上确认ETag/Last-Modified生效，且304响应不会查询lottery_result
+
+用法：
+    python verify_conditional_get.py
+"""
+
+import sys
+import time
+
+from flask import Flask
+
+import models.models as models
+from api.api import api_bp
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+# 记录所有数据库连接执行过的SQL
+executed_sql = []
+
+def traced_connect(connect):
+    def wrapper(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(executed_sql.append)
+        return conn
+    return wrapper
+
+def result_queries():
+    return [sql for sql in executed_sql if 'lottery_result' in sql]
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{': ' + detail if detail else ''}")
+    return passed
+
+def main():
+    use_temp_db()
+    draws = generate_draws("ssq", 50)
+    models.save_lottery_results_bulk(draws[1:])
+    # 关闭已有连接，之后新建的连接都带上SQL跟踪
+    models._connect = traced_connect(models._connect)
+    models.get_connection_pool().close_all()
+    
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.teardown_appcontext(lambda exception=None: models.release_thread_connections())
+    client = app.test_client()
+    
+    print("===== 条件请求检查 =====")
+    results = []
+    for url in ('/api/lottery/ssq/latest?limit=10', '/api/lottery/ssq/history', '/api/lottery/types'):
+        executed_sql.clear()
+        first = client.get(url)
+        etag = first.headers.get('ETag')
+        last_modified = first.headers.get('Last-Modified')
+        results.append(check(f"{url} 返回ETag和Last-Modified", first.status_code == 200 and bool(etag) and bool(last_modified),
+                             f"ETag={etag}, Last-Modified={last_modified}, 执行{len(executed_sql)}条SQL"))
+        
+        executed_sql.clear()
+        second = client.get(url, headers={'If-None-Match': etag})
+        results.append(check(f"{url} If-None-Match返回304且不查询lottery_result",
+                             second.status_code == 304 and not second.data and not result_queries(),
+                             f"状态码{second.status_code}, 执行{len(executed_sql)}条SQL"))
+        
+        executed_sql.clear()
+        third = client.get(url, headers={'If-Modified-Since': last_modified})
+        results.append(check(f"{url} If-Modified-Since返回304且不查询lottery_result",
+                             third.status_code == 304 and not result_queries()))
+    
+    # 写入新一期后旧ETag失效
+    url = '/api/lottery/ssq/latest?limit=10'
+    etag = client.get(url).headers['ETag']
+    models.save_lottery_result(draws[0])
+    response = client.get(url, headers={'If-None-Match': etag})
+    results.append(check("写入新开奖后旧ETag返回200",
+                         response.status_code == 200 and response.get_json()['data'][0]['issue'] == draws[0]['issue'],
+                         f"ETag {etag} -> {response.headers.get('ETag')}"))
+    
+    # 同一天内更正已有开奖（开奖日期不变）后，只带If-Modified-Since的客户端也能取到新数据
+    last_modified = response.headers['Last-Modified']
+    time.sleep(1.1)
+    models.save_lottery_result({**draws[0], 'sales': str(int(draws[0]['sales']) + 1)})
+    response = client.get(url, headers={'If-Modified-Since': last_modified})
+    results.append(check("更正同一天的开奖后If-Modified-Since返回200",
+                         response.status_code == 200 and response.headers.get('Last-Modified') != last_modified,
+                         f"Last-Modified {last_modified} -> {response.headers.get('Last-Modified')}"))
+    
+    if not all(results):
+        sys.exit(1)
+    print("\n条件请求检查通过")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖日历轮询检查脚本
+用假时钟和假上游模拟数周的开奖，确认DrawPoller只在开奖后轮询、获取到新一期即停止、
+上游长时间不出结果时放弃本期，并与原来每天10:20爬取全部类型的做法比较请求次数和入库延迟
+
+用法：
+    python verify_draw_poller.py
+    python verify_draw_poller.py --weeks 8 --seed 7
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import random
+import statistics
+import sys
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+from benchmarks.upstream import NOTICE_PATH, StubUpstream
+from config.config import Config
+from crawler.crawler import LotteryCrawler
+from crawler.draw_poller import DRAW_TIMEZONE, DrawPoller, crawl_poll, draw_stored, parse_draw_schedule
+
+# 与init_db中lottery_type的开奖说明一致
+DESCRIPTIONS = {
+    'ssq': '每周二、四、日21:15开奖',
+    'kl8': '每日21:30开奖',
+    'qlc': '每周一、三、五21:15开奖',
+    '3d': '每日21:15开奖'
+}
+
+class FakeUpstream:
+    """假上游：每期在开奖后随机延迟出结果，skip中的开奖始终不出结果（如节假日休市）"""
+    
+    def __init__(self, rng, min_delay=10, max_delay=50, skip=()):
+        self.rng = rng
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.skip = set(skip)
+        self.published_at = {}
+        self.requests = []
+        self.now = None
+    
+    def publish_time(self, code, draw_at):
+        key = (code, draw_at)
+        if key not in self.published_at:
+            if key in self.skip:
+                self.published_at[key] = None
+            else:
+                self.published_at[key] = draw_at + datetime.timedelta(minutes=self.rng.uniform(self.min_delay, self.max_delay))
+        return self.published_at[key]
+    
+    def poll(self, code, draw_at):
+        self.requests.append((code, draw_at, self.now))
+        published = self.publish_time(code, draw_at)
+        return published is not None and self.now >= published
+
+def crawl_task_statuses(code):
+    conn = models.get_db_connection(read_only=True)
+    statuses = [row[0] for row in conn.execute('SELECT status FROM crawl_task WHERE lottery_code = ?', (code,))]
+    conn.close()
+    return statuses
+
+def check_crawl_poll():
+    """在桩服务器上检查crawl_poll：故障时按未入库退避，有未修复错误时不请求，上游恢复后入库"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        use_temp_db()
+    upstream = StubUpstream.from_fixtures(error_rate=1)
+    stub_url = upstream.start()
+    crawler = LotteryCrawler(base_url=stub_url + NOTICE_PATH, home_url=stub_url + "/")
+    crawler.request_delay = (0, 0)
+    Config.CRAWLER_RETRY_DELAY = 0.01
+    poll = crawl_poll(crawler)
+    draw_at = datetime.datetime.fromisoformat(upstream.history['ssq'][0]['date'][:10]).replace(hour=21, minute=15, tzinfo=DRAW_TIMEZONE)
+    
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        models.log_crawl_error('ssq', 'API_ERROR', '上游故障')
+        skipped = poll('ssq', draw_at)
+    results.append(check("存在未修复错误时轮询不请求上游", not skipped and upstream.requests == 0))
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        models.mark_all_errors_as_fixed('ssq', '检查')
+        failed = poll('ssq', draw_at)
+    results.append(check("上游故障时按未入库处理，不使用备份数据也不记录成功",
+                         not failed and upstream.requests > 0 and 'SUCCESS' not in crawl_task_statuses('ssq')
+                         and not draw_stored('ssq', draw_at)))
+    
+    upstream.error_rate = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        stored = poll('ssq', draw_at)
+    results.append(check("上游恢复后轮询入库", stored and 'SUCCESS' in crawl_task_statuses('ssq')))
+    upstream.server.shutdown()
+    return all(results)
+
+def simulate(calendar, upstream, start, end, is_stored=lambda code, draw_at: True):
+    """用假时钟驱动DrawPoller，从start运行到end，返回poller"""
+    poller = DrawPoller(calendar, upstream.poll, is_stored=is_stored)
+    upstream.now = start
+    with contextlib.redirect_stdout(io.StringIO()):
+        wakeup = poller.start(start)
+        while wakeup is not None and wakeup < end:
+            upstream.now = wakeup
+            wakeup = poller.tick(wakeup)
+    return poller
+
+def all_draws(calendar, start, end):
+    draws = []
+    for code, schedule in calendar.items():
+        draw_at = schedule.next_draw(start)
+        while draw_at < end:
+            draws.append((code, draw_at))
+            draw_at = schedule.next_draw(draw_at)
+    return draws
+
+def daily_cron_latency(published, cron_hour=10, cron_minute=20):
+    """原做法：每天固定时间爬取一次，出结果后到下一次定时爬取的等待时间"""
+    run = published.replace(hour=cron_hour, minute=cron_minute, second=0, microsecond=0)
+    if run < published:
+        run += datetime.timedelta(days=1)
+    return run - published
+
+def check(name, passed, detail=''):
+    print(f"{'✅' if passed else '❌'} {name}{': ' + detail if detail else ''}")
+    return passed
+
+def minutes(delta):
+    return delta.total_seconds() / 60
+
+def main():
+    parser = argparse.ArgumentParser(description="开奖日历轮询检查")
+    parser.add_argument("--weeks", type=int, default=4, help="模拟的周数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    calendar = {code: parse_draw_schedule(description) for code, description in DESCRIPTIONS.items()}
+    start = datetime.datetime(2026, 3, 2, 0, 0, tzinfo=DRAW_TIMEZONE)  # 周一
+    end = start + datetime.timedelta(weeks=args.weeks)
+    draws = all_draws(calendar, start, end)
+    
+    print("===== 开奖日历轮询检查 =====")
+    results = []
+    results.append(check("解析开奖说明", [calendar[code].weekdays for code in ('ssq', 'qlc', 'kl8')] == [(1, 3, 6), (0, 2, 4), tuple(range(7))]
+                         and (calendar['kl8'].hour, calendar['kl8'].minute) == (21, 30), str(calendar['ssq'])))
+    results.append(check("无法解析的说明返回None", parse_draw_schedule('不定期开奖') is None))
+    
+    # 正常情况：每期都在开奖后10~50分钟出结果
+    skipped = draws[len(draws) // 2]
+    upstream = FakeUpstream(rng, skip=[skipped])
+    poller = simulate(calendar, upstream, start, end)
+    finished = {(code, draw_at): (stored_at, attempts) for code, draw_at, stored_at, attempts in poller.history}
+    expected = [draw for draw in draws if draw[1] + poller.give_up_after < end]
+    
+    results.append(check("每期开奖都完成轮询", all(draw in finished for draw in expected), f"{len(expected)}期"))
+    results.append(check("只在开奖后开始请求", all(now >= draw_at + poller.start_delay for _, draw_at, now in upstream.requests)))
+    results.append(check("获取到新一期后不再请求该期", all(
+        now <= finished[(code, draw_at)][0] for code, draw_at, now in upstream.requests
+        if (code, draw_at) in finished and finished[(code, draw_at)][0] is not None
+    )))
+    gave_up = finished.get(skipped, (1, 0))
+    results.append(check("长时间不出结果时放弃本期并转入下一期", gave_up[0] is None and skipped[1] + poller.give_up_after < end,
+                         f"{skipped[0]} {skipped[1]:%m-%d}轮询{gave_up[1]}次后放弃"))
+    
+    # 启动时最近一次开奖尚未入库：立即补抓
+    late_start = datetime.datetime(2026, 3, 3, 23, 0, tzinfo=DRAW_TIMEZONE)  # 周二开奖后
+    catch_up = FakeUpstream(random.Random(args.seed))
+    catch_up_poller = DrawPoller({'ssq': calendar['ssq']}, catch_up.poll, is_stored=lambda code, draw_at: False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        wakeup = catch_up_poller.start(late_start)
+    results.append(check("启动时补抓尚未入库的最近一期", wakeup <= late_start and catch_up_poller.states['ssq'].draw_at.date() == late_start.date()))
+    
+    # 与数据库联动：data_version.max_draw_date到达开奖日期即视为入库
+    use_temp_db()
+    with contextlib.redirect_stdout(io.StringIO()):
+        models.save_lottery_results_bulk(generate_draws("ssq", 3, start_date=datetime.date(2026, 3, 3)))
+    results.append(check("draw_stored按开奖日期判断",
+                         draw_stored('ssq', datetime.datetime(2026, 3, 3, 21, 15, tzinfo=DRAW_TIMEZONE))
+                         and not draw_stored('ssq', datetime.datetime(2026, 3, 5, 21, 15, tzinfo=DRAW_TIMEZONE))))
+    
+    # 实际的轮询函数：上游故障时不使用本地备份数据、不记录成功，存在未修复的错误时与定时爬取一样跳过
+    results.append(check_crawl_poll())
+    
+    # 与原来每天10:20爬取全部类型比较
+    latencies = [minutes(stored_at - upstream.published_at[(code, draw_at)])
+                 for code, draw_at, stored_at, _ in poller.history if stored_at is not None]
+    draw_latencies = [minutes(stored_at - draw_at) for _, draw_at, stored_at, _ in poller.history if stored_at is not None]
+    cron_latencies = [minutes(daily_cron_latency(upstream.published_at[draw]) + (upstream.published_at[draw] - draw[1]))
+                      for draw in expected if upstream.published_at.get(draw)]
+    days = (end - start).days
+    print(f"\n模拟{args.weeks}周，{len(expected)}期开奖（上游在开奖后10~50分钟出结果）")
+    print(f"  开奖日历轮询: 上游请求{len(upstream.requests)}次，每期平均{statistics.mean(a for *_, a in poller.history):.1f}次，"
+          f"开奖到入库 中位数{statistics.median(draw_latencies):.0f}分钟/最大{max(draw_latencies):.0f}分钟，"
+          f"出结果到入库 中位数{statistics.median(latencies):.0f}分钟")
+    print(f"  每天10:20爬取: 上游请求{len(calendar) * days}次，开奖到入库 中位数{statistics.median(cron_latencies) / 60:.1f}小时")
+    print(f"  全天每5分钟轮询（同等延迟的固定间隔做法）: 上游请求{len(calendar) * days * 288}次")
+    
+    if not all(results):
+        print("\n开奖日历轮询检查未通过")
+        sys.exit(1)
+    print("\n开奖日历轮询检查通过")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询计划回归检查脚本
+用于确认常用查询仍然走索引，避免修改查询后退化为全表扫描
+
+用法：
+    python verify_query_plans.py              # 在临时数据库上检查（init_db建表建索引）
+    python verify_query_plans.py --db lottery.db
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+import models.models as models
+
+def main():
+    parser = argparse.ArgumentParser(description="查询计划回归检查")
+    parser.add_argument("--db", help="要检查的数据库文件，默认使用新建的临时数据库")
+    args = parser.parse_args()
+    
+    if args.db:
+        conn = sqlite3.connect(args.db)
+    else:
+        models.DB_FILE = os.path.join(tempfile.mkdtemp(), "plan_check.db")
+        models.init_db()
+        conn = sqlite3.connect(models.DB_FILE)
+    
+    print("===== 查询计划检查 =====")
+    failures = models.check_query_plans(conn)
+    failed_names = {name for name, _, _ in failures}
+    for name, sql, params, index_name in models.QUERY_PLAN_EXPECTATIONS:
+        status = "❌" if name in failed_names else "✅"
+        print(f"{status} {name}: {' | '.join(models.explain_query_plan(conn, sql, params))}")
+    conn.close()
+    
+    if failures:
+        print(f"\n{len(failures)}个查询没有使用预期索引：")
+        for name, index_name, plan in failures:
+            print(f"  {name}: 期望使用{index_name}，实际计划 {plan}")
+        sys.exit(1)
+    
+    print("\n所有查询均使用了预期索引")
+
+if __name__ == '__main__':
+    main()
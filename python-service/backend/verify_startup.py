@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动预算检查脚本
+在全新的子进程中用 python -X importtime 测量导入app.py的耗时，并测量到第一个/health和/latest响应的总耗时，
+超出预算或启动时加载了应当延迟导入的模块（爬虫、APScheduler、NumPy等）时以非零状态退出
+
+子进程设置VERCEL_ENV模拟Serverless冷启动（不启动定时任务），使用数据库副本，不修改原数据库。
+
+用法：
+    python verify_startup.py
+    python verify_startup.py --budget-ms 300 --runs 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import models.models as models
+from benchmarks.synthetic import generate_draws, use_temp_db
+
+# 导入app.py的预算（毫秒，取多次运行的中位数），Flask本身约占100毫秒
+IMPORT_BUDGET_MS = 350
+# 从进程启动到第一个/latest响应（含数据库初始化）的预算
+FIRST_RESPONSE_BUDGET_MS = 1000
+
+# 处理/health和/latest时不应被导入的模块
+LAZY_MODULES = (
+    'crawler.crawler', 'scheduler', 'apscheduler', 'requests', 'httpx',
+    'analytics.analytics', 'analytics.offload', 'numpy', 'pyarrow', 'models.snapshot'
+)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 子进程中执行：导入app，请求/health和/latest，输出耗时和已加载的模块
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+health = client.get('/health').status_code
+latest = client.get('/api/lottery/ssq/latest?limit=1').status_code
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_response_ms': (done - start) * 1000,
+    'status': [health, latest],
+    'lazy_loaded': [name for name in %r if name in sys.modules]
+}))
+'''
+
+def run_probe(db_file):
+    env = dict(os.environ, VERCEL_ENV='preview', LOTTERY_DB_FILE=db_file)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE % (LAZY_MODULES,)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    # importtime输出到stderr，取app模块的累计耗时（微秒）
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == 'app':
+            probe['importtime_ms'] = int(parts[1]) / 1000
+    return probe
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动预算检查")
+    parser.add_argument("--runs", type=int, default=5, help="子进程运行次数，取中位数")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="导入app.py的预算（毫秒）")
+    parser.add_argument("--first-response-budget-ms", type=float, default=FIRST_RESPONSE_BUDGET_MS, help="到第一个/latest响应的预算（毫秒）")
+    args = parser.parse_args()
+    
+    # 每次运行使用新的数据库副本，第一个访问数据库的请求在新进程中执行ensure_db
+    source_db = use_temp_db()
+    models.save_lottery_results_bulk(generate_draws("ssq", 100))
+    models.get_connection_pool().close_all()
+    workdir = tempfile.mkdtemp()
+    
+    probes = []
+    for i in range(args.runs):
+        db_file = os.path.join(workdir, f'startup{i}.db')
+        shutil.copy(source_db, db_file)
+        probes.append(run_probe(db_file))
+    
+    import_ms = statistics.median(probe['importtime_ms'] for probe in probes)
+    first_response_ms = statistics.median(probe['first_response_ms'] for probe in probes)
+    lazy_loaded = sorted({name for probe in probes for name in probe['lazy_loaded']})
+    statuses = {tuple(probe['status']) for probe in probes}
+    
+    print("===== 冷启动检查 =====")
+    results = [
+        (f"导入app.py {import_ms:.1f}毫秒（预算{args.budget_ms:.0f}毫秒）", import_ms <= args.budget_ms),
+        (f"到第一个/latest响应 {first_response_ms:.1f}毫秒（预算{args.first_response_budget_ms:.0f}毫秒）",
+         first_response_ms <= args.first_response_budget_ms),
+        (f"/health和/latest返回{sorted(statuses)}", statuses == {(200, 200)}),
+        (f"未加载延迟导入的模块{('，实际加载了' + ', '.join(lazy_loaded)) if lazy_loaded else ''}", not lazy_loaded)
+    ]
+    for name, passed in results:
+        print(f"{'✅' if passed else '❌'} {name}")
+    
+    if not all(passed for _, passed in results):
+        print("\n冷启动检查未通过")
+        sys.exit(1)
+    print("\n冷启动检查通过")
+
+if __name__ == '__main__':
+    main()